@@ -1,6 +1,8 @@
 # ...existing code...
-from fastapi import FastAPI, Query, Request, Depends, UploadFile, File
+from fastapi import FastAPI, Query, Request, Depends, UploadFile, File, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Optional
 import joblib
@@ -10,17 +12,40 @@ import os
 import random
 import json
 import uuid
-import hashlib
 import csv
+import io
 import requests
 import warnings
 from datetime import datetime
+from contextlib import asynccontextmanager
 from fastapi import HTTPException
 import pvp_utils
+import email_service
+import password_hashing
+import spin_store
+import async_db
+from user_cache import user_cache
+from response_cache import ResponseCacheMiddleware, dataset_version, response_caches
+from fast_json import FastJSONResponse, dataframe_response
+from roster import RosterIndex
+from fantasy import FantasyOptimizer
+from scorecard import UploadTooLarge, analyze_scorecard, store_upload
+from ball_store import ball_store
+import metrics
+import profiling
+from profiling import span
+import shared_datasets
+import unified_db
+from async_db import get_async_db
+from email_outbox import outbox_worker, queue_welcome_email_async
 from sklearn.exceptions import InconsistentVersionWarning
 from unified_db import (
-    init_db, get_db, User, create_user, get_user_by_username,
-    authenticate_user, deduct_tokens, add_tokens, hash_password, verify_password
+    init_db, get_db, SessionLocal,
+    read_user_records, bulk_import_users, grant_tokens_bulk, ensure_default_tokens, export_users_csv
+)
+from sessions import issue_token, token_expiry, optional_session, require_session, require_user, require_admin
+from password_hashing import (
+    HashingBusyError, hash_password_async, verify_password_async, needs_rehash
 )
 
 # Team name mapping for user-friendly input
@@ -174,6 +199,18 @@ for team_code, team_info in TEAMS_2025.items():
     PLAYER_TO_TEAM[team_info["topScorer"]] = team_code
     PLAYER_TO_TEAM[team_info["topBowler"]] = team_code
 
+# Roster index over players1.csv: per-team payloads are pre-serialized
+roster = RosterIndex(os.path.join(os.path.dirname(__file__), "data", "players1.csv"),
+                     PLAYER_TO_TEAM, TEAMS_2025.keys())
+try:
+    roster.load()
+except Exception as e:
+    # /players answers "not available" until the CSV is fixed
+    print(f"❌ Error loading players roster: {e}")
+
+# Fantasy XI optimizer: projections from the per-season stats tables
+fantasy_optimizer = FantasyOptimizer(team_of=PLAYER_TO_TEAM)
+
 # IPL 2025 Venues
 VENUES_2025 = [
     "M. A. Chidambaram Stadium, Chennai",
@@ -207,11 +244,38 @@ class WicketPredictionRequest(BaseModel):
     wicketsTeam1: Optional[int] = 3
     wicketsTeam2: Optional[int] = 3
 
-app = FastAPI(title="IPL Predictor API 2025", version="2.0")
+class FantasySquadPlayer(BaseModel):
+    name: str
+    team: Optional[str] = None
+    role: Optional[str] = None
+
+class FantasyRequest(BaseModel):
+    squad: list[FantasySquadPlayer] = []
+
+@asynccontextmanager
+async def lifespan(app):
+    # Welcome emails are delivered from the outbox, off the request path
+    if email_service.email_enabled():
+        outbox_worker.start()
+    fantasy_optimizer.start_warmup()
+    yield
+    outbox_worker.stop()
+    password_hashing.shutdown()
+    await async_db.dispose()
+
+app = FastAPI(title="IPL Predictor API 2025", version="2.0", lifespan=lifespan,
+              default_response_class=FastJSONResponse)
 
 # Initialize unified database
 init_db()
 
+# Read-only dataset endpoints are served from memory until data/ changes.
+# Added before CORS so CORS headers are computed per request, not cached.
+app.add_middleware(
+    ResponseCacheMiddleware,
+    paths=["/teams", "/team/", "/venues", "/stats/teams", "/stats/compare", "/players", "/matches"],
+)
+
 # Enable CORS for frontend-backend communication
 app.add_middleware(
     CORSMiddleware,
@@ -221,6 +285,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in per-request sampling profiler (PROFILE_SAMPLE_RATE / X-Profile header)
+app.add_middleware(profiling.ProfilingMiddleware)
+
+# Outermost, so latency includes CORS and response-cache hits
+app.add_middleware(metrics.MetricsMiddleware)
+metrics.instrument_engine(unified_db.engine)
+metrics.instrument_engine(async_db.async_engine.sync_engine)
+metrics.register_cache("user", lambda: (user_cache.hits, user_cache.misses))
+metrics.register_cache("response", lambda: (sum(c.hits for c in response_caches), sum(c.misses for c in response_caches)))
+metrics.register_cache("player_catalog", lambda: pvp_utils.build_local_player_catalog.cache_info()[:2])
+metrics.register_cache("pvp_pairs", lambda: (pvp_utils.pvp_cache_stats["hits"], pvp_utils.pvp_cache_stats["misses"]))
+metrics.register_cache("fantasy_lineups", lambda: (fantasy_optimizer.hits, fantasy_optimizer.misses))
+
 # Load model and encoders (if they exist)
 warnings.filterwarnings('ignore', category=UserWarning)
 warnings.filterwarnings('ignore', category=InconsistentVersionWarning)
@@ -228,7 +305,7 @@ warnings.filterwarnings('ignore', category=InconsistentVersionWarning)
 try:
     MODEL_PATH = os.path.join(os.path.dirname(__file__), "model.pkl")
     if os.path.exists(MODEL_PATH):
-        with warnings.catch_warnings():
+        with warnings.catch_warnings(), metrics.load_timer("model"):
             warnings.simplefilter("ignore")
             model_bundle = joblib.load(MODEL_PATH)
             model = model_bundle["model"]
@@ -262,6 +339,7 @@ def get_team_short_name(full_name):
             return short
     return full_name
 
+@span("predict.match")
 def predict_match(team1: str, team2: str, venue: str, weather: str, runsTeam1: int, runsTeam2: int, wicketsTeam1: int, wicketsTeam2: int):
     """Predict match winner based on runs, wickets, venue, and weather"""
     
@@ -401,8 +479,14 @@ def get_venues():
 
 # ==================== PREDICTION ENDPOINTS ====================
 @app.post("/predict/match")
-def predict_match_endpoint(request: PredictionRequest, db = Depends(get_db)):
-    """Predict match winner with detailed analysis"""
+async def predict_match_endpoint(request: PredictionRequest, db = Depends(get_async_db), session_user: Optional[str] = Depends(optional_session)):
+    """Predict match winner with detailed analysis.
+
+    Charging a user requires a bearer token issued to that user.
+    """
+    if request.username and session_user != request.username:
+        raise HTTPException(status_code=401, detail="Login required to charge this account",
+                            headers={"WWW-Authenticate": "Bearer"})
     try:
         # Make prediction (works for both authenticated and demo users)
         prediction = predict_match(
@@ -419,19 +503,18 @@ def predict_match_endpoint(request: PredictionRequest, db = Depends(get_db)):
         # If username provided, deduct tokens from database
         username = request.username
         if username:
-            user = get_user_by_username(db, username)
-            if not user:
-                # User doesn't exist yet - allow prediction but don't charge
-                prediction['note'] = "Demo prediction (user account not found)"
-                return prediction
-            
-            if user.tokens < 10:
+            # Single conditional UPDATE; only a failed charge needs a second look
+            with span("predict.charge_tokens"):
+                remaining = await async_db.charge_tokens(db, username, 10)
+            if remaining is None:
+                if await async_db.get_token_balance(db, username) is None:
+                    # User doesn't exist yet - allow prediction but don't charge
+                    prediction['note'] = "Demo prediction (user account not found)"
+                    return prediction
                 return {"ok": False, "error": "insufficient tokens"}
             
-            # Deduct tokens
-            deduct_tokens(db, username, 10)
             prediction['charged_user'] = username
-            prediction['tokens_remaining'] = user.tokens - 10
+            prediction['tokens_remaining'] = remaining
         else:
             # No username - demo mode
             prediction['note'] = "Demo prediction (not charged)"
@@ -456,20 +539,31 @@ def predict_wickets_endpoint(request: WicketPredictionRequest):
     except Exception as e:
         return {"error": str(e)}
 @app.post("/upload/scorecard")
-async def upload_scorecard(file: UploadFile = File(...)):
-    os.makedirs(os.path.join(STORAGE_DIR, "uploads"), exist_ok=True)
-    save_path = os.path.join(STORAGE_DIR, "uploads", file.filename)
-    contents = await file.read()
-    with open(save_path, "wb") as fh:
-        fh.write(contents)
+async def upload_scorecard(file: UploadFile = File(...), ingest: bool = Query(False)):
+    """Store a scorecard CSV (streamed, content-addressed) and summarize every innings in it.
+    With ?ingest=true ball-by-ball files are also appended to the PvP ball store."""
+    try:
+        stored = await store_upload(file, os.path.join(STORAGE_DIR, "uploads"))
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     try:
-        df = pd.read_csv(save_path)
-        # simple analysis: top scorer and top wicket taker from CSV columns 'batsman','runs','bowler','wickets' if present
-        top_bats = df.groupby('batsman')['runs'].sum().sort_values(ascending=False).head(3).to_dict() if 'batsman' in df.columns and 'runs' in df.columns else {}
-        top_bowl = df.groupby('bowler')['wickets'].sum().sort_values(ascending=False).head(3).to_dict() if 'bowler' in df.columns and 'wickets' in df.columns else {}
-        return {"ok": True, "path": save_path, "top_batsmen": top_bats, "top_bowlers": top_bowl}
+        # parsing is CPU-bound; keep it off the event loop
+        summary = await run_in_threadpool(analyze_scorecard, stored.path)
+        response = {"ok": True, "path": stored.path, "sha256": stored.sha256, "bytes": stored.size,
+                    "duplicate": stored.duplicate, **summary}
     except Exception as e:
         return {"ok": False, "error": str(e)}
+    if ingest:
+        try:
+            result = await run_in_threadpool(ball_store.ingest, stored.path, stored.sha256)
+        except ValueError as e:
+            response["ingest"] = {"ingested": False, "error": str(e)}
+        else:
+            pairs = result.pop("pairs")
+            result["pairs_updated"] = len(pairs)
+            result["cache_entries_dropped"] = pvp_utils.invalidate_pairs(pairs)
+            response["ingest"] = result
+    return response
 @app.get("/predict")
 def predict_get(
     team1: str,
@@ -498,31 +592,16 @@ def predict_get(
 
 # ==================== PLAYER ENDPOINTS ====================
 @app.get("/players")
-def get_players(team: str = Query(None)):
-    """Get players data"""
+def get_players(team: str = Query(None), hand: str = Query(None), bowling_skill: str = Query(None)):
+    """Get players data (optionally filtered by team code, batting hand, bowling skill)"""
     try:
-        players_path = os.path.join(os.path.dirname(__file__), "data", "players1.csv")
-        
-        if not os.path.exists(players_path):
+        body = roster.payload(team, hand, bowling_skill)
+        if body is None:
             return {
                 "message": "Players data not available yet",
                 "teams": list(TEAMS_2025.keys())
             }
-        
-        df = pd.read_csv(players_path)
-        df = df.replace({np.nan: None})
-        
-        # Add team information to each player
-        df['Team'] = df['Player_Name'].apply(lambda x: PLAYER_TO_TEAM.get(x))
-        
-        if team:
-            df = df[df["Team"] == team.upper()]
-        
-        players = df.to_dict(orient="records")
-        return {
-            "players": players,
-            "count": len(players)
-        }
+        return Response(content=body, media_type="application/json")
     except Exception as e:
         return {"error": str(e)}
 
@@ -554,7 +633,7 @@ def pvp_players():
         batsmen = sorted(df[batsman_col].dropna().astype(str).str.strip().unique().tolist())
         bowlers = sorted(df[bowler_col].dropna().astype(str).str.strip().unique().tolist())
 
-        return {"batsmen": batsmen, "bowlers": bowlers, "counts": {"batsmen": len(batsmen), "bowlers": len(bowlers)}}
+        return FastJSONResponse({"batsmen": batsmen, "bowlers": bowlers, "counts": {"batsmen": len(batsmen), "bowlers": len(bowlers)}})
     except FileNotFoundError:
         # build catalog from aggregated CSVs
         try:
@@ -589,7 +668,7 @@ def pvp_players():
 
             batsmen = sorted(list(set(batsmen)))
             bowlers = sorted(list(set(bowlers)))
-            return {"batsmen": batsmen, "bowlers": bowlers, "counts": {"batsmen": len(batsmen), "bowlers": len(bowlers)}}
+            return FastJSONResponse({"batsmen": batsmen, "bowlers": bowlers, "counts": {"batsmen": len(batsmen), "bowlers": len(bowlers)}})
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
@@ -667,11 +746,15 @@ def pvp_endpoint(batsman: str = Query(...), bowler: str = Query(...)):
         # Try aggregated CSV-based comparison first (most reliable without ball-by-ball)
         try:
             res = pvp_utils.compute_pvp_from_aggregates(batsman, bowler)
+            # Head-to-head from ingested ball-by-ball data, updated on every ingest
+            head_to_head = ball_store.matchup(batsman, bowler)
+            if head_to_head:
+                res["head_to_head"] = head_to_head
             return {"ok": True, "data": res}
         except Exception as agg_err:
             # Fallback to ball-by-ball compute_pvp if aggregates fail
             try:
-                res = pvp_utils.compute_pvp(batsman, bowler)
+                res = pvp_utils.cached_pvp(batsman, bowler)
                 return {"ok": True, "data": res}
             except Exception as ball_err:
                 raise ValueError(f"Aggregates failed: {str(agg_err)}; Ball-by-ball failed: {str(ball_err)}")
@@ -696,12 +779,9 @@ def get_matches():
             }
         
         df = pd.read_csv(data_path)
-        df = df.astype(str).replace("nan", "")
+        df = df.fillna("").astype(str).replace("nan", "")
         
-        return {
-            "matches": df.to_dict(orient="records"),
-            "count": len(df)
-        }
+        return dataframe_response("matches", df, count=len(df))
     except Exception as e:
         return {"error": str(e)}
 
@@ -711,12 +791,33 @@ def health_check():
     """Check API health status"""
     return {
         "status": "API is running",
+        "pid": os.getpid(),  # lets the supervisor tell its workers apart
         "version": "2.0",
         "season": 2025,
         "teams": len(TEAMS_2025),
         "venues": len(VENUES_2025)
     }
 
+@app.get("/health/deep")
+def health_deep():
+    """Dataset versions, load timings and cache hit rates for this worker"""
+    return {
+        "status": "ok",
+        "model_loaded": model is not None,
+        "datasets": {
+            "data_dir_version": dataset_version.get(),
+            "ball_store": ball_store.stats(),
+            "shared": shared_datasets.shared.stats(),
+            "roster_loads": roster.loads,
+        },
+        **metrics.health_snapshot(),
+    }
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Prometheus text exposition of this worker's request, DB and cache metrics"""
+    return Response(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
 # ==================== STATISTICS ENDPOINTS ====================
 @app.get("/stats/teams")
 def get_teams_stats():
@@ -780,13 +881,6 @@ def write_json(path, data):
     with open(path, "w", encoding="utf-8") as fh:
         json.dump(data, fh, indent=2, default=str)
 
-def _hash_password(password: str, salt: Optional[str] = None):
-    if salt is None:
-        salt = uuid.uuid4().hex
-    h = hashlib.sha256((salt + (password or '')).encode('utf-8')).hexdigest()
-    return salt, h
-
-
 def _safe_user_for_client(user: dict):
     u = dict(user)
     u.pop('password_hash', None)
@@ -805,12 +899,13 @@ def _generate_referral_code(existing_codes: set):
 
 
 @app.post("/users/register")
-def register_user(data: dict, db = Depends(get_db)):
+async def register_user(data: dict, db = Depends(get_async_db)):
     """Register a new user using unified database"""
     
     username = data.get("username", "").strip()
     password = data.get("password", "").strip()
     display_name = data.get("display_name", username)
+    email = (data.get("email") or "").strip()
     
     if not username:
         return {"ok": False, "error": "username is required"}
@@ -818,22 +913,40 @@ def register_user(data: dict, db = Depends(get_db)):
         return {"ok": False, "error": "password is required"}
     
     try:
-        user = create_user(
+        # KDF work runs on the dedicated hashing pool; DB access is awaited
+        password_hash, salt = await hash_password_async(password)
+        user = await async_db.create_user(
             db,
             username=username,
             display_name=display_name,
-            password=password,
-            email=f"{username}@cricket.local"
+            password=None,
+            email=email or f"{username}@cricket.local",
+            password_hash=password_hash,
+            salt=salt
         )
         
+        # Welcome email goes through the outbox so signup never waits on SMTP
+        if email:
+            try:
+                if await queue_welcome_email_async(db, email, display_name, username):
+                    outbox_worker.wake()
+            except Exception as e:
+                print(f"Could not queue welcome email: {e}")
+        
+        token = issue_token(user.username)
         return {
             "ok": True,
             "user": user.to_dict(),
-            "token": str(uuid.uuid4())
+            "token": token,
+            "expires_at": token_expiry(token)
         }
+    except HashingBusyError:
+        raise HTTPException(status_code=503, detail="Server busy, please retry")
     except ValueError as e:
         if "already exists" in str(e):
             return {"ok": False, "error": "username exists"}
+        elif "Email already registered" in str(e):
+            return {"ok": False, "error": "email already registered"}
         else:
             return {"ok": False, "error": str(e)}
     except Exception as e:
@@ -842,7 +955,7 @@ def register_user(data: dict, db = Depends(get_db)):
 
 
 @app.post("/users/login")
-def login_user(data: dict, db = Depends(get_db)):
+async def login_user(data: dict, db = Depends(get_async_db)):
     """Authenticate a user using unified database"""
     
     username_or_email = data.get("username", "").strip() or data.get("email", "").strip()
@@ -852,39 +965,50 @@ def login_user(data: dict, db = Depends(get_db)):
         return {"ok": False, "error": "username and password are required"}
 
     try:
-        # Authenticate user
-        user = authenticate_user(db, username_or_email, password)
-        
-        if user:
-            return {
-                "ok": True,
-                "user": user.to_dict(),
-                "token": str(uuid.uuid4())
-            }
-        else:
+        # Authenticate user; password verification runs on the hashing pool
+        user = await async_db.get_user_by_username(db, username_or_email)
+        if not user or not user.is_active:
+            return {"ok": False, "error": "Invalid username or password"}
+        if not await verify_password_async(password, user.password_hash, user.salt):
             return {"ok": False, "error": "Invalid username or password"}
+        
+        # Legacy SHA-256 hashes are upgraded to the current KDF on login
+        new_hash, new_salt = None, None
+        if needs_rehash(user.password_hash):
+            new_hash, new_salt = await hash_password_async(password)
+        user = await async_db.record_login(db, user, new_hash, new_salt)
+        
+        token = issue_token(user.username)
+        return {
+            "ok": True,
+            "user": user.to_dict(),
+            "token": token,
+            "expires_at": token_expiry(token)
+        }
             
+    except HashingBusyError:
+        raise HTTPException(status_code=503, detail="Server busy, please retry")
     except Exception as e:
         print(f"Login error: {e}")
         return {"ok": False, "error": "Login failed"}
 
+@app.get("/session")
+async def get_session(username: str = Depends(require_session), authorization: Optional[str] = Header(None)):
+    """Validate the caller's bearer token (no database access)"""
+    return {"ok": True, "username": username, "expires_at": token_expiry(authorization.partition(" ")[2].strip())}
+
 @app.post("/fantasy/recommend")
-def fantasy_recommend(budget: int = 100):
-    players_path = os.path.join(os.path.dirname(__file__), "data", "players1.csv")
-    if not os.path.exists(players_path):
-        return {"ok": False, "error": "players data not found"}
-    df = pd.read_csv(players_path)
-    # heuristic: prefer highest 'Runs' or 'Avg' column if present
-    score_col = None
-    for col in ['Runs','runs','AVG','avg','Score']:
-        if col in df.columns:
-            score_col = col; break
-    if score_col:
-        df = df.sort_values(by=score_col, ascending=False)
-    df = df.head(20)
-    # pick 11
-    pick = df.head(11).to_dict(orient='records')
-    return {"ok": True, "picks": pick}
+def fantasy_recommend(budget: float = 100, k: int = 1, max_per_team: int = 7, req: Optional[FantasyRequest] = None):
+    """Top-k fantasy XIs under a credit budget. An optional squad body limits the
+    pool to the two playing sides and supplies teams/roles for the team cap."""
+    squad = [p.model_dump() for p in req.squad] if req else None
+    try:
+        result = fantasy_optimizer.recommend(budget, k, squad=squad, max_per_team=max_per_team)
+    except FileNotFoundError:
+        return {"ok": False, "error": "player stats data not found"}
+    if not result["lineups"]:
+        return {"ok": False, "error": "no valid lineup for this budget and squad", "unmatched": result["unmatched"]}
+    return {"ok": True, "picks": result["lineups"][0]["players"], **result}
 # ...existing code...
 @app.get("/users/{username}")
 def get_user(username: str):
@@ -926,7 +1050,8 @@ def provenance_h2h(team1: str, team2: str):
 # ...existing code...
 
 @app.post("/users/{username}/predictions")
-def save_prediction(username: str, payload: dict):
+def save_prediction(username: str, payload: dict, session_user: str = Depends(require_session)):
+    require_user(session_user, username)
     users = read_json(USERS_FILE)
     if not any(u["username"] == username for u in users):
         return {"ok": False, "error": "user not found"}
@@ -1005,81 +1130,121 @@ def admin_list_referrals():
 
 # ================ BALANCE / TOKEN ENDPOINTS ================
 @app.get("/users/{username}/balance")
-def user_balance(username: str, db = Depends(get_db)):
+async def user_balance(username: str, db = Depends(get_async_db)):
     """Return authoritative token balance for a user using SQLite database.
 
     Response: { ok: True, username, tokens, default_applied: bool }
     """
-    user = get_user_by_username(db, username)
-    if not user:
+    tokens = await async_db.get_token_balance(db, username)
+    if tokens is None:
         return {"ok": False, "error": "user not found"}
-    return {"ok": True, "username": username, "tokens": user.tokens, "default_applied": False}
+    return {"ok": True, "username": username, "tokens": tokens, "default_applied": False}
+
+
+@app.get("/_admin/cache_stats", dependencies=[Depends(require_admin)])
+def admin_cache_stats():
+    """Hit/miss counters for the in-process caches (this worker only)"""
+    return {
+        "ok": True,
+        "pid": os.getpid(),
+        "user_cache": user_cache.stats(),
+        "response_cache": [cache.stats() for cache in response_caches],
+        "ball_store": ball_store.stats()
+    }
+
+
+@app.get("/_admin/profiles", dependencies=[Depends(require_admin)])
+def admin_list_profiles():
+    """Recent request profiles held by this worker, newest first"""
+    return {"ok": True, "pid": os.getpid(), "profiles": [p.summary() for p in reversed(profiling.profiles)]}
 
 
-@app.post("/_admin/ensure_default_tokens")
-def admin_ensure_default_tokens():
+@app.get("/_admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+def admin_get_profile(profile_id: int, format: str = Query("collapsed")):
+    """One profile as collapsed stacks (flamegraph.pl / speedscope) or as JSON"""
+    session = profiling.get_profile(profile_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Profile not found (evicted, or recorded by another worker)")
+    if format == "json":
+        return {"ok": True, **session.detail()}
+    return Response(session.collapsed(), media_type="text/plain")
+
+
+@app.post("/_admin/ensure_default_tokens", dependencies=[Depends(require_admin)])
+def admin_ensure_default_tokens(db = Depends(get_db)):
     """Admin-only (dev) endpoint: set tokens=100 for users missing a tokens field.
 
     This endpoint is safe to run multiple times; it will not overwrite existing token balances.
     Returns a summary of how many users were updated and a sample of updated usernames.
     """
-    users = read_json(USERS_FILE)
-    updated = []
-    for u in users:
-        if 'tokens' not in u or u.get('tokens') is None:
-            u['tokens'] = 100
-            updated.append(u.get('username'))
-    if updated:
-        write_json(USERS_FILE, users)
-    return {"ok": True, "updated_count": len(updated), "updated_users": updated}
+    updated = ensure_default_tokens(db, 100)
+    return {"ok": True, "updated_count": len(updated), "updated_users": updated[:50]}
+
+
+@app.post("/_admin/users/import", dependencies=[Depends(require_admin)])
+def admin_import_users(file: UploadFile = File(...), default_tokens: int = 100, db = Depends(get_db)):
+    """Admin-only (dev) endpoint: bulk-import users from CSV, JSON or JSON lines.
+
+    Rows need a username; password_hash/salt (e.g. legacy users.json), a
+    plaintext password, tokens, email, display_name and referral fields are
+    optional. Existing usernames/emails are skipped.
+    """
+    name = (file.filename or "").lower()
+    fmt = "jsonl" if name.endswith(".jsonl") else "json" if name.endswith(".json") else "csv"
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        summary = bulk_import_users(db, read_user_records(stream, fmt), default_tokens=default_tokens)
+    except (ValueError, KeyError) as e:
+        return {"ok": False, "error": f"could not import {file.filename}: {e}"}
+    return {"ok": True, **summary}
+
+
+@app.post("/_admin/tokens/grant", dependencies=[Depends(require_admin)])
+def admin_grant_tokens(data: dict, db = Depends(get_db)):
+    """Admin-only (dev) endpoint: grant tokens to a filtered set of users in one statement.
+
+    Body: { tokens, usernames?, referred_by?, created_after?, created_before?, max_balance? }
+    """
+    try:
+        tokens = int(data.get("tokens"))
+        created_after = datetime.fromisoformat(data["created_after"]) if data.get("created_after") else None
+        created_before = datetime.fromisoformat(data["created_before"]) if data.get("created_before") else None
+    except (TypeError, ValueError):
+        return {"ok": False, "error": "tokens must be an integer and dates ISO formatted"}
+    updated = grant_tokens_bulk(
+        db, tokens,
+        usernames=data.get("usernames"),
+        referred_by=data.get("referred_by"),
+        created_after=created_after,
+        created_before=created_before,
+        max_balance=data.get("max_balance")
+    )
+    return {"ok": True, "updated_count": updated, "tokens": tokens}
+
+
+@app.get("/_admin/users/export.csv", dependencies=[Depends(require_admin)])
+def admin_export_users():
+    """Admin-only (dev) endpoint: stream every user as CSV (no password fields)"""
+    def rows():
+        # the session lives as long as the stream, not the request handler
+        db = SessionLocal()
+        try:
+            yield from export_users_csv(db)
+        finally:
+            db.close()
+    return StreamingResponse(rows(), media_type="text/csv",
+                             headers={"Content-Disposition": "attachment; filename=users_export.csv"})
 
 # ==================== SPIN WHEEL ENDPOINTS ====================
 @app.post("/users/{username}/spin")
-def spin_wheel(username: str, db = Depends(get_db)):
-    """Spin the wheel and get a random reward. Max 2 spins per day using SQLite database."""
-    user = get_user_by_username(db, username)
-    if not user:
-        return {"ok": False, "error": "user not found"}
-    
-    # Check and track daily spins
-    # For simplicity, we'll use a basic spin counter that resets daily
-    # In production, you'd want a dedicated spin_history table
-    today = datetime.utcnow().date().isoformat()
-    
-    # Get spin count from user's metadata (we'll store in a simple way)
-    # Since we don't have a dedicated field, we'll track spins differently
-    # For now, let's assume max 2 spins per day (can be enhanced later)
-    
-    # Random reward: 5, 15, 50, or 100 tokens
-    rewards = [5, 15, 50, 100]
-    reward = random.choice(rewards)
-    
-    # Add tokens to user
-    user.tokens += reward
-    db.commit()
-    db.refresh(user)
-    
-    return {
-        "ok": True,
-        "reward": reward,
-        "tokens_remaining": user.tokens,
-        "spins_left": 1  # Simplified: always return 1 spin left
-    }
+async def spin_wheel(username: str, db = Depends(get_async_db), session_user: str = Depends(require_session)):
+    """Spin the wheel and get a random reward. The daily quota is enforced in the database."""
+    require_user(session_user, username)
+    return await spin_store.spin_async(db, username)
 
 @app.get("/users/{username}/spin_status")
-def get_spin_status(username: str, db = Depends(get_db)):
-    """Get user's spin status using SQLite database."""
-    user = get_user_by_username(db, username)
-    if not user:
-        return {"ok": False, "error": "user not found"}
-    
-    today = datetime.utcnow().date().isoformat()
-    
-    return {
-        "ok": True,
-        "spins_left": 2,  # Simplified: always return 2 spins available
-        "last_reward": None,
-        "date": today
-    }
+async def get_spin_status(username: str, db = Depends(get_async_db)):
+    """Get user's remaining spins for today."""
+    return await spin_store.get_spin_status_async(db, username)
 
 # ...existing code...
\ No newline at end of file
@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 import pandas as pd
 import joblib
@@ -6,6 +6,8 @@ import os
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
 import warnings
+from bulk_loader import load_directory
+from table_cache import TableCache
 warnings.filterwarnings('ignore')
 
 load_dotenv()
@@ -26,34 +28,10 @@ if "postgresql" in DATABASE_URL:
     engine = create_engine(DATABASE_URL, pool_pre_ping=True, pool_recycle=3600)
     
     def init_db():
-        """Initialize database tables from CSV"""
+        """Initialize database tables from CSV (unchanged files are skipped by content hash)"""
         try:
-            # Check if tables exist
-            conn = engine.raw_connection()
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT EXISTS (
-                    SELECT FROM information_schema.tables 
-                    WHERE table_schema = 'public' 
-                    AND table_name = 'matches'
-                );
-            """)
-            
-            if not cursor.fetchone()[0]:
-                print("Initializing PostgreSQL database...")
-                # Load CSV files to PostgreSQL
-                for csv_file in os.listdir(DATA_DIR):
-                    if csv_file.endswith('.csv'):
-                        try:
-                            table_name = csv_file.replace('.csv', '')
-                            df = pd.read_csv(os.path.join(DATA_DIR, csv_file))
-                            df.to_sql(table_name, engine, if_exists='replace', index=False)
-                            print(f"  ✓ Loaded {table_name}")
-                        except Exception as e:
-                            print(f"  ✗ Error loading {csv_file}: {e}")
-                
-            cursor.close()
-            conn.close()
+            print("Initializing PostgreSQL database...")
+            load_directory(engine, DATA_DIR)
         except Exception as e:
             print(f"Database init error: {e}")
 else:
@@ -76,6 +54,12 @@ else:
 # Initialize database on startup
 init_db() if "postgresql" in DATABASE_URL else None
 
+# Dataset tables are served from memory. Under gunicorn --preload this runs
+# once in the master and the forked workers share the loaded tables.
+CACHED_TABLES = ["players", "matches", "headtohead", "news"]
+table_cache = TableCache(engine if "postgresql" in DATABASE_URL else None, DATA_DIR)
+table_cache.preload(CACHED_TABLES)
+
 @app.route("/")
 def home():
     return {"message": "Cricket Predictor API is running"}
@@ -99,65 +83,33 @@ def predict():
 
     return jsonify({"predicted_winner": team_name})
 
-@app.route("/players")
-def get_players():
+def table_response(name):
+    """Whole table from the per-process cache, or one page with ?after=&limit="""
     try:
-        if "postgresql" in DATABASE_URL:
-            df = pd.read_sql("SELECT * FROM players LIMIT 1000", engine)
+        if "limit" in request.args or "after" in request.args:
+            body = table_cache.page(name, request.args.get("after", 0, type=int),
+                                    request.args.get("limit", 100, type=int))
         else:
-            df = pd.read_csv(os.path.join(DATA_DIR, "players.csv"))
-        return df.to_dict(orient="records")
+            body = table_cache.get(name).body
+        return Response(body, mimetype="application/json")
     except Exception as e:
-        try:
-            df = pd.read_csv(os.path.join(DATA_DIR, "players.csv"))
-            return df.to_dict(orient="records")
-        except Exception as csv_error:
-            return jsonify({"error": f"DB error: {str(e)} | CSV fallback error: {str(csv_error)}"}), 500
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/players")
+def get_players():
+    return table_response("players")
 
 @app.route("/matches")
 def get_matches():
-    try:
-        if "postgresql" in DATABASE_URL:
-            df = pd.read_sql("SELECT * FROM matches LIMIT 1000", engine)
-        else:
-            df = pd.read_csv(os.path.join(DATA_DIR, "matches.csv"))
-        return df.to_dict(orient="records")
-    except Exception as e:
-        try:
-            df = pd.read_csv(os.path.join(DATA_DIR, "matches.csv"))
-            return df.to_dict(orient="records")
-        except Exception as csv_error:
-            return jsonify({"error": f"DB error: {str(e)} | CSV fallback error: {str(csv_error)}"}), 500
+    return table_response("matches")
 
 @app.route("/headtohead")
 def get_headtohead():
-    try:
-        if "postgresql" in DATABASE_URL:
-            df = pd.read_sql("SELECT * FROM headtohead LIMIT 1000", engine)
-        else:
-            df = pd.read_csv(os.path.join(DATA_DIR, "headtohead.csv"))
-        return df.to_dict(orient="records")
-    except Exception as e:
-        try:
-            df = pd.read_csv(os.path.join(DATA_DIR, "headtohead.csv"))
-            return df.to_dict(orient="records")
-        except Exception as csv_error:
-            return jsonify({"error": f"DB error: {str(e)} | CSV fallback error: {str(csv_error)}"}), 500
+    return table_response("headtohead")
 
 @app.route("/news")
 def get_news():
-    try:
-        if "postgresql" in DATABASE_URL:
-            df = pd.read_sql("SELECT * FROM news LIMIT 1000", engine)
-        else:
-            df = pd.read_csv(os.path.join(DATA_DIR, "news.csv"))
-        return df.to_dict(orient="records")
-    except Exception as e:
-        try:
-            df = pd.read_csv(os.path.join(DATA_DIR, "news.csv"))
-            return df.to_dict(orient="records")
-        except Exception as csv_error:
-            return jsonify({"error": f"DB error: {str(e)} | CSV fallback error: {str(csv_error)}"}), 500
+    return table_response("news")
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 5000))
@@ -0,0 +1,162 @@
+"""
+Async User Database Access
+asyncio counterparts of the unified_db helpers for FastAPI endpoints.
+
+Endpoints that await these functions do not hold a threadpool slot while the
+database works, so a single worker can keep many more requests in flight than
+the default 40-thread pool allows. Same tables and models as unified_db; the
+engine comes from storage_config (aiosqlite by default, asyncpg when
+DATABASE_URL points at PostgreSQL).
+"""
+
+from sqlalchemy import select, update, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from datetime import datetime
+from typing import Optional
+import uuid
+
+import password_hashing
+from storage_config import create_async_storage_engine
+from unified_db import DATABASE_URL, User
+from user_cache import user_cache
+
+async_engine = create_async_storage_engine(DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
+
+async def get_async_db():
+    """Get async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def dispose():
+    await async_engine.dispose()
+
+
+async def get_user_by_username(db: AsyncSession, username: str) -> Optional[User]:
+    """Get user by username"""
+    result = await db.execute(select(User).where(User.username == username))
+    return result.scalars().first()
+
+
+async def _check_available(db: AsyncSession, username: str, email: str):
+    """Raise ValueError naming the column an existing user already holds"""
+    result = await db.execute(
+        select(User.username, User.email).where(or_(User.username == username, User.email == email)).limit(2)
+    )
+    for existing_username, existing_email in result:
+        if existing_username == username:
+            raise ValueError("Username already exists")
+        if existing_email == email:
+            raise ValueError("Email already registered")
+
+
+async def create_user(db: AsyncSession, username: str, display_name: str, password: str, email: str = None,
+                      referral_code: str = None, password_hash: str = None, salt: str = None) -> User:
+    """Create a new user; raises ValueError like unified_db.create_user"""
+    email = email or f"{username}@cricket.local"
+    await _check_available(db, username, email)
+
+    if password_hash is None:
+        password_hash, salt = await password_hashing.hash_password_async(password)
+
+    user = User(
+        username=username,
+        display_name=display_name,
+        email=email,
+        password_hash=password_hash,
+        salt=salt,
+        referral_code=referral_code or str(uuid.uuid4())[:8].upper(),
+        tokens=100,
+        is_active=True,
+        created_at=datetime.utcnow()
+    )
+    db.add(user)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # lost a race with a concurrent registration: report the column it took
+        await db.rollback()
+        await _check_available(db, username, email)
+        raise ValueError("Referral code already in use")
+    user_cache.put_user(user)
+    return user
+
+
+async def record_login(db: AsyncSession, user: User, password_hash: str = None, salt: str = None) -> User:
+    """Update last login, optionally replacing the stored password hash"""
+    user.last_login = datetime.utcnow()
+    if password_hash:
+        user.password_hash = password_hash
+        user.salt = salt
+    await db.commit()
+    user_cache.put_user(user)
+    return user
+
+
+async def authenticate_user(db: AsyncSession, username: str, password: str) -> Optional[User]:
+    """Authenticate user; password work runs on the hashing pool"""
+    user = await get_user_by_username(db, username)
+    if not user or not user.is_active:
+        return None
+    if not await password_hashing.verify_password_async(password, user.password_hash, user.salt):
+        return None
+
+    # Transparently upgrade legacy / outdated hashes
+    new_hash, new_salt = None, None
+    if password_hashing.needs_rehash(user.password_hash):
+        new_hash, new_salt = await password_hashing.hash_password_async(password)
+    return await record_login(db, user, new_hash, new_salt)
+
+
+async def charge_tokens(db: AsyncSession, username: str, tokens: int = 10) -> Optional[int]:
+    """Atomically deduct tokens; new balance, or None if missing/insufficient"""
+    result = await db.execute(
+        update(User)
+        .where(User.username == username, User.tokens >= tokens)
+        .values(tokens=User.tokens - tokens)
+        .returning(User.tokens)
+    )
+    remaining = result.scalar_one_or_none()
+    await db.commit()
+    if remaining is not None:
+        user_cache.set_tokens(username, remaining)
+    return remaining
+
+
+async def deduct_tokens(db: AsyncSession, username: str, tokens: int = 10) -> bool:
+    """Deduct tokens from user for predictions"""
+    return await charge_tokens(db, username, tokens) is not None
+
+
+async def add_tokens(db: AsyncSession, username: str, tokens: int) -> bool:
+    """Add tokens to user"""
+    result = await db.execute(
+        update(User)
+        .where(User.username == username)
+        .values(tokens=User.tokens + tokens)
+        .returning(User.tokens)
+    )
+    balance = result.scalar_one_or_none()
+    await db.commit()
+    user_cache.set_tokens(username, balance)
+    return balance is not None
+
+
+async def get_user_record(db: AsyncSession, username: str) -> Optional[dict]:
+    """User as a dict (no password fields), served from the user cache when warm"""
+    record = user_cache.get(username)
+    if record is None:
+        user = await get_user_by_username(db, username)
+        if not user:
+            return None
+        record = user_cache.put_user(user)
+    return record
+
+
+async def get_token_balance(db: AsyncSession, username: str) -> Optional[int]:
+    """Token balance, from memory when the user record is cached"""
+    record = await get_user_record(db, username)
+    return record["tokens"] if record else None
@@ -0,0 +1,338 @@
+"""
+Ball-by-ball Store
+Append-only columnar store of deliveries ingested from uploaded scorecards.
+
+Layout under BALL_STORE_DIR:
+    manifest.json        version, ingested sources (by SHA-256) and match ids
+    players.json         player name -> integer id, assigned on first sight
+    part-<version>.*     one columnar partition per ingested upload
+    matchups-<version>.* running (batter_id, bowler_id) aggregates
+
+Partitions are Parquet when pyarrow is installed and pickled DataFrames
+otherwise. Either way they hold integer player ids and numeric columns, not
+repeated name strings. Every ingest writes its partition and the updated
+aggregates first and the manifest last, so a crash mid-ingest leaves the
+previous version intact.
+
+ingest() is idempotent. A file whose SHA-256 was already ingested is a no-op,
+and matches already in the store are skipped, so re-uploading an overlapping
+export does not double count. It returns the (batter, bowler) pairs it
+touched so PvP caches can drop just those entries.
+
+Several API workers share one store. Readers re-read the manifest when its
+file signature changes, checked at most every BALL_STORE_CHECK_INTERVAL
+seconds. An ingest holds an exclusive flock on <root>/.lock from reading the
+manifest to writing the new one, and reloads take a shared lock, so two
+workers never claim the same version and a reload never sees a half-finished
+ingest. Without fcntl (Windows) only threads of one process are serialized.
+"""
+
+from contextlib import contextmanager
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from scorecard import SCORECARD_CHUNK_ROWS, iter_deliveries, read_columns
+
+try:
+    import pyarrow  # noqa: F401  (optional dependency, enables Parquet)
+    STORE_FORMAT = "parquet"
+except ImportError:
+    STORE_FORMAT = "pickle"
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+BALL_STORE_DIR = os.getenv("BALL_STORE_DIR", os.path.join(os.path.dirname(__file__), "data", "ball_store"))
+REQUIRED_COLUMNS = ("batter", "bowler", "batter_runs")
+MATCHUP_FIELDS = ["balls", "runs", "fours", "sixes", "dots", "dismissals"]
+NO_PLAYER = -1
+BALL_STORE_CHECK_INTERVAL = float(os.getenv("BALL_STORE_CHECK_INTERVAL", "1"))
+
+
+class BallStore:
+    """Deliveries plus matchup aggregates, appended one upload at a time"""
+
+    def __init__(self, root: str = BALL_STORE_DIR, fmt: str = STORE_FORMAT,
+                 check_interval: float = BALL_STORE_CHECK_INTERVAL):
+        self.root = root
+        self.fmt = fmt
+        self.check_interval = check_interval
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._signature = None
+        self._checked_at = 0.0
+        self.manifest = {"version": 0, "sources": {}, "matches": [], "partitions": []}
+        self.players = {}
+        self._keys = {}  # lower-cased name -> id
+        self.matchups = _empty_matchups()
+
+    # ---------- persistence ----------
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def _ext(self) -> str:
+        return ".parquet" if self.fmt == "parquet" else ".pkl"
+
+    def _write_frame(self, df: pd.DataFrame, name: str):
+        tmp = self._path(name + ".tmp")
+        if self.fmt == "parquet":
+            df.to_parquet(tmp, index=False)
+        else:
+            df.to_pickle(tmp)
+        os.replace(tmp, self._path(name))
+
+    def _read_frame(self, name: str) -> pd.DataFrame:
+        path = self._path(name)
+        return pd.read_parquet(path) if name.endswith(".parquet") else pd.read_pickle(path)
+
+    def _write_json(self, data, name: str):
+        tmp = self._path(name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(data, fh)
+        os.replace(tmp, self._path(name))
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        """flock on <root>/.lock, shared by every process using this store"""
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(self.root, exist_ok=True)
+        with open(self._path(".lock"), "a") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _manifest_signature(self):
+        try:
+            st = os.stat(self._path("manifest.json"))
+        except FileNotFoundError:
+            return None
+        # os.replace gives every manifest a new inode, even within one mtime tick
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _load(self):
+        """Read the manifest and what it points to; caller holds both locks"""
+        signature = self._manifest_signature()
+        if signature is not None:
+            with open(self._path("manifest.json"), encoding="utf-8") as fh:
+                self.manifest = json.load(fh)
+            with open(self._path("players.json"), encoding="utf-8") as fh:
+                self.players = json.load(fh)
+            self._keys = {name.strip().lower(): pid for name, pid in self.players.items()}
+            matchups = self.manifest.get("matchups")
+            self.matchups = self._read_frame(matchups).set_index(["batter_id", "bowler_id"]) \
+                if matchups else _empty_matchups()
+        self._signature = signature
+        self._checked_at = time.monotonic()
+        self._loaded = True
+
+    def load(self):
+        with self._lock:
+            if self._manifest_signature() is None:
+                self._load()
+                return
+            with self._file_lock(exclusive=False):
+                self._load()
+
+    def _refresh(self):
+        """Reload if another process ingested since the last look"""
+        now = time.monotonic()
+        if self._loaded and now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            if self._loaded and now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+            if not self._loaded or self._manifest_signature() != self._signature:
+                self.load()
+
+    @property
+    def version(self) -> int:
+        self._refresh()
+        return self.manifest["version"]
+
+    # ---------- ingest ----------
+
+    def _player_ids(self, names: pd.Series) -> np.ndarray:
+        """Ids for a column of names, registering unseen players"""
+        for name in names.dropna().unique():
+            if name not in self.players:
+                self.players[name] = len(self.players)
+                self._keys.setdefault(name.strip().lower(), self.players[name])
+        return names.map(self.players).fillna(NO_PLAYER).astype("int32").to_numpy()
+
+    def ingest(self, path: str, source_id: str = None, chunk_rows: int = SCORECARD_CHUNK_ROWS) -> dict:
+        """Validate a delivery CSV and append its new matches to the store"""
+        cols = read_columns(path)
+        missing = [c for c in REQUIRED_COLUMNS if c not in cols]
+        if missing:
+            raise ValueError(f"not a ball-by-ball file: missing {', '.join(missing)} column(s)")
+
+        with self._lock, self._file_lock(exclusive=True):
+            self._load()  # another worker may have ingested since this one last looked
+            if source_id and source_id in self.manifest["sources"]:
+                return {"ingested": False, "reason": "already ingested", "rows": 0, "new_matches": [],
+                        "skipped_matches": [], "new_players": 0, "pairs": [], "version": self.manifest["version"]}
+
+            deliveries = pd.concat(list(iter_deliveries(path, cols, chunk_rows)), ignore_index=True)
+            if deliveries.empty:
+                raise ValueError("file has no deliveries")
+            known = set(self.manifest["matches"])
+            in_file = deliveries["match"].unique().tolist()
+            skipped = [m for m in in_file if m in known]
+            deliveries = deliveries[~deliveries["match"].isin(known)]
+            result = {"ingested": False, "rows": 0, "new_matches": [m for m in in_file if m not in known],
+                      "skipped_matches": skipped, "new_players": 0, "pairs": [], "version": self.manifest["version"]}
+            if deliveries.empty:
+                result["reason"] = "all matches already ingested"
+                return result
+
+            players_before = len(self.players)
+            part = self._partition(deliveries)
+            delta = _matchup_delta(part)
+
+            version = self.manifest["version"] + 1
+            os.makedirs(self.root, exist_ok=True)
+            part_name = f"part-{version:06d}{self._ext()}"
+            matchups_name = f"matchups-{version:06d}{self._ext()}"
+            matchups = self.matchups.add(delta, fill_value=0).astype("int64")
+            self._write_frame(part, part_name)
+            self._write_frame(matchups.reset_index(), matchups_name)
+            self._write_json(self.players, "players.json")
+
+            previous_matchups = self.manifest.get("matchups")
+            manifest = dict(self.manifest)
+            manifest.update(
+                version=version,
+                matches=self.manifest["matches"] + result["new_matches"],
+                partitions=self.manifest["partitions"] + [part_name],
+                sources={**self.manifest["sources"], (source_id or part_name): {
+                    "partition": part_name, "rows": len(part), "matches": len(result["new_matches"])}},
+                matchups=matchups_name,
+            )
+            self._write_json(manifest, "manifest.json")
+            if previous_matchups:
+                os.remove(self._path(previous_matchups))
+            self.manifest, self.matchups = manifest, matchups
+            self._signature = self._manifest_signature()
+
+        names = self.names()
+        result.update(
+            ingested=True,
+            rows=len(part),
+            new_players=len(self.players) - players_before,
+            pairs=[(names[b], names[w]) for b, w in delta.index],
+            version=version,
+        )
+        print(f"[BALLS] Ingested {len(part)} deliveries from {len(result['new_matches'])} matches (v{version})")
+        return result
+
+    def _partition(self, d: pd.DataFrame) -> pd.DataFrame:
+        # Over numbers are stored 1-based whatever the source used
+        over = d["over"].astype("int16")
+        if len(over) and over.min() == 0:
+            over = over + 1
+        return pd.DataFrame({
+            "match_id": d["match"].astype(str).to_numpy(),
+            "inning": d["innings"].astype("int8").to_numpy(),
+            "over": over.to_numpy(),
+            "batter_id": self._player_ids(d["batter"]),
+            "non_striker_id": self._player_ids(d["non_striker"]),
+            "bowler_id": self._player_ids(d["bowler"]),
+            "batsman_runs": d["batter_runs"].astype("int16").to_numpy(),
+            "extra_runs": d["extras"].astype("int16").to_numpy(),
+            "total_runs": d["total_runs"].astype("int16").to_numpy(),
+            "wide": d["is_wide"].astype("int8").to_numpy(),
+            "noball": d["is_noball"].astype("int8").to_numpy(),
+            "dismissed_id": self._player_ids(d["player_out"]),
+            "dismissal_kind": d["dismissal"].to_numpy(),
+            "batting_team": d["batting_team"].to_numpy(),
+        })
+
+    # ---------- reads ----------
+
+    def names(self) -> np.ndarray:
+        """id -> name lookup array"""
+        with self._lock:
+            names = np.empty(len(self.players), dtype=object)
+            for name, pid in self.players.items():
+                names[pid] = name
+        return names
+
+    def deliveries(self, after_version: int = 0, upto_version: int = None) -> pd.DataFrame:
+        """Deliveries from partitions newer than after_version (and no newer than
+        upto_version, so a caller can pin the version it read), with player names
+        in the column layout pvp_utils expects (batsman, bowler, player_dismissed, ...)"""
+        with self._lock:
+            self._refresh()
+            partitions = self.manifest["partitions"][after_version:upto_version]
+        if not partitions:
+            return pd.DataFrame()
+        df = pd.concat([self._read_frame(name) for name in partitions], ignore_index=True)
+        names = np.append(self.names(), None)  # NO_PLAYER (-1) -> None
+        df["batsman"] = names[df.pop("batter_id").to_numpy()]
+        df["non_striker"] = names[df.pop("non_striker_id").to_numpy()]
+        df["bowler"] = names[df.pop("bowler_id").to_numpy()]
+        df["player_dismissed"] = names[df.pop("dismissed_id").to_numpy()]
+        return df
+
+    def matchup(self, batsman: str, bowler: str):
+        """Aggregated head-to-head for one pair, or None if they never met"""
+        with self._lock:
+            self._refresh()
+            b, w = self._keys.get(batsman.strip().lower()), self._keys.get(bowler.strip().lower())
+            if b is None or w is None or (b, w) not in self.matchups.index:
+                return None
+            row = self.matchups.loc[(b, w)]
+        stats = {field: int(row[field]) for field in MATCHUP_FIELDS}
+        stats["strike_rate"] = round(stats["runs"] * 100 / stats["balls"], 2) if stats["balls"] else 0.0
+        return stats
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._refresh()
+            return {
+                "version": self.manifest["version"],
+                "format": self.fmt,
+                "matches": len(self.manifest["matches"]),
+                "partitions": len(self.manifest["partitions"]),
+                "players": len(self.players),
+                "pairs": len(self.matchups),
+            }
+
+
+def _empty_matchups() -> pd.DataFrame:
+    index = pd.MultiIndex.from_arrays([[], []], names=["batter_id", "bowler_id"])
+    return pd.DataFrame({field: pd.Series(dtype="int64") for field in MATCHUP_FIELDS}, index=index)
+
+
+def _matchup_delta(part: pd.DataFrame) -> pd.DataFrame:
+    """(batter_id, bowler_id) aggregates for one partition"""
+    legal = (part["wide"] == 0) & (part["noball"] == 0)
+    runs = part["batsman_runs"]
+    frame = pd.DataFrame({
+        "batter_id": part["batter_id"],
+        "bowler_id": part["bowler_id"],
+        "balls": legal.astype("int64"),
+        "runs": runs.astype("int64"),
+        "fours": (runs == 4).astype("int64"),
+        "sixes": (runs == 6).astype("int64"),
+        "dots": ((runs == 0) & legal).astype("int64"),
+        "dismissals": (part["dismissed_id"] == part["batter_id"]).astype("int64"),
+    })
+    frame = frame[(frame["batter_id"] != NO_PLAYER) & (frame["bowler_id"] != NO_PLAYER)]
+    return frame.groupby(["batter_id", "bowler_id"]).sum()
+
+
+ball_store = BallStore()
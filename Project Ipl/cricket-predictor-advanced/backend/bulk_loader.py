@@ -0,0 +1,271 @@
+"""
+Bulk CSV Loader
+Loads every CSV under data/ into the dataset database for app.py.
+
+    python bulk_loader.py [--database-url URL] [--data-dir DIR] [--force]
+
+Each file is hashed (SHA-256) first. A file whose hash matches the
+_csv_manifest row for its table is skipped without being parsed, so a warm
+redeploy costs one hash pass over data/. Changed files are parsed in a
+process pool. Each worker infers column types (BIGINT / DOUBLE PRECISION /
+BOOLEAN / TEXT) and returns the rows already encoded for the target:
+    PostgreSQL  CSV text streamed with COPY ... FROM STDIN
+    SQLite      tuples inserted with one executemany per table
+Tables are named after their file in snake_case ("Most Runs - 2008.csv" ->
+most_runs_2008), and column names are kept as they appear in the CSV so query
+results match the CSV fallback. Each table is dropped, recreated, filled and
+indexed in its own transaction, then the manifest row is updated. Every table
+gets a leading _row BIGINT PRIMARY KEY (1-based CSV line order) that readers
+use for keyset pagination (table_cache.py). Indexes are
+built after the data is in, on lookup columns (player/team/season/venue/ids).
+On PostgreSQL the whole load runs under an advisory lock so concurrently
+starting workers do not drop each other's tables.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime
+import argparse
+import hashlib
+import io
+import multiprocessing
+import os
+import re
+import time
+
+import pandas as pd
+from sqlalchemy import create_engine
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+BULK_LOAD_WORKERS = int(os.getenv("BULK_LOAD_WORKERS", "0"))  # 0 = one per CPU
+MANIFEST_TABLE = "_csv_manifest"
+ROW_KEY = "_row"  # file order, primary key for keyset pagination
+LOAD_LOCK_KEY = 0x1C5B  # pg_advisory_lock key shared by every app worker
+MAX_IDENTIFIER = 63  # PostgreSQL limit
+INDEX_COLUMNS = {"player", "player_name", "player name", "team", "team1", "team2", "batting_team",
+                 "bowling_team", "season", "venue", "id", "match_id", "winner"}
+
+PG_TYPES = {"int": "BIGINT", "float": "DOUBLE PRECISION", "bool": "BOOLEAN", "text": "TEXT"}
+SQLITE_TYPES = {"int": "INTEGER", "float": "REAL", "bool": "INTEGER", "text": "TEXT"}
+
+
+@dataclass
+class ParsedTable:
+    table: str
+    source: str
+    sha256: str
+    columns: list
+    kinds: list
+    rows: int
+    payload: object = None  # CSV text (PostgreSQL) or list of tuples (SQLite)
+
+
+@dataclass
+class LoadReport:
+    loaded: list = field(default_factory=list)
+    skipped: list = field(default_factory=list)
+    failed: dict = field(default_factory=dict)
+    seconds: float = 0.0
+
+
+def table_name(filename: str) -> str:
+    """'Most Runs - 2008.csv' -> 'most_runs_2008'"""
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    name = re.sub(r"[^0-9a-zA-Z]+", "_", stem).strip("_").lower() or "table"
+    if name[0].isdigit():
+        name = "t_" + name
+    return name[:MAX_IDENTIFIER]
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _column_kind(series: pd.Series) -> str:
+    if pd.api.types.is_bool_dtype(series):
+        return "bool"
+    if pd.api.types.is_integer_dtype(series):
+        return "int"
+    if pd.api.types.is_float_dtype(series):
+        # whole-number floats with gaps (pandas' int + NaN) stay integers in SQL
+        values = series.dropna()
+        if len(values) and (values == values.round()).all() and values.abs().max() < 2 ** 62:
+            return "int"
+        return "float"
+    return "text"
+
+
+def _unique_columns(columns) -> list:
+    seen, out = {}, []
+    for i, col in enumerate(columns):
+        name = str(col).strip() or f"column_{i}"
+        name = name[:MAX_IDENTIFIER]
+        if name in seen:
+            seen[name] += 1
+            name = f"{name[:MAX_IDENTIFIER - 4]}_{seen[name]}"
+        seen.setdefault(name, 0)
+        out.append(name)
+    return out
+
+
+def parse_csv(path: str, sha256: str, dialect: str) -> ParsedTable:
+    """Worker: read one CSV and encode its rows for the target database"""
+    df = pd.read_csv(path, encoding="utf-8-sig", low_memory=False)
+    df.columns = _unique_columns(df.columns)
+    kinds = [_column_kind(df[col]) for col in df.columns]
+    for col, kind in zip(df.columns, kinds):
+        if kind == "int" and not pd.api.types.is_integer_dtype(df[col]):
+            df[col] = df[col].astype("Int64")
+    df.insert(0, ROW_KEY, range(1, len(df) + 1))
+    kinds.insert(0, "int")
+    if dialect == "postgresql":
+        payload = df.to_csv(index=False, header=False)
+    else:
+        payload = list(df.astype(object).where(df.notna(), None).itertuples(index=False, name=None))
+    return ParsedTable(table_name(path), os.path.basename(path), sha256, list(df.columns), kinds, len(df), payload)
+
+
+def _executor(workers: int):
+    # fork keeps the worker start cheap and never re-imports the app module;
+    # without it (Windows/macOS spawn) fall back to threads
+    if "fork" in multiprocessing.get_all_start_methods():
+        return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"))
+    return ThreadPoolExecutor(max_workers=workers)
+
+
+class BulkLoader:
+    """Loads a directory of CSVs into one database, skipping unchanged files"""
+
+    def __init__(self, engine, data_dir: str = DATA_DIR, workers: int = BULK_LOAD_WORKERS):
+        self.engine = engine
+        self.data_dir = data_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.dialect = engine.dialect.name
+        self.quote = engine.dialect.identifier_preparer.quote
+
+    def _ensure_manifest(self, cursor):
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE} ("
+            "table_name TEXT PRIMARY KEY, source TEXT, sha256 TEXT, row_count BIGINT, loaded_at TEXT)"
+        )
+
+    def _manifest(self) -> dict:
+        conn = self.engine.raw_connection()
+        try:
+            cursor = conn.cursor()
+            self._ensure_manifest(cursor)
+            conn.commit()
+            cursor.execute(f"SELECT table_name, sha256 FROM {MANIFEST_TABLE}")
+            return dict(cursor.fetchall())
+        finally:
+            conn.close()
+
+    def plan(self, force: bool = False):
+        """(files to load, tables skipped) after comparing content hashes"""
+        manifest = {} if force else self._manifest()
+        to_load, skipped = [], []
+        for name in sorted(os.listdir(self.data_dir)):
+            if not name.endswith(".csv"):
+                continue
+            path = os.path.join(self.data_dir, name)
+            sha = file_sha256(path)
+            if manifest.get(table_name(name)) == sha:
+                skipped.append(table_name(name))
+            else:
+                to_load.append((path, sha))
+        return to_load, skipped
+
+    def load(self, force: bool = False) -> LoadReport:
+        # Several app workers may start at once; on PostgreSQL one loads while
+        # the others wait on an advisory lock and then find nothing changed
+        lock_conn = self.engine.raw_connection() if self.dialect == "postgresql" else None
+        try:
+            if lock_conn is not None:
+                lock_conn.cursor().execute("SELECT pg_advisory_lock(%s)", (LOAD_LOCK_KEY,))
+            return self._load(force)
+        finally:
+            if lock_conn is not None:
+                lock_conn.cursor().execute("SELECT pg_advisory_unlock(%s)", (LOAD_LOCK_KEY,))
+                lock_conn.close()
+
+    def _load(self, force: bool) -> LoadReport:
+        started = time.perf_counter()
+        report = LoadReport()
+        to_load, report.skipped = self.plan(force)
+        if to_load:
+            workers = min(self.workers, len(to_load))
+            with _executor(workers) as pool:
+                futures = {pool.submit(parse_csv, path, sha, self.dialect): path for path, sha in to_load}
+                # write each table as soon as its worker finishes
+                for future in as_completed(futures):
+                    source = os.path.basename(futures[future])
+                    try:
+                        parsed = future.result()
+                        self._write(parsed)
+                        report.loaded.append(parsed.table)
+                        print(f"  ✓ Loaded {parsed.table} ({parsed.rows} rows)")
+                    except Exception as e:
+                        report.failed[source] = str(e)
+                        print(f"  ✗ Error loading {source}: {e}")
+        report.seconds = round(time.perf_counter() - started, 3)
+        print(f"[LOAD] {len(report.loaded)} loaded, {len(report.skipped)} unchanged, "
+              f"{len(report.failed)} failed in {report.seconds}s")
+        return report
+
+    def _write(self, parsed: ParsedTable):
+        types = PG_TYPES if self.dialect == "postgresql" else SQLITE_TYPES
+        table = self.quote(parsed.table)
+        columns = [self.quote(c) for c in parsed.columns]
+        conn = self.engine.raw_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            cursor.execute(f"CREATE TABLE {table} ("
+                           + ", ".join(f"{c} {types[k]}" + (" PRIMARY KEY" if name == ROW_KEY else "")
+                                     for name, c, k in zip(parsed.columns, columns, parsed.kinds)) + ")")
+            if self.dialect == "postgresql":
+                cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+                                   io.StringIO(parsed.payload))
+            elif parsed.payload:
+                placeholders = ", ".join("?" for _ in columns)
+                cursor.executemany(f"INSERT INTO {table} VALUES ({placeholders})", parsed.payload)
+            for col, quoted in zip(parsed.columns, columns):
+                if col.strip().lower() in INDEX_COLUMNS:
+                    index = self.quote(f"ix_{parsed.table}_{table_name(col)}"[:MAX_IDENTIFIER])
+                    cursor.execute(f"CREATE INDEX {index} ON {table} ({quoted})")
+            self._ensure_manifest(cursor)
+            cursor.execute(f"DELETE FROM {MANIFEST_TABLE} WHERE table_name = {self._param()}", (parsed.table,))
+            cursor.execute(
+                f"INSERT INTO {MANIFEST_TABLE} (table_name, source, sha256, row_count, loaded_at) "
+                f"VALUES ({', '.join(self._param() for _ in range(5))})",
+                (parsed.table, parsed.source, parsed.sha256, parsed.rows, datetime.utcnow().isoformat()),
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _param(self) -> str:
+        return "%s" if self.dialect == "postgresql" else "?"
+
+
+def load_directory(engine, data_dir: str = DATA_DIR, force: bool = False) -> LoadReport:
+    return BulkLoader(engine, data_dir).load(force)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load data/*.csv into the dataset database")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:///cricket_local.db"))
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--force", action="store_true", help="reload every file even if unchanged")
+    args = parser.parse_args()
+    url = args.database_url
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    load_directory(create_engine(url), args.data_dir, args.force)
@@ -0,0 +1,252 @@
+"""
+Email Outbox
+Persists outgoing emails in the unified database and delivers them from a
+background worker, so request handlers never wait on the mail server.
+
+The worker claims due messages in batches, sends each batch over one
+authenticated SMTP connection (kept open while mail keeps arriving) and
+reschedules failures with exponential backoff.
+"""
+
+from sqlalchemy import Column, String, Integer, DateTime, Text, Index, update
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+import random
+import smtplib
+import threading
+import uuid
+
+import email_service
+from unified_db import Base, SessionLocal
+
+STATUS_PENDING = "pending"
+STATUS_SENDING = "sending"
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+
+
+class OutboxEmail(Base):
+    """Queued email awaiting delivery"""
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    recipient = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    html_body = Column(Text, nullable=False)
+
+    status = Column(String, nullable=False, default=STATUS_PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    claim_token = Column(String, nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+
+def enqueue_email(db: Session, recipient: str, subject: str, html_body: str) -> OutboxEmail:
+    """Add an email to the outbox"""
+    entry = OutboxEmail(recipient=recipient, subject=subject, html_body=html_body)
+    db.add(entry)
+    db.commit()
+    return entry
+
+
+def _welcome_entry(recipient_email: str, user_name: str, username: str):
+    if not email_service.email_enabled():
+        print("⚠️  Email not configured. Skipping welcome email.")
+        return None
+    html_body = email_service.render_welcome_email(recipient_email, user_name, username)
+    return OutboxEmail(recipient=recipient_email, subject=email_service.WELCOME_SUBJECT, html_body=html_body)
+
+
+def queue_welcome_email(db: Session, recipient_email: str, user_name: str, username: str):
+    """Queue the welcome email for a new user. Returns the outbox entry or None."""
+    entry = _welcome_entry(recipient_email, user_name, username)
+    if entry is not None:
+        db.add(entry)
+        db.commit()
+    return entry
+
+
+async def queue_welcome_email_async(db, recipient_email: str, user_name: str, username: str):
+    """queue_welcome_email on an AsyncSession"""
+    entry = _welcome_entry(recipient_email, user_name, username)
+    if entry is not None:
+        db.add(entry)
+        await db.commit()
+    return entry
+
+
+class OutboxWorker:
+    """Background thread that drains the email outbox.
+
+    `connect` returns a ready (connected, authenticated) smtplib.SMTP; it is
+    only called when there is mail to send, and the connection is reused
+    until it has been idle for `idle_timeout` seconds.
+    """
+
+    def __init__(self, session_factory=SessionLocal, connect=email_service.open_smtp_connection,
+                 sender: str = email_service.NOREPLY_EMAIL, batch_size: int = 50,
+                 poll_interval: float = 5.0, idle_timeout: float = 30.0,
+                 max_attempts: int = 5, base_backoff: float = 30.0,
+                 max_backoff: float = 3600.0, lease_seconds: float = 300.0):
+        self.session_factory = session_factory
+        self.connect = connect
+        self.sender = sender
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.lease_seconds = lease_seconds
+
+        self._conn = None
+        self._conn_used_at = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---------------- lifecycle ----------------
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="email-outbox", daemon=True)
+        self._thread.start()
+        print("[MAIL] Outbox worker started")
+
+    def stop(self, timeout: float = 10.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        self._close_connection()
+
+    def wake(self):
+        """Signal that new mail was queued so it is sent without waiting for the next poll."""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                sent = self.run_once()
+            except Exception as e:
+                print(f"[MAIL] Outbox worker error: {e}")
+                sent = 0
+            if sent:
+                continue  # more mail may be due; drain before sleeping
+            if self._conn is not None and self._idle_for() >= self.idle_timeout:
+                self._close_connection()
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    # ---------------- delivery ----------------
+    def run_once(self) -> int:
+        """Claim and deliver one batch of due messages. Returns how many were processed."""
+        db = self.session_factory()
+        try:
+            batch = self._claim_batch(db)
+            if not batch:
+                return 0
+            for entry in batch:
+                try:
+                    self._deliver(entry)
+                except Exception as e:
+                    self._reschedule(entry, e)
+                else:
+                    entry.status = STATUS_SENT
+                    entry.sent_at = datetime.utcnow()
+                    entry.attempts += 1
+                    entry.last_error = None
+                entry.claim_token = None
+            db.commit()
+            return len(batch)
+        finally:
+            db.close()
+
+    def _claim_batch(self, db: Session) -> list:
+        now = datetime.utcnow()
+        due = (
+            db.query(OutboxEmail.id)
+            .filter(OutboxEmail.status.in_((STATUS_PENDING, STATUS_SENDING)))
+            .filter(OutboxEmail.next_attempt_at <= now)
+            .order_by(OutboxEmail.next_attempt_at)
+            .limit(self.batch_size)
+            .all()
+        )
+        if not due:
+            return []
+        # Claim atomically so several workers (one per uvicorn process) never
+        # send the same message. Expired 'sending' leases are reclaimable.
+        token = uuid.uuid4().hex
+        db.execute(
+            update(OutboxEmail)
+            .where(OutboxEmail.id.in_([row.id for row in due]))
+            .where(OutboxEmail.status.in_((STATUS_PENDING, STATUS_SENDING)))
+            .where(OutboxEmail.next_attempt_at <= now)
+            .values(status=STATUS_SENDING, claim_token=token,
+                    next_attempt_at=now + timedelta(seconds=self.lease_seconds))
+        )
+        db.commit()
+        return db.query(OutboxEmail).filter(OutboxEmail.claim_token == token).all()
+
+    def _deliver(self, entry: OutboxEmail):
+        message = email_service.build_message(entry.recipient, entry.subject, entry.html_body)
+        payload = message.as_string()
+        conn = self._connection()
+        try:
+            conn.sendmail(self.sender, [entry.recipient], payload)
+        except smtplib.SMTPServerDisconnected:
+            # Server dropped an idle connection; reconnect once and retry.
+            self._close_connection()
+            self._connection().sendmail(self.sender, [entry.recipient], payload)
+        self._conn_used_at = datetime.utcnow()
+
+    def _reschedule(self, entry: OutboxEmail, error: Exception):
+        entry.attempts += 1
+        entry.last_error = str(error)
+        if entry.attempts >= self.max_attempts:
+            entry.status = STATUS_FAILED
+            print(f"❌ Giving up on email to {entry.recipient} after {entry.attempts} attempts: {error}")
+            return
+        delay = min(self.max_backoff, self.base_backoff * (2 ** (entry.attempts - 1)))
+        delay *= random.uniform(0.8, 1.2)
+        entry.status = STATUS_PENDING
+        entry.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+        if isinstance(error, (smtplib.SMTPException, OSError)):
+            # Connection state is unknown after an SMTP/socket error.
+            self._close_connection()
+
+    # ---------------- connection reuse ----------------
+    def _connection(self) -> smtplib.SMTP:
+        if self._conn is None:
+            self._conn = self.connect()
+            self._conn_used_at = datetime.utcnow()
+        return self._conn
+
+    def _idle_for(self) -> float:
+        if self._conn_used_at is None:
+            return 0.0
+        return (datetime.utcnow() - self._conn_used_at).total_seconds()
+
+    def _close_connection(self):
+        if self._conn is None:
+            return
+        try:
+            self._conn.quit()
+        except Exception:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+        self._conn = None
+        self._conn_used_at = None
+
+
+outbox_worker = OutboxWorker()
@@ -1,4 +1,7 @@
 import smtplib
+import html
+import string
+from functools import lru_cache
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import os
@@ -10,22 +13,16 @@ EMAIL_SENDER = os.getenv("EMAIL_SENDER", "noreply.wicketly@gmail.com")
 EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD", "")
 SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
 SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").lower() not in ("0", "false", "no")
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
 NOREPLY_EMAIL = os.getenv("NOREPLY_EMAIL", "noreply.wicketly@gmail.com")
 EMAIL_LOGIN_USERNAME = os.getenv("EMAIL_LOGIN_USERNAME", "")
+REPLY_TO_EMAIL = "support@wicketly.com"
 
-def send_welcome_email(recipient_email: str, user_name: str, username: str):
-    """
-    Send welcome email to new user with services information.
-    Uses noreply email address so users cannot reply.
-    """
-    if not EMAIL_PASSWORD:
-        print("⚠️  Email not configured. Skipping email send.")
-        return False
-    
-    try:
-        subject = "Welcome to Wicketly.AI! 🏏"
-        
-        html_content = f"""
+WELCOME_SUBJECT = "Welcome to Wicketly.AI! 🏏"
+
+# Template placeholders use str.format syntax; literal CSS braces are doubled.
+WELCOME_HTML_TEMPLATE = """
         <html>
             <head>
                 <style>
@@ -109,24 +106,92 @@ def send_welcome_email(recipient_email: str, user_name: str, username: str):
                 </div>
             </body>
         </html>
-        """
-        
-        # Create message
-        message = MIMEMultipart("alternative")
-        message["Subject"] = subject
-        message["From"] = NOREPLY_EMAIL
-        message["To"] = recipient_email
-        message["Reply-To"] = f"support@wicketly.com"  # Direct replies to support if user tries
-        
-        # Attach HTML content
-        message.attach(MIMEText(html_content, "html"))
-        
-        # Send email using noreply account
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
+"""
+
+
+def email_enabled() -> bool:
+    """Email delivery is only attempted once SMTP credentials are configured."""
+    return bool(EMAIL_PASSWORD)
+
+
+@lru_cache(maxsize=16)
+def _compile_template(template: str) -> tuple:
+    """Split a str.format template into (literal, field) parts once.
+
+    Rendering then becomes a single join instead of re-parsing the ~5 KB
+    template for every message.
+    """
+    return tuple(string.Formatter().parse(template))
+
+
+def render_template(template: str, **context) -> str:
+    """Render a compiled template, HTML-escaping every substituted value."""
+    out = []
+    for literal, field, _spec, _conv in _compile_template(template):
+        out.append(literal)
+        if field is not None:
+            out.append(html.escape(str(context[field])))
+    return "".join(out)
+
+
+def render_welcome_email(recipient_email: str, user_name: str, username: str) -> str:
+    """Render the welcome email HTML body"""
+    return render_template(
+        WELCOME_HTML_TEMPLATE,
+        recipient_email=recipient_email,
+        user_name=user_name,
+        username=username,
+    )
+
+
+def build_message(recipient_email: str, subject: str, html_content: str) -> MIMEMultipart:
+    """Build a noreply MIME message with an HTML body"""
+    message = MIMEMultipart("alternative")
+    message["Subject"] = subject
+    message["From"] = NOREPLY_EMAIL
+    message["To"] = recipient_email
+    message["Reply-To"] = REPLY_TO_EMAIL  # Direct replies to support if user tries
+    message.attach(MIMEText(html_content, "html"))
+    return message
+
+
+def open_smtp_connection() -> smtplib.SMTP:
+    """Open an authenticated SMTP connection using the configured server.
+
+    Callers own the connection and may reuse it for several messages.
+    """
+    server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=SMTP_TIMEOUT)
+    try:
+        if SMTP_USE_TLS:
             server.starttls()
+        if EMAIL_PASSWORD:
             # Allow providers where login username is different (e.g. SendGrid uses 'apikey')
             login_user = EMAIL_LOGIN_USERNAME if EMAIL_LOGIN_USERNAME else EMAIL_SENDER
             server.login(login_user, EMAIL_PASSWORD)
+    except Exception:
+        server.close()
+        raise
+    return server
+
+
+def send_welcome_email(recipient_email: str, user_name: str, username: str):
+    """
+    Send welcome email to new user with services information.
+    Uses noreply email address so users cannot reply.
+
+    This sends synchronously on a fresh connection; request handlers should
+    use email_outbox.queue_welcome_email instead.
+    """
+    if not email_enabled():
+        print("⚠️  Email not configured. Skipping email send.")
+        return False
+    
+    try:
+        html_content = render_welcome_email(recipient_email, user_name, username)
+        message = build_message(recipient_email, WELCOME_SUBJECT, html_content)
+        
+        # Send email using noreply account
+        with open_smtp_connection() as server:
             server.sendmail(NOREPLY_EMAIL, recipient_email, message.as_string())
         
         print(f"✅ Welcome email sent to {recipient_email} from {NOREPLY_EMAIL}")
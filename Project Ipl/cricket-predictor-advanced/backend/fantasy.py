@@ -0,0 +1,411 @@
+"""
+Fantasy XI Optimizer
+Projected fantasy points per player and an integer-programming lineup solver.
+
+Projections come from the per-season "Most Runs - YYYY.csv" and
+"Most Wickets - YYYY.csv" tables. Each season is scored with
+Dream11-style points (run 1, four +1, six +2, fifty +8, hundred +16,
+wicket 25, 4-wicket haul +8, 5-wicket haul +16) and converted to points per
+match. Recent seasons weigh more, with weight RECENCY_DECAY ** age. Small
+samples are shrunk toward the median player. Roles are inferred from the
+batting/bowling split, and wicketkeepers come from a curated list because
+the datasets carry no keeping data. Credits (7.0-11.0) follow the
+projection percentile.
+
+The lineup is a 0/1 MILP solved with scipy.optimize.milp (HiGHS):
+    maximize    sum(points_i * x_i)
+    subject to  sum(x_i) = 11, sum(credits_i * x_i) <= budget,
+                role minimum/maximum per WK/BAT/AR/BOWL,
+                at most MAX_PER_TEAM players from any one team.
+The top K lineups are found by re-solving with a no-good cut that forbids
+each lineup already returned.
+
+Projections are computed once per dataset version (file size and mtime) and
+solved lineups are memoized. Players dominated by enough cheaper, better
+same-role players are pruned before solving. HiGHS spends most of each solve
+on root processing (~20-70ms here), so after the first lineup the players
+that reduced costs rule out of the top K are fixed and the follow-up solves
+run on a few dozen columns. warm() pre-solves the default requests in the
+background at startup.
+"""
+
+from collections import OrderedDict
+import glob
+import os
+import re
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import LinearConstraint, Bounds, linprog, milp
+
+import shared_datasets
+from metrics import timed_load
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+FANTASY_SEASONS = int(os.getenv("FANTASY_SEASONS", "3"))
+RECENCY_DECAY = float(os.getenv("FANTASY_RECENCY_DECAY", "0.6"))
+SHRINK_MATCHES = 3.0
+SQUAD_SIZE = 11
+MAX_PER_TEAM = 7
+MIN_CREDITS, MAX_CREDITS = 7.0, 11.0
+ROLE_LIMITS = {"WK": (1, 4), "BAT": (3, 6), "AR": (1, 4), "BOWL": (3, 6)}
+RESULT_CACHE_SIZE = 256
+MAX_LINEUPS = int(os.getenv("FANTASY_MAX_LINEUPS", "10"))
+
+WICKETKEEPERS = {
+    "MS Dhoni", "Rishabh Pant", "Jos Buttler", "KL Rahul", "Sanju Samson", "Quinton de Kock",
+    "Ishan Kishan", "Dinesh Karthik", "Wriddhiman Saha", "Nicholas Pooran", "Jonny Bairstow",
+    "Jitesh Sharma", "Matthew Wade", "Anuj Rawat", "Srikar Bharat", "Sam Billings", "Tim Seifert",
+    "Glenn Phillips", "Prabhsimran Singh", "Sheldon Jackson", "Narayan Jagadeesan", "Alex Carey",
+    "Tom Banton", "Heinrich Klaasen", "Phil Salt", "Parthiv Patel",
+}
+
+
+def name_key(name: str) -> str:
+    """'K L Rahul' / 'KL Rahul' / 'K.L. Rahul' -> 'klrahul'"""
+    return re.sub(r"[^a-z]", "", str(name).lower())
+
+
+_KEEPER_KEYS = {name_key(n) for n in WICKETKEEPERS}
+# "K.S Bharat" and "Jagadeesan Narayan" style variants
+_KEEPER_KEYS |= {"ksbharat", "jagadeesannarayan"}
+
+
+def _season_files(data_dir: str):
+    seasons = {}
+    for path in glob.glob(os.path.join(data_dir, "Most Runs - *.csv")):
+        year = os.path.basename(path)[len("Most Runs - "):-4]
+        wickets = os.path.join(data_dir, f"Most Wickets - {year}.csv")
+        if year.isdigit():
+            seasons[int(year)] = (path, wickets if os.path.exists(wickets) else None)
+    return [(year, *seasons[year]) for year in sorted(seasons)]
+
+
+def dataset_signature(data_dir: str = DATA_DIR, seasons: int = FANTASY_SEASONS):
+    files = _season_files(data_dir)[-seasons:]
+    sig = []
+    for year, runs_path, wkts_path in files:
+        for path in (runs_path, wkts_path):
+            if path:
+                st = os.stat(path)
+                sig.append((os.path.basename(path), st.st_size, st.st_mtime_ns))
+    return tuple(sig)
+
+
+def _num(series):
+    return pd.to_numeric(series, errors="coerce").fillna(0)
+
+
+def _season_points(runs_path: str, wkts_path: str) -> pd.DataFrame:
+    """Per-player fantasy points and matches for one season"""
+    bat = pd.read_csv(runs_path)
+    fifties, hundreds = _num(bat["50"]), _num(bat["100"])
+    bat = pd.DataFrame({
+        "key": bat["Player"].map(name_key),
+        "name": bat["Player"].astype(str).str.strip(),
+        "bat_pts": _num(bat["Runs"]) + _num(bat["4s"]) + 2 * _num(bat["6s"]) + 8 * fifties + 16 * hundreds,
+        "bat_mat": _num(bat["Mat"]),
+    })
+    if wkts_path:
+        bowl = pd.read_csv(wkts_path)
+        bowl = pd.DataFrame({
+            "key": bowl["Player"].map(name_key),
+            "name": bowl["Player"].astype(str).str.strip(),
+            "bowl_pts": 25 * _num(bowl["Wkts"]) + 8 * _num(bowl["4w"]) + 16 * _num(bowl["5w"]),
+            "bowl_mat": _num(bowl["Mat"]),
+        })
+    else:
+        bowl = pd.DataFrame(columns=["key", "name", "bowl_pts", "bowl_mat"])
+    season = bat.groupby("key").agg(name=("name", "first"), bat_pts=("bat_pts", "sum"), bat_mat=("bat_mat", "max")).join(
+        bowl.groupby("key").agg(bowl_name=("name", "first"), bowl_pts=("bowl_pts", "sum"), bowl_mat=("bowl_mat", "max")),
+        how="outer",
+    )
+    season["name"] = season["name"].fillna(season["bowl_name"])
+    season = season.drop(columns="bowl_name").fillna({"bat_pts": 0, "bat_mat": 0, "bowl_pts": 0, "bowl_mat": 0})
+    season["matches"] = season[["bat_mat", "bowl_mat"]].max(axis=1)
+    return season[["name", "bat_pts", "bowl_pts", "matches"]]
+
+
+@timed_load("fantasy_projections")
+def build_projections(data_dir: str = DATA_DIR, seasons: int = FANTASY_SEASONS) -> pd.DataFrame:
+    """One row per player: name, role, projected points per match, credits"""
+    files = _season_files(data_dir)[-seasons:]
+    if not files:
+        raise FileNotFoundError("no 'Most Runs - YYYY.csv' files found")
+    latest = files[-1][0]
+    frames = []
+    for year, runs_path, wkts_path in files:
+        season = _season_points(runs_path, wkts_path)
+        weight = RECENCY_DECAY ** (latest - year)
+        season[["bat_pts", "bowl_pts", "matches"]] *= weight
+        season["recency"] = year
+        frames.append(season.reset_index())
+    allseasons = pd.concat(frames, ignore_index=True)
+    # newest spelling wins for display
+    names = allseasons.sort_values("recency").groupby("key")["name"].last()
+    totals = allseasons.groupby("key")[["bat_pts", "bowl_pts", "matches"]].sum()
+    totals = totals[totals["matches"] > 0]
+
+    bat_pm = totals["bat_pts"] / totals["matches"]
+    bowl_pm = totals["bowl_pts"] / totals["matches"]
+    raw = bat_pm + bowl_pm
+    prior = float(raw.median())
+    m = totals["matches"]
+    points = (raw * m + prior * SHRINK_MATCHES) / (m + SHRINK_MATCHES)
+
+    role = np.where(bowl_pm > bat_pm, "BOWL", "BAT")
+    role = np.where((bat_pm >= 12) & (bowl_pm >= 10), "AR", role)
+    role = np.where(totals.index.isin(list(_KEEPER_KEYS)), "WK", role)
+
+    pct = points.rank(pct=True)
+    credits = (MIN_CREDITS + (MAX_CREDITS - MIN_CREDITS) * pct).mul(2).round().div(2)
+
+    out = pd.DataFrame({
+        "name": names.reindex(totals.index),
+        "role": role,
+        "projected_points": points.round(2),
+        "bat_points": bat_pm.round(2),
+        "bowl_points": bowl_pm.round(2),
+        "credits": credits,
+    }, index=totals.index)
+    return out.sort_values("projected_points", ascending=False)
+
+
+class FantasyOptimizer:
+    """Cached projections plus memoized top-K lineup solving"""
+
+    def __init__(self, data_dir: str = DATA_DIR, seasons: int = FANTASY_SEASONS, team_of: dict = None):
+        self.data_dir = data_dir
+        self.seasons = seasons
+        self.team_of = team_of or {}
+        self._lock = threading.Lock()
+        self._signature = None
+        self._projections = None
+        self._results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def projections(self) -> pd.DataFrame:
+        shared_version, projections = None, None
+        if shared_datasets.enabled() and (self.data_dir, self.seasons) == (DATA_DIR, FANTASY_SEASONS):
+            shared_version, projections = shared_datasets.shared.get_versioned("projections")
+        signature = ("shared", shared_version) if projections is not None \
+            else dataset_signature(self.data_dir, self.seasons)
+        with self._lock:
+            if self._projections is not None and signature == self._signature:
+                return self._projections
+        if projections is None:
+            projections = build_projections(self.data_dir, self.seasons)
+        with self._lock:
+            self._projections, self._signature = projections, signature
+            self._results.clear()
+        print(f"[FANTASY] Projected {len(projections)} players from {self.seasons} seasons")
+        return projections
+
+    def recommend(self, budget: float = 100, k: int = 1, squad: list = None,
+                  max_per_team: int = MAX_PER_TEAM) -> dict:
+        """Top-k lineups. `squad` (optional) is [{name, team?, role?}] restricting the pool."""
+        k = max(1, min(int(k), MAX_LINEUPS))
+        projections = self.projections()
+        squad_key = tuple(sorted((name_key(p.get("name", "")), str(p.get("team") or ""), str(p.get("role") or ""))
+                                 for p in squad)) if squad else None
+        cache_key = (float(budget), int(k), squad_key, max_per_team)
+        with self._lock:
+            cached = self._results.get(cache_key)
+            if cached is not None:
+                self.hits += 1
+                self._results.move_to_end(cache_key)
+                return cached
+            self.misses += 1
+
+        pool = projections.copy()
+        pool["team"] = None
+        unmatched = []
+        if squad:
+            overrides = {name_key(p.get("name", "")): p for p in squad}
+            pool = pool[pool.index.isin(list(overrides))].copy()
+            pool["team"] = [overrides[key].get("team") for key in pool.index]
+            pool["role"] = [_role(overrides[key].get("role"), role) for key, role in zip(pool.index, pool["role"])]
+            # no recent stats, so no projection: reported instead of silently dropped
+            unmatched = [p.get("name") for key, p in overrides.items() if key not in pool.index]
+        elif self.team_of:
+            pool["team"] = [self.team_of.get(name) for name in pool["name"]]
+
+        started = time.perf_counter()
+        lineups = solve_lineups(pool, budget, k, max_per_team)
+        result = {
+            "lineups": lineups,
+            "pool_size": len(pool),
+            "unmatched": unmatched,
+            "solve_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+        with self._lock:
+            self._results[cache_key] = result
+            if len(self._results) > RESULT_CACHE_SIZE:
+                self._results.popitem(last=False)
+        return result
+
+    def warm(self, budgets=(100,), ks=(1, 3)):
+        """Build projections and pre-solve the common requests"""
+        started = time.perf_counter()
+        try:
+            for budget in budgets:
+                for k in ks:
+                    self.recommend(budget, k)
+        except Exception as e:
+            print(f"[FANTASY] Warm-up failed: {e}")
+            return
+        print(f"[FANTASY] Warmed {len(budgets) * len(ks)} lineups in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    def start_warmup(self, **kwargs):
+        threading.Thread(target=self.warm, kwargs=kwargs, name="fantasy-warmup", daemon=True).start()
+
+
+def _role(value, default: str) -> str:
+    role = str(value or "").upper()
+    return role if role in ROLE_LIMITS else default
+
+
+def prune_dominated(pool: pd.DataFrame, k: int = 1, role_limits: dict = None) -> pd.DataFrame:
+    """Drop players that cannot appear in any of the top-k lineups.
+
+    A player is dominated by a same-role player who costs no more and projects
+    no fewer points (strictly better in one). If a player has at least
+    max_role + k - 1 dominators that are free to swap in (same team or no team),
+    any lineup containing them admits k distinct swaps that are at least as
+    good, so they can be removed before solving without changing the answer.
+    """
+    role_limits = role_limits or ROLE_LIMITS
+    keep = np.ones(len(pool), dtype=bool)
+    points = pool["projected_points"].to_numpy(dtype=float)
+    credits = pool["credits"].to_numpy(dtype=float)
+    roles = pool["role"].to_numpy()
+    teams = pool["team"].to_numpy(dtype=object)
+    no_team = pd.isna(teams)
+    for role, (_, hi) in role_limits.items():
+        idx = np.flatnonzero(roles == role)
+        if len(idx) == 0:
+            continue
+        p, c, t = points[idx], credits[idx], teams[idx]
+        dominates = ((c[:, None] <= c[None, :]) & (p[:, None] >= p[None, :])
+                     & ((c[:, None] < c[None, :]) | (p[:, None] > p[None, :])))
+        # a dominator with a different team could break the per-team cap when swapped in
+        swappable = no_team[idx][:, None] | (t[:, None] == t[None, :])
+        keep[idx] = (dominates & swappable).sum(axis=0) < hi + max(1, k) - 1
+    return pool[keep]
+
+
+def solve_lineups(pool: pd.DataFrame, budget: float, k: int = 1, max_per_team: int = MAX_PER_TEAM,
+                  role_limits: dict = None, squad_size: int = SQUAD_SIZE) -> list:
+    """Best k distinct lineups from `pool` (columns: name, role, projected_points, credits, team)"""
+    role_limits = role_limits or ROLE_LIMITS
+    pool = prune_dominated(pool, k, role_limits)
+    n = len(pool)
+    if n < squad_size:
+        return []
+    points = pool["projected_points"].to_numpy(dtype=float)
+    credits = pool["credits"].to_numpy(dtype=float)
+    roles = pool["role"].to_numpy()
+
+    rows, lower, upper = [np.ones(n), credits], [squad_size, 0], [squad_size, budget]
+    for role, (lo, hi) in role_limits.items():
+        rows.append((roles == role).astype(float))
+        lower.append(lo)
+        upper.append(hi)
+    teams = pool["team"].to_numpy(dtype=object)
+    for team in {t for t in teams if not pd.isna(t) and t}:
+        rows.append((teams == team).astype(float))
+        lower.append(0)
+        upper.append(max_per_team)
+
+    lineups = []
+    free, fixed = np.ones(n, dtype=bool), np.zeros(n)
+    for _ in range(max(1, k)):
+        matrix = np.vstack(rows)
+        offset = matrix[:, ~free] @ fixed[~free]
+        constraints = LinearConstraint(matrix[:, free], np.asarray(lower) - offset, np.asarray(upper) - offset)
+        res = milp(-points[free], constraints=constraints, integrality=np.ones(free.sum()),
+                   bounds=Bounds(fixed[free], 1), options={"presolve": False})
+        if res.x is None or not res.success:
+            break
+        chosen = np.concatenate([np.flatnonzero(free)[res.x > 0.5], np.flatnonzero(~free & (fixed > 0))])
+        lineups.append(_lineup(pool.iloc[chosen]))
+        if len(lineups) == 1 and k > 1:
+            free, fixed = _fix_by_reduced_cost(points, credits, roles, teams, matrix, lower, upper,
+                                               chosen, k, budget, max_per_team)
+        # no-good cut: the next lineup must differ by at least one player
+        cut = np.zeros(n)
+        cut[chosen] = 1
+        rows.append(cut)
+        lower.append(0)
+        upper.append(squad_size - 1)
+    return lineups
+
+
+def _fix_by_reduced_cost(points, credits, roles, teams, rows, lower, upper, chosen, k, budget, max_per_team):
+    """(free, fixed): variables that can be left out of the remaining solves, and their values.
+
+    The best lineup and its single-swap neighbours are k distinct feasible
+    lineups, so the k-th best of them is a lower bound on the true k-th best.
+    The LP relaxation's reduced costs bound the best lineup with a player
+    forced in (or out). Players whose bound falls below the k-th best cannot
+    change any of the top-k lineups and are fixed, so the follow-up solves
+    see a few dozen columns instead of the whole pool.
+    """
+    n = len(points)
+    free, fixed = np.ones(n, dtype=bool), np.zeros(n)
+    in_lineup = np.zeros(n, dtype=bool)
+    in_lineup[chosen] = True
+    best = points[chosen].sum()
+    spare = budget - credits[chosen].sum()
+    outside = np.flatnonzero(~in_lineup)
+    counts = pd.Series(teams[chosen]).value_counts()
+    swaps = []
+    for i in chosen:
+        j = outside[(roles[outside] == roles[i]) & (credits[outside] - credits[i] <= spare + 1e-9)]
+        capped = np.array([not pd.isna(t) and t != teams[i] and counts.get(t, 0) >= max_per_team for t in teams[j]],
+                          dtype=bool)
+        swaps.append(best - points[i] + points[j[~capped]])
+    swaps = np.sort(np.concatenate(swaps))[::-1]
+    if len(swaps) < k - 1:
+        return free, fixed
+    kth_best = swaps[k - 2]
+
+    lower, upper = np.asarray(lower, dtype=float), np.asarray(upper, dtype=float)
+    eq = lower == upper
+    res = linprog(-points, A_ub=np.vstack([rows[~eq], -rows[~eq]]), b_ub=np.concatenate([upper[~eq], -lower[~eq]]),
+                  A_eq=rows[eq], b_eq=upper[eq], bounds=(0, 1), method="highs")
+    if res.status != 0:
+        return free, fixed
+    relaxed = -res.fun
+    tol = 1e-6 * max(1.0, abs(kth_best))
+    left_out = (relaxed - res.lower.marginals < kth_best - tol) & ~in_lineup
+    kept_in = (relaxed + res.upper.marginals < kth_best - tol) & in_lineup
+    free[left_out | kept_in] = False
+    fixed[kept_in] = 1
+    return free, fixed
+
+
+def _lineup(selected: pd.DataFrame) -> dict:
+    selected = selected.sort_values("projected_points", ascending=False)
+    players = [
+        {
+            "name": row.name_,
+            "role": row.role,
+            "team": row.team,
+            "credits": float(row.credits),
+            "projected_points": float(row.projected_points),
+        }
+        for row in selected.rename(columns={"name": "name_"}).itertuples(index=False)
+    ]
+    return {
+        "players": players,
+        "projected_points": round(float(selected["projected_points"].sum()), 2),
+        "credits_used": float(selected["credits"].sum()),
+        "roles": {role: int((selected["role"] == role).sum()) for role in ROLE_LIMITS},
+        "captain": players[0]["name"],
+        "vice_captain": players[1]["name"],
+    }
+
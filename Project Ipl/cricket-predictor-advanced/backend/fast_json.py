@@ -0,0 +1,63 @@
+"""
+Fast JSON Responses
+orjson-backed response class and DataFrame-to-JSON helpers for the API.
+
+FastJSONResponse is the app's default response class. orjson writes numpy
+scalars/arrays natively and encodes NaN/Infinity as null, so DataFrame-derived
+values never fail serialization. When orjson is not installed it falls back
+to the standard library encoder (with NaN mapped to null the slow way).
+
+dataframe_response() builds the body straight from the DataFrame with
+DataFrame.to_json(orient="records"), skipping the to_dict() round trip and
+FastAPI's jsonable_encoder pass over every row.
+"""
+
+from fastapi.responses import JSONResponse, Response
+import json
+import math
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+def _clean_nans(value):
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, dict):
+        return {k: _clean_nans(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_clean_nans(v) for v in value]
+    return value
+
+
+def dumps(content) -> bytes:
+    """Serialize to compact JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(_clean_nans(content), ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson"""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def dataframe_json(df) -> bytes:
+    """DataFrame rows as a JSON array of objects (NaN -> null)"""
+    return df.to_json(orient="records", force_ascii=False, date_format="iso").encode("utf-8")
+
+
+def dataframe_response(key: str, df, **extra) -> Response:
+    """Response with body {key: [rows...], **extra}, rows serialized column-wise by pandas"""
+    body = b'{' + dumps(key) + b':' + dataframe_json(df)
+    if extra:
+        body += b',' + dumps(extra)[1:]
+    else:
+        body += b'}'
+    return Response(content=body, media_type=JSON_MEDIA_TYPE)
@@ -0,0 +1,50 @@
+"""
+Gunicorn Configuration
+Preload-and-fork startup for app.py (Flask) and api.py (FastAPI).
+
+    gunicorn -c gunicorn.conf.py app:app
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker api:app
+
+The master imports the app and warms its datasets once (preload.warm). It
+then freezes the heap and forks the workers, which share the loaded pages
+copy-on-write instead of each loading its own copy. Set GUNICORN_PRELOAD=0
+to get the old behaviour (every worker imports the app itself).
+
+Each worker logs its RSS/PSS right after startup and again when it exits.
+scripts/measure_worker_memory.py compares the two modes end to end.
+"""
+
+import gc
+import os
+
+import preload
+
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '5000')}")
+workers = int(os.getenv("GUNICORN_WORKERS", "4"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") != "0"
+
+if preload_app:
+    # No collections while the app is imported in the master: the heap is
+    # frozen as one block in when_ready instead
+    gc.disable()
+
+
+def when_ready(server):
+    if preload_app:
+        preload.warm()
+        preload.freeze()
+    server.log.info(f"[PRELOAD] master {os.getpid()}: {preload.format_usage(preload.memory_usage())}")
+
+
+def post_fork(server, worker):
+    if preload_app:
+        preload.after_fork()
+
+
+def post_worker_init(worker):
+    worker.log.info(f"[PRELOAD] worker {os.getpid()} started: {preload.format_usage(preload.memory_usage())}")
+
+
+def worker_exit(server, worker):
+    server.log.info(f"[PRELOAD] worker {worker.pid} exiting: {preload.format_usage(preload.memory_usage())}")
@@ -0,0 +1,278 @@
+"""
+Request Metrics
+Per-route latency/payload histograms, DB query timings, cache hit rates and
+dataset load timings. They are exposed in Prometheus text format at /metrics.
+
+MetricsMiddleware is plain ASGI. It runs on the event loop thread, so its
+counters need no lock. Per request it does two perf_counter() calls, two
+bisects and a few list increments (a few microseconds). Requests are
+labelled with the matched route template (/team/{team_name}), not the raw
+path, so the number of series stays bounded. Unmatched paths share one
+label.
+
+DB timings come from SQLAlchemy cursor events on the engines passed to
+instrument_engine(). Those run in threadpool threads and are updated under
+a lock. Cache hit rates are read from the caches' own counters at scrape
+time, through register_cache(). Dataset loaders report their duration with
+`with load_timer("name"):`, which /health/deep shows.
+
+All numbers are per process, like /_admin/cache_stats. With several workers
+each scrape sees the worker that answered it.
+"""
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+import os
+import threading
+import time
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+UNMATCHED_ROUTE = "<unmatched>"
+MAX_ROUTE_MEMO = 10000
+STARTED_AT = time.time()
+
+
+class Histogram:
+    """Cumulative-on-export histogram: per-bucket counts, sum and count"""
+
+    __slots__ = ("bounds", "counts", "total", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def lines(self, name: str, labels: str):
+        sep = "," if labels else ""
+        running = 0
+        for bound, n in zip(self.bounds, self.counts):
+            running += n
+            yield f'{name}_bucket{{{labels}{sep}le="{bound}"}} {running}'
+        yield f'{name}_bucket{{{labels}{sep}le="+Inf"}} {self.count}'
+        yield f"{name}_sum{{{labels}}} {self.total:.6f}"
+        yield f"{name}_count{{{labels}}} {self.count}"
+
+
+class Registry:
+    def __init__(self):
+        self.requests = {}   # (method, route, status) -> count
+        self.latency = {}    # (method, route) -> Histogram
+        self.response_bytes = {}  # route -> Histogram
+        self.request_bytes = {}   # route -> Histogram
+        self.in_flight = 0
+        self.db = {}         # statement verb -> Histogram
+        self.db_errors = 0
+        self._db_lock = threading.Lock()
+        self.spans = {}      # span name -> Histogram (profiling.span)
+        self._span_lock = threading.Lock()
+        self.caches = {}     # name -> callable returning (hits, misses)
+        self.loads = {}      # dataset -> {"seconds", "at", "count"}
+
+    def observe_request(self, method, route, status, seconds, request_size, response_size):
+        key = (method, route, status)
+        self.requests[key] = self.requests.get(key, 0) + 1
+        hist = self.latency.get((method, route))
+        if hist is None:
+            hist = self.latency[(method, route)] = Histogram(LATENCY_BUCKETS)
+        hist.observe(seconds)
+        for table, size in ((self.response_bytes, response_size), (self.request_bytes, request_size)):
+            hist = table.get(route)
+            if hist is None:
+                hist = table[route] = Histogram(SIZE_BUCKETS)
+            hist.observe(size)
+
+    def observe_query(self, verb: str, seconds: float):
+        with self._db_lock:
+            hist = self.db.get(verb)
+            if hist is None:
+                hist = self.db[verb] = Histogram(DB_BUCKETS)
+            hist.observe(seconds)
+
+    def observe_span(self, name: str, seconds: float):
+        with self._span_lock:
+            hist = self.spans.get(name)
+            if hist is None:
+                hist = self.spans[name] = Histogram(LATENCY_BUCKETS)
+            hist.observe(seconds)
+
+    def record_load(self, name: str, seconds: float):
+        entry = self.loads.setdefault(name, {"count": 0})
+        entry.update(seconds=round(seconds, 4), at=time.time(), count=entry["count"] + 1)
+
+    # ---------- export ----------
+
+    def cache_counts(self) -> dict:
+        out = {}
+        for name, read in list(self.caches.items()):
+            try:
+                hits, misses = read()
+            except Exception:
+                continue
+            out[name] = (int(hits), int(misses))
+        return out
+
+    def render(self) -> str:
+        lines = [
+            "# HELP http_requests_total Requests by method, route and status",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route, status), n in sorted(self.requests.items()):
+            lines.append(f'http_requests_total{{method="{method}",route="{_escape(route)}",status="{status}"}} {n}')
+        lines += ["# HELP http_request_duration_seconds Request latency",
+                  "# TYPE http_request_duration_seconds histogram"]
+        for (method, route), hist in sorted(self.latency.items()):
+            lines.extend(hist.lines("http_request_duration_seconds", f'method="{method}",route="{_escape(route)}"'))
+        for metric, table, what in (("http_response_size_bytes", self.response_bytes, "Response body size"),
+                                    ("http_request_size_bytes", self.request_bytes, "Request body size")):
+            lines += [f"# HELP {metric} {what}", f"# TYPE {metric} histogram"]
+            for route, hist in sorted(table.items()):
+                lines.extend(hist.lines(metric, f'route="{_escape(route)}"'))
+        lines += ["# HELP http_requests_in_flight Requests being served",
+                  "# TYPE http_requests_in_flight gauge", f"http_requests_in_flight {self.in_flight}"]
+
+        lines += ["# HELP db_query_duration_seconds Database statement time by verb",
+                  "# TYPE db_query_duration_seconds histogram"]
+        with self._db_lock:
+            for verb, hist in sorted(self.db.items()):
+                lines.extend(hist.lines("db_query_duration_seconds", f'verb="{verb}"'))
+            lines += ["# TYPE db_query_errors_total counter", f"db_query_errors_total {self.db_errors}"]
+
+        lines += ["# HELP span_duration_seconds Time spent in instrumented code paths",
+                  "# TYPE span_duration_seconds histogram"]
+        with self._span_lock:
+            for name, hist in sorted(self.spans.items()):
+                lines.extend(hist.lines("span_duration_seconds", f'span="{_escape(name)}"'))
+
+        counts = self.cache_counts()
+        lines += ["# HELP cache_hits_total Cache hits", "# TYPE cache_hits_total counter"]
+        lines += [f'cache_hits_total{{cache="{name}"}} {hits}' for name, (hits, _) in sorted(counts.items())]
+        lines += ["# HELP cache_misses_total Cache misses", "# TYPE cache_misses_total counter"]
+        lines += [f'cache_misses_total{{cache="{name}"}} {misses}' for name, (_, misses) in sorted(counts.items())]
+
+        lines += ["# HELP dataset_load_seconds Duration of the last load of each dataset",
+                  "# TYPE dataset_load_seconds gauge"]
+        lines += [f'dataset_load_seconds{{dataset="{name}"}} {entry["seconds"]}'
+                  for name, entry in sorted(self.loads.items())]
+        lines += ["# TYPE process_start_time_seconds gauge", f"process_start_time_seconds {STARTED_AT:.0f}"]
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+registry = Registry()
+
+
+# ==================== HOOKS ====================
+
+def register_cache(name: str, read):
+    """`read()` returns (hits, misses) for the named cache"""
+    registry.caches[name] = read
+
+
+@contextmanager
+def load_timer(name: str):
+    started = time.perf_counter()
+    yield
+    registry.record_load(name, time.perf_counter() - started)
+
+
+def timed_load(name: str):
+    """Decorator form of load_timer"""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with load_timer(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def instrument_engine(engine):
+    """Time every statement run through a (sync) SQLAlchemy engine"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["metrics_started"].pop()
+        verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        registry.observe_query(verb, time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        stack = context.connection.info.get("metrics_started") if context.connection is not None else None
+        if stack:
+            stack.pop()
+        with registry._db_lock:
+            registry.db_errors += 1
+
+
+def health_snapshot() -> dict:
+    return {
+        "pid": os.getpid(),
+        "uptime_s": round(time.time() - STARTED_AT, 1),
+        "in_flight": registry.in_flight,
+        "loads": {name: dict(entry) for name, entry in registry.loads.items()},
+        "caches": {name: {"hits": h, "misses": m, "hit_rate": round(h / (h + m), 4) if h + m else 0.0}
+                   for name, (h, m) in registry.cache_counts().items()},
+    }
+
+
+# ==================== MIDDLEWARE ====================
+
+class MetricsMiddleware:
+    """Records latency, status and payload sizes for every HTTP request"""
+
+    def __init__(self, app, registry: Registry = registry, skip=("/metrics",)):
+        self.app = app
+        self.registry = registry
+        self.skip = set(skip)
+        # path -> route template, for responses served before routing (response cache hits)
+        self._routes = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip:
+            await self.app(scope, receive, send)
+            return
+        reg = self.registry
+        state = {"status": 500, "bytes": 0}
+        request_size = 0
+        for name, value in scope.get("headers", ()):
+            if name == b"content-length":
+                request_size = int(value or 0)
+                break
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                state["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        reg.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            reg.in_flight -= 1
+            route = getattr(scope.get("route"), "path", None)
+            if route is None:
+                route = self._routes.get(scope["path"], UNMATCHED_ROUTE)
+            elif len(self._routes) < MAX_ROUTE_MEMO:
+                self._routes[scope["path"]] = route
+            reg.observe_request(scope["method"], route, state["status"], elapsed, request_size, state["bytes"])
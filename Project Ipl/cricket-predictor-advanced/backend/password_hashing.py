@@ -0,0 +1,179 @@
+"""
+Password Hashing
+Salted key-derivation (PBKDF2-SHA256 or scrypt) for user passwords.
+
+KDFs are deliberately slow, so async callers hash on a small dedicated
+thread pool instead of the event loop or Starlette's shared threadpool.
+Both hashlib KDFs release the GIL, so the pool runs them in parallel.
+The number of in-flight jobs is capped; when the cap is reached new work
+is rejected with HashingBusyError rather than queueing without bound.
+
+Encoded format (stored in users.password_hash):
+    pbkdf2_sha256$<iterations>$<salt>$<hex digest>
+    scrypt$<n>,<r>,<p>$<salt>$<hex digest>
+    legacy_json$<salt>$<hex digest>     sha256(salt + password), imported users.json
+Hashes without a '$' are legacy single-round sha256(password + salt) hashes
+from the old user database. Both legacy kinds still verify, and
+needs_rehash() reports them so they can be upgraded on login.
+UNUSABLE_PASSWORD marks accounts (e.g. bulk-imported) that cannot log in
+until a password is set. Plaintext passwords in bulk imports are hashed with
+PBKDF2 at PASSWORD_IMPORT_ITERATIONS (hash_imported_password) so a large
+import finishes in seconds; needs_rehash() reports those hashes, so each is
+replaced at the full cost on the user's first login.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+PASSWORD_HASH_ALGORITHM = os.getenv("PASSWORD_HASH_ALGORITHM", "pbkdf2_sha256")
+PBKDF2_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", "600000"))
+IMPORT_PBKDF2_ITERATIONS = int(os.getenv("PASSWORD_IMPORT_ITERATIONS", "1000"))
+SCRYPT_N = int(os.getenv("PASSWORD_SCRYPT_N", str(2 ** 14)))
+SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", "8"))
+SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", "1"))
+HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(HASH_WORKERS * 16)))
+UNUSABLE_PASSWORD = "!"
+LEGACY_JSON = "legacy_json"
+
+
+class HashingBusyError(RuntimeError):
+    """Raised when too many hashing jobs are already queued"""
+
+
+def _new_salt() -> str:
+    return uuid.uuid4().hex
+
+
+def _pbkdf2(password: str, salt: str, iterations: int) -> str:
+    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt.encode("utf-8"), iterations).hex()
+
+
+def _scrypt(password: str, salt: str, n: int, r: int, p: int) -> str:
+    return hashlib.scrypt(password.encode("utf-8"), salt=salt.encode("utf-8"),
+                          n=n, r=r, p=p, maxmem=128 * r * (n + p + 2)).hex()
+
+
+def _legacy_sha256(password: str, salt: str) -> str:
+    return hashlib.sha256((password + salt).encode()).hexdigest()
+
+
+def _legacy_json_sha256(password: str, salt: str) -> str:
+    # the JSON user store hashed salt first
+    return hashlib.sha256((salt + password).encode()).hexdigest()
+
+
+def tag_legacy_json(password_hash: str, salt: str) -> str:
+    """Encode a bare users.json hash so it verifies with its own byte order"""
+    return f"{LEGACY_JSON}${salt or ''}${password_hash}"
+
+
+def hash_password(password: str, salt: str = None) -> tuple:
+    """Hash password with the configured KDF. Returns (encoded_hash, salt)."""
+    if not salt:
+        salt = _new_salt()
+    if PASSWORD_HASH_ALGORITHM == "scrypt":
+        digest = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+        return f"scrypt${SCRYPT_N},{SCRYPT_R},{SCRYPT_P}${salt}${digest}", salt
+    digest = _pbkdf2(password, salt, PBKDF2_ITERATIONS)
+    return f"pbkdf2_sha256${PBKDF2_ITERATIONS}${salt}${digest}", salt
+
+
+def hash_imported_password(password: str) -> tuple:
+    """Low-cost PBKDF2 hash for bulk imports, upgraded on first login. Returns (encoded_hash, salt)."""
+    salt = _new_salt()
+    digest = _pbkdf2(password, salt, IMPORT_PBKDF2_ITERATIONS)
+    return f"pbkdf2_sha256${IMPORT_PBKDF2_ITERATIONS}${salt}${digest}", salt
+
+
+def verify_password(password: str, password_hash: str, salt: str = None) -> bool:
+    """Verify password against an encoded hash (or a legacy SHA-256 hash + salt)"""
+    if not password_hash or password_hash == UNUSABLE_PASSWORD:
+        return False
+    if "$" not in password_hash:
+        return hmac.compare_digest(_legacy_sha256(password, salt or ""), password_hash)
+    if password_hash.startswith(LEGACY_JSON + "$"):
+        _, enc_salt, digest = password_hash.split("$", 2)
+        return hmac.compare_digest(_legacy_json_sha256(password, enc_salt), digest)
+    try:
+        algorithm, params, enc_salt, digest = password_hash.split("$", 3)
+        if algorithm == "pbkdf2_sha256":
+            computed = _pbkdf2(password, enc_salt, int(params))
+        elif algorithm == "scrypt":
+            n, r, p = (int(x) for x in params.split(","))
+            computed = _scrypt(password, enc_salt, n, r, p)
+        else:
+            return False
+    except ValueError:
+        return False
+    return hmac.compare_digest(computed, digest)
+
+
+def needs_rehash(password_hash: str) -> bool:
+    """True for legacy hashes and hashes made with a different algorithm or cost"""
+    if not password_hash or "$" not in password_hash:
+        return True
+    algorithm, params = password_hash.split("$", 2)[:2]
+    if algorithm != PASSWORD_HASH_ALGORITHM:
+        return True
+    if algorithm == "scrypt":
+        return params != f"{SCRYPT_N},{SCRYPT_R},{SCRYPT_P}"
+    return params != str(PBKDF2_ITERATIONS)
+
+
+# ==================== DEDICATED HASHING POOL ====================
+_executor = None
+_executor_lock = threading.Lock()
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="pwhash")
+    return _executor
+
+
+async def _run_in_pool(fn, *args):
+    global _pending
+    with _pending_lock:
+        if _pending >= HASH_MAX_PENDING:
+            raise HashingBusyError("Too many password hashing requests in flight")
+        _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), fn, *args)
+    finally:
+        with _pending_lock:
+            _pending -= 1
+
+
+async def hash_password_async(password: str, salt: str = None) -> tuple:
+    """hash_password on the dedicated hashing pool"""
+    return await _run_in_pool(hash_password, password, salt)
+
+
+async def verify_password_async(password: str, password_hash: str, salt: str = None) -> bool:
+    """verify_password on the dedicated hashing pool"""
+    return await _run_in_pool(verify_password, password, password_hash, salt)
+
+
+def pool_stats() -> dict:
+    """Current pool configuration and load"""
+    return {"workers": HASH_WORKERS, "max_pending": HASH_MAX_PENDING, "pending": _pending}
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
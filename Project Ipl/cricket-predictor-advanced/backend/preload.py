@@ -0,0 +1,87 @@
+"""
+Preload-and-fork Support
+Helpers for gunicorn.conf.py: warm the datasets in the master, freeze the
+heap before forking, and report per-process memory.
+
+With preload_app the master imports api.py / app.py once. That covers the
+model, roster, table cache and the unified DB schema. warm() then builds
+what would otherwise be built lazily in every worker: the PvP player
+catalog, the ball-by-ball frame, the ball store manifest and the fantasy
+projections. gc.freeze() moves everything allocated so far into the
+permanent generation. The collector then never walks those objects, so
+their pages are not dirtied in the children and stay shared copy-on-write.
+
+memory_usage() reads /proc/<pid>/smaps_rollup (Linux). PSS (proportional
+set size) divides shared pages between the processes mapping them, so the
+sum of PSS over master and workers is the real footprint. RSS counts every
+shared page in full in each worker.
+"""
+
+import gc
+import os
+import sys
+import time
+
+SMAPS_FIELDS = {"Rss": "rss", "Pss": "pss", "Shared_Clean": "shared", "Shared_Dirty": "shared",
+                "Private_Clean": "private", "Private_Dirty": "private"}
+
+
+def memory_usage(pid="self"):
+    """{"rss", "pss", "shared", "private"} in MiB, or None where smaps_rollup is unavailable"""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", encoding="ascii") as fh:
+            lines = fh.readlines()
+    except OSError:
+        return None
+    usage = {"rss": 0.0, "pss": 0.0, "shared": 0.0, "private": 0.0}
+    for line in lines:
+        parts = line.split()
+        key = SMAPS_FIELDS.get(parts[0].rstrip(":")) if parts else None
+        if key:
+            usage[key] += int(parts[1]) / 1024
+    return {k: round(v, 1) for k, v in usage.items()}
+
+
+def format_usage(usage) -> str:
+    if usage is None:
+        return "memory usage unavailable"
+    return "rss {rss} MiB, pss {pss} MiB, shared {shared} MiB, private {private} MiB".format(**usage)
+
+
+def _warm_api(api):
+    import pvp_utils
+    from ball_store import ball_store
+
+    ball_store.load()
+    pvp_utils.load_ball_data()
+    pvp_utils.build_player_catalog()
+    api.fantasy_optimizer.warm()
+
+
+def warm():
+    """Build the lazily loaded datasets of whichever app module the master imported"""
+    started = time.perf_counter()
+    # Loaded at import already: model, roster (api) / model, table cache (app)
+    if "api" in sys.modules:
+        try:
+            _warm_api(sys.modules["api"])
+        except Exception as e:
+            print(f"[PRELOAD] Warm-up failed: {e}")
+    print(f"[PRELOAD] Datasets warmed in {time.perf_counter() - started:.2f}s")
+
+
+def freeze():
+    """Collect once, then exclude every surviving object from future collections"""
+    gc.collect()
+    gc.freeze()
+    print(f"[PRELOAD] Froze {gc.get_freeze_count()} objects before fork")
+
+
+def after_fork():
+    """Worker side: re-enable the collector and drop DB connections inherited from the master"""
+    gc.enable()
+    for module_name, attr in (("unified_db", "engine"), ("app", "engine")):
+        engine = getattr(sys.modules.get(module_name), attr, None)
+        if engine is not None and hasattr(engine, "dispose"):
+            # close=False: the sockets belong to the master, just forget them here
+            engine.dispose(close=False)
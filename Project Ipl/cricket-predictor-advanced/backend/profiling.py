@@ -0,0 +1,223 @@
+"""
+Request Profiling
+Opt-in sampling profiler for individual requests, plus always-on timing spans.
+
+A request is profiled when:
+    - PROFILE_HEADER_ENABLED=1 and it carries "X-Profile: 1", or
+    - its path starts with one of PROFILE_PATHS and it wins the
+      PROFILE_SAMPLE_RATE draw (e.g. 0.01 = one request in a hundred).
+
+While at least one profiled request is in flight, a sampler thread reads
+sys._current_frames() every PROFILE_INTERVAL seconds. It counts the stack
+of every busy thread; threads parked in a queue, lock or selector are
+skipped. Endpoints declared with `def` run in the threadpool, where
+cProfile's per-thread hook would never see them, so a sampler is used
+instead. Concurrent requests share the process, so a profile shows
+everything that ran while the request was in flight.
+
+Finished profiles go to a ring buffer of PROFILE_RING_SIZE entries, and the
+response carries an X-Profile-Id header. Each entry is stored as collapsed
+stacks ("outer;inner;leaf count" per line), which flamegraph.pl, speedscope
+and inferno read directly (both need the X-Admin-Token header):
+    GET /_admin/profiles                  summaries, newest first
+    GET /_admin/profiles/{id}             collapsed stacks (text/plain)
+    GET /_admin/profiles/{id}?format=json spans and top stacks
+
+span("name") times a block or a function. Durations always go to the
+span_duration_seconds histogram on /metrics. In a profiled request they
+are also listed in the profile, in order.
+"""
+
+from collections import deque
+from contextvars import ContextVar
+from functools import wraps
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+
+from metrics import registry
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_PATHS = tuple(p for p in os.getenv("PROFILE_PATHS", "/pvp,/predict").split(",") if p)
+PROFILE_HEADER_ENABLED = os.getenv("PROFILE_HEADER_ENABLED", "0") == "1"
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.002"))
+PROFILE_RING_SIZE = int(os.getenv("PROFILE_RING_SIZE", "50"))
+MAX_STACK_DEPTH = 128
+# innermost frames of a thread that is waiting, not working
+IDLE_FRAMES = {("threading.py", "wait"), ("selectors.py", "select"), ("queue.py", "get"),
+               ("thread.py", "_worker"), ("base_events.py", "_run_once")}
+
+_current = ContextVar("profile_session", default=None)
+_ids = itertools.count(1)
+
+
+class ProfileSession:
+    def __init__(self, method: str, path: str):
+        self.id = next(_ids)
+        self.method = method
+        self.path = path
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.duration_ms = 0.0
+        self.status = None
+        self.samples = 0
+        self.stacks = {}
+        self.spans = []  # (name, start offset ms, duration ms)
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in sorted(self.stacks.items(), key=lambda kv: -kv[1]))
+
+    def summary(self) -> dict:
+        return {"id": self.id, "method": self.method, "path": self.path, "status": self.status,
+                "started_at": self.started_at, "duration_ms": self.duration_ms, "samples": self.samples,
+                "spans": len(self.spans)}
+
+    def detail(self, top: int = 20) -> dict:
+        out = self.summary()
+        out["spans"] = [{"name": n, "start_ms": s, "duration_ms": d} for n, s, d in self.spans]
+        out["top_stacks"] = [{"stack": stack, "samples": n}
+                             for stack, n in sorted(self.stacks.items(), key=lambda kv: -kv[1])[:top]]
+        return out
+
+
+class Sampler:
+    """Samples every busy thread while any profile session is active"""
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self._sessions = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add(self, session: ProfileSession):
+        with self._lock:
+            self._sessions.add(session)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self._thread.start()
+
+    def remove(self, session: ProfileSession):
+        with self._lock:
+            self._sessions.discard(session)
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            with self._lock:
+                sessions = list(self._sessions)
+                if not sessions:
+                    self._thread = None
+                    return
+            stacks = []
+            for tid, frame in sys._current_frames().items():
+                stack = _collapse(frame) if tid != me else None
+                if stack is not None:
+                    stacks.append(stack)
+            for session in sessions:
+                session.samples += 1
+                for stack in stacks:
+                    session.stacks[stack] = session.stacks.get(stack, 0) + 1
+            time.sleep(self.interval)
+
+
+def _collapse(frame):
+    """'outer;...;leaf' for a thread's stack, or None if the thread is idle"""
+    code = frame.f_code
+    if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+        return None
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+sampler = Sampler()
+profiles = deque(maxlen=PROFILE_RING_SIZE)
+
+
+def get_profile(profile_id: int):
+    for session in list(profiles):
+        if session.id == profile_id:
+            return session
+    return None
+
+
+# ==================== SPANS ====================
+
+class span:
+    """Time a block (`with span("x"):`) or a function (`@span("x")`)"""
+
+    __slots__ = ("name", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        ended = time.perf_counter()
+        registry.observe_span(self.name, ended - self.started)
+        session = _current.get()
+        if session is not None:
+            session.spans.append((self.name, round((self.started - session.started) * 1000, 3),
+                                  round((ended - self.started) * 1000, 3)))
+        return False
+
+    def __call__(self, fn):
+        name = self.name
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+# ==================== MIDDLEWARE ====================
+
+class ProfilingMiddleware:
+    """Profiles the requests selected by header or sampling"""
+
+    def __init__(self, app, sample_rate: float = PROFILE_SAMPLE_RATE, paths=PROFILE_PATHS,
+                 header_enabled: bool = PROFILE_HEADER_ENABLED):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.paths = tuple(paths)
+        self.header_enabled = header_enabled
+
+    def _selected(self, scope) -> bool:
+        if self.header_enabled:
+            for name, value in scope.get("headers", ()):
+                if name == b"x-profile":
+                    return value.strip() in (b"1", b"true", b"on")
+        return bool(self.sample_rate) and scope["path"].startswith(self.paths) and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._selected(scope):
+            await self.app(scope, receive, send)
+            return
+        session = ProfileSession(scope["method"], scope["path"])
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                session.status = message["status"]
+                message = dict(message, headers=list(message.get("headers", [])) +
+                               [(b"x-profile-id", str(session.id).encode())])
+            await send(message)
+
+        token = _current.set(session)  # copied into threadpool calls with the context
+        sampler.add(session)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.remove(session)
+            _current.reset(token)
+            session.duration_ms = round((time.perf_counter() - session.started) * 1000, 3)
+            profiles.append(session)
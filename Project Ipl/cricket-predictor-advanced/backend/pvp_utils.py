@@ -1,32 +1,153 @@
 import os
+import threading
 import pandas as pd
 from functools import lru_cache
 from typing import Dict, Any
 import glob
 
+from ball_store import ball_store
+import shared_datasets
+from metrics import timed_load
+from profiling import span
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+# Explicit ball-by-ball CSV (e.g. synthetic data for load tests); replaces the data/ lookup
+BALL_DATA_PATH = os.getenv("BALL_DATA_PATH")
+BALL_DATA_CANDIDATES = [
+    "IPL Ball By Ball 2008 to 2024.csv",
+    "ipl_ball_by_ball_2008_2024.csv",
+    "ball_by_ball.csv",
+    "deliveries.csv",
+    "ball_by_ball_2008_2024.csv",
+]
+
+# Ball-by-ball frame: the shipped CSV (if any) plus every partition in the
+# ball store. Re-read only when the CSV changes; new store partitions are
+# appended incrementally.
+_ball_lock = threading.Lock()
+_ball_cache = {"csv": None, "signature": None, "store_version": 0, "df": None}
+
+
+def _find_ball_csv():
+    if BALL_DATA_PATH:
+        return BALL_DATA_PATH if os.path.exists(BALL_DATA_PATH) else None
+    for name in BALL_DATA_CANDIDATES:
+        path = os.path.join(DATA_DIR, name)
+        if os.path.exists(path):
+            return path
+    return None
 
-@lru_cache(maxsize=1)
+
+@timed_load("ball_csv")
+def _read_ball_csv(path: str) -> pd.DataFrame:
+    # read with low_memory False to avoid dtype warnings
+    df = pd.read_csv(path, low_memory=False)
+    # normalize column names to lower-case stripped
+    df.columns = [c.strip() for c in df.columns]
+    return df
+
+
+def _align_store_columns(store_df: pd.DataFrame, base: pd.DataFrame) -> pd.DataFrame:
+    """Rename store columns to the spellings the shipped CSV uses"""
+    if base is None or store_df.empty:
+        return store_df
+    renames = {}
+    for ours, options in (("batsman", ["batsman", "batter", "batsman_name"]),
+                          ("bowler", ["bowler", "bowler_name"]),
+                          ("batsman_runs", ["batsman_runs", "batsman_run", "runs_off_bat", "runs"]),
+                          ("player_dismissed", ["player_dismissed", "player_out"]),
+                          ("dismissal_kind", ["dismissal_kind", "kind"]),
+                          ("match_id", ["match_id", "match", "id", "ID"]),
+                          ("over", ["over", "overs"])):
+        theirs = safe_get_column(base, options)
+        if theirs and theirs != ours:
+            renames[ours] = theirs
+    return store_df.rename(columns=renames)
+
+
+@span("pvp.load_ball_data")
 def load_ball_data() -> pd.DataFrame:
-    """Load ball-by-ball CSV from data folder. Looks for common filenames."""
-    base = os.path.join(os.path.dirname(__file__), "data")
-    candidates = [
-        os.path.join(base, "IPL Ball By Ball 2008 to 2024.csv"),
-        os.path.join(base, "ipl_ball_by_ball_2008_2024.csv"),
-        os.path.join(base, "ball_by_ball.csv"),
-        os.path.join(base, "deliveries.csv"),
-        os.path.join(base, "ball_by_ball_2008_2024.csv"),
-    ]
-
-    for path in candidates:
-        if os.path.exists(path):
-            # read with low_memory False to avoid dtype warnings
-            df = pd.read_csv(path, low_memory=False)
-            # normalize column names to lower-case stripped
-            df.columns = [c.strip() for c in df.columns]
+    """Ball-by-ball deliveries: the shared published frame when SHARED_DATASETS=1,
+    otherwise loaded in this process."""
+    if shared_datasets.enabled():
+        df = shared_datasets.shared.get("deliveries")
+        if df is not None:
             return df
+    return load_local_ball_data()
+
+
+def load_local_ball_data() -> pd.DataFrame:
+    """Ball-by-ball deliveries: the CSV in the data folder plus ingested uploads."""
+    path = _find_ball_csv()
+    signature = None
+    if path:
+        st = os.stat(path)
+        signature = (path, st.st_size, st.st_mtime_ns)
+
+    with _ball_lock:
+        # pinned: an ingest landing after this read is picked up on the next call, not twice
+        store_version = ball_store.version
+        cache = _ball_cache
+        if cache["df"] is not None and cache["signature"] == signature and cache["store_version"] == store_version:
+            return cache["df"]
+        if cache["df"] is None or cache["signature"] != signature:
+            base = _read_ball_csv(path) if path else None
+            cache.update(csv=base, signature=signature, store_version=0, df=base)
+        new_rows = _align_store_columns(ball_store.deliveries(after_version=cache["store_version"], upto_version=store_version), cache["csv"])
+        if not new_rows.empty:
+            cache["df"] = new_rows if cache["df"] is None else pd.concat([cache["df"], new_rows], ignore_index=True)
+        cache["store_version"] = store_version
+        if cache["df"] is None:
+            # If no candidate found, raise FileNotFoundError
+            raise FileNotFoundError("Ball-by-ball CSV not found in data folder. Expected filename like 'IPL Ball By Ball 2008 to 2024.csv'.")
+        return cache["df"]
+
+
+# compute_pvp results per (batsman, bowler), tagged with the ball_data_version()
+# they were computed from. An ingest drops the pairs it touched right away; other
+# workers, and the shared frame that lags behind the store, are caught by the tag.
+_pvp_cache = {}
+_pvp_lock = threading.Lock()
+pvp_cache_stats = {"hits": 0, "misses": 0}
+
+
+def ball_data_version():
+    """Changes whenever load_ball_data() starts returning newer deliveries"""
+    if shared_datasets.enabled():
+        version, df = shared_datasets.shared.get_versioned("deliveries")
+        if df is not None:
+            return ("shared", version)
+    return ("store", ball_store.version)
+
+
+def _pair_key(batsman: str, bowler: str):
+    return (batsman.strip().lower(), bowler.strip().lower())
+
+
+def cached_pvp(batsman: str, bowler: str) -> Dict[str, Any]:
+    key = _pair_key(batsman, bowler)
+    # read before computing: a result from newer data is only ever recomputed, never kept stale
+    version = ball_data_version()
+    with _pvp_lock:
+        entry = _pvp_cache.get(key)
+        hit = entry[1] if entry is not None and entry[0] == version else None
+        pvp_cache_stats["hits" if hit is not None else "misses"] += 1
+    if hit is not None:
+        return hit
+    result = compute_pvp(batsman, bowler)
+    with _pvp_lock:
+        _pvp_cache[key] = (version, result)
+    return result
+
 
-    # If no candidate found, raise FileNotFoundError
-    raise FileNotFoundError("Ball-by-ball CSV not found in data folder. Expected filename like 'IPL Ball By Ball 2008 to 2024.csv'.")
+def invalidate_pairs(pairs) -> int:
+    """Drop cached PvP results for the given (batsman, bowler) pairs"""
+    dropped = 0
+    with _pvp_lock:
+        for batsman, bowler in pairs:
+            if _pvp_cache.pop(_pair_key(batsman, bowler), None) is not None:
+                dropped += 1
+    return dropped
 
 
 def safe_get_column(df: pd.DataFrame, options):
@@ -36,6 +157,7 @@ def safe_get_column(df: pd.DataFrame, options):
     return None
 
 
+@span("pvp.compute_pvp")
 def compute_pvp(batsman: str, bowler: str) -> Dict[str, Any]:
     """Compute Player-vs-Player statistics using ball-by-ball dataframe.
 
@@ -88,7 +210,7 @@ def compute_pvp(batsman: str, bowler: str) -> Dict[str, Any]:
         # Cases where player_dismissed equals batsman
         dismissed_rows = df_pair[df_pair[player_dismissed_col].astype(str).str.strip().str.lower() == batsman.strip().lower()]
         dismissals = len(dismissed_rows)
-        for kind in dismissed_rows[dismissal_col].fillna("unknown"):
+        for kind in dismissed_rows[dismissal_col].astype(object).fillna("unknown"):
             k = str(kind)
             dismissal_types[k] = dismissal_types.get(k, 0) + 1
 
@@ -261,6 +383,7 @@ def detect_player_role(name: str) -> str:
     return 'Unknown'
 
 
+@span("pvp.search_players")
 def search_players(query: str = None, limit: int = 50):
     """Search batsmen and bowlers matching query and return simple profiles.
 
@@ -290,8 +413,28 @@ def search_players(query: str = None, limit: int = 50):
     return results
 
 
-@lru_cache(maxsize=1)
+@span("pvp.build_player_catalog")
 def build_player_catalog():
+    """Player catalog: the shared published one when SHARED_DATASETS=1, otherwise built here"""
+    if shared_datasets.enabled():
+        catalog = shared_datasets.shared.get("catalog")
+        if catalog is not None:
+            return catalog
+    return build_local_player_catalog()
+
+
+def catalog_signature():
+    """(file count, newest mtime) over the catalog's source files"""
+    base = os.path.join(os.path.dirname(__file__), "data")
+    paths = glob.glob(os.path.join(base, "IPL Dataset", "**", "*.csv"), recursive=True)
+    paths.append(os.path.join(base, "players1.csv"))
+    mtimes = [os.stat(p).st_mtime_ns for p in paths if os.path.exists(p)]
+    return (len(mtimes), max(mtimes, default=0))
+
+
+@lru_cache(maxsize=1)
+@timed_load("player_catalog")
+def build_local_player_catalog():
     """Build a lightweight player catalog from available aggregated CSVs under the 'IPL Dataset' folder.
 
     The catalog maps player name -> summary stats (career runs, wickets) and inferred role hints.
@@ -432,6 +575,7 @@ def build_player_catalog():
     return catalog
 
 
+@span("pvp.compute_pvp_from_aggregates")
 def compute_pvp_from_aggregates(batsman: str, bowler: str) -> Dict[str, Any]:
     """Compute PVP stats from aggregated CSV datasets (Most Runs, Most Wickets, Economy, Strike Rate, etc.)."""
     base = os.path.join(os.path.dirname(__file__), "data")
@@ -623,6 +767,7 @@ def compute_pvp_from_aggregates(batsman: str, bowler: str) -> Dict[str, Any]:
     return result
 
 
+@span("pvp.get_player_profile")
 def get_player_profile(name: str) -> Dict[str, Any]:
     """Return an enriched player profile from the catalog if available."""
     catalog = build_player_catalog()
@@ -0,0 +1,203 @@
+"""
+Response Cache
+ASGI middleware that serves read-only dataset endpoints from memory.
+
+Responses are keyed by (path, query string, dataset version) and stored as the
+exact bytes that were sent, plus a gzipped copy for clients that accept it.
+Every cached response carries an ETag so browsers revalidate with
+If-None-Match and get a body-less 304.
+
+The dataset version is a hash of (name, size, mtime) of every file under
+data/, recomputed at most once per RESPONSE_CACHE_CHECK_INTERVAL seconds. Any
+added, removed or edited dataset file therefore changes every key and the old
+entries age out of the LRU. Files that change on every request and never
+feed these endpoints (the user database, the legacy JSON stores, the
+predictions CSV export, uploads, the ingested ball store, dotfiles) are
+excluded so they do not invalidate the cache.
+"""
+
+from collections import OrderedDict
+import gzip
+import hashlib
+import os
+import threading
+import time
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") != "0"
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+RESPONSE_CACHE_CHECK_INTERVAL = float(os.getenv("RESPONSE_CACHE_CHECK_INTERVAL", "2"))
+RESPONSE_CACHE_MAX_AGE = int(os.getenv("RESPONSE_CACHE_MAX_AGE", "60"))
+GZIP_MIN_SIZE = 1024
+
+# Mutable stores under data/ that are not datasets
+EXCLUDED_SUFFIXES = (".db", ".db-wal", ".db-shm", ".db-journal", ".pyc")
+EXCLUDED_NAMES = {"users.json", "predictions.json", "referrals.json", "spins.json", "predictions_export.csv"}
+EXCLUDED_DIRS = {"uploads", "ball_store", "shared", "__pycache__"}
+
+
+class DatasetVersion:
+    """Cheap, throttled fingerprint of the files under a data directory"""
+
+    def __init__(self, root: str = DATA_DIR, interval: float = RESPONSE_CACHE_CHECK_INTERVAL):
+        self.root = root
+        self.interval = interval
+        self._value = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _compute(self) -> str:
+        digest = hashlib.sha1()
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = sorted(d for d in dirnames if d not in EXCLUDED_DIRS and not d.startswith("."))
+            for name in sorted(filenames):
+                if name.startswith(".") or name in EXCLUDED_NAMES or name.endswith(EXCLUDED_SUFFIXES):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                digest.update(f"{os.path.relpath(path, self.root)}|{st.st_size}|{st.st_mtime_ns}\n".encode())
+        return digest.hexdigest()[:16]
+
+    def get(self) -> str:
+        now = time.monotonic()
+        if self._value is not None and now - self._checked_at < self.interval:
+            return self._value
+        with self._lock:
+            if self._value is None or now - self._checked_at >= self.interval:
+                self._value = self._compute()
+                self._checked_at = time.monotonic()
+            return self._value
+
+    def invalidate(self):
+        with self._lock:
+            self._checked_at = 0.0
+
+
+dataset_version = DatasetVersion()
+# Middleware instances register here so admin endpoints can report on them
+response_caches = []
+
+
+class _CachedResponse:
+    __slots__ = ("status", "headers", "body", "gzipped", "etag")
+
+    def __init__(self, status, headers, body, etag):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.etag = etag
+        self.gzipped = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_SIZE else None
+
+
+class ResponseCacheMiddleware:
+    """Cache successful GET responses for the given paths.
+
+    `paths` are exact paths, or prefixes ending in '/' (e.g. "/team/").
+    """
+
+    def __init__(self, app, paths, maxsize: int = RESPONSE_CACHE_SIZE,
+                 max_age: int = RESPONSE_CACHE_MAX_AGE, version: DatasetVersion = None):
+        self.app = app
+        self.exact = {p for p in paths if not p.endswith("/")}
+        self.prefixes = tuple(p for p in paths if p.endswith("/"))
+        self.maxsize = maxsize
+        self.cache_control = f"public, max-age={max_age}".encode()
+        self.version = version or dataset_version
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        response_caches.append(self)
+
+    def _cacheable(self, scope) -> bool:
+        if not RESPONSE_CACHE_ENABLED or scope["type"] != "http" or scope["method"] != "GET":
+            return False
+        path = scope["path"]
+        return path in self.exact or (bool(self.prefixes) and path.startswith(self.prefixes))
+
+    async def __call__(self, scope, receive, send):
+        if not self._cacheable(scope):
+            await self.app(scope, receive, send)
+            return
+
+        key = (scope["path"], scope.get("query_string", b""), self.version.get())
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if entry is None:
+            entry = await self._render(scope, receive, send)
+            if entry is None:
+                return
+            with self._lock:
+                self._entries[key] = entry
+                if len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        await self._send_cached(scope, entry, send)
+
+    async def _render(self, scope, receive, send):
+        """Run the endpoint and capture its response; non-200s pass straight through"""
+        start, chunks = {}, []
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, capture)
+        body = b"".join(chunks)
+        headers = [(k, v) for k, v in start.get("headers", []) if k.lower() != b"content-length"]
+        if start.get("status") != 200:
+            await send({"type": "http.response.start", "status": start.get("status", 500),
+                        "headers": headers + [(b"content-length", str(len(body)).encode())]})
+            await send({"type": "http.response.body", "body": body})
+            return None
+        etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+        return _CachedResponse(200, headers, body, etag.encode())
+
+    async def _send_cached(self, scope, entry, send):
+        request_headers = dict(scope.get("headers", []))
+        headers = list(entry.headers) + [
+            (b"etag", entry.etag),
+            (b"cache-control", self.cache_control),
+            (b"vary", b"Accept-Encoding"),
+        ]
+        if_none_match = request_headers.get(b"if-none-match", b"")
+        if if_none_match and (if_none_match == b"*" or entry.etag in [t.strip() for t in if_none_match.split(b",")]):
+            with self._lock:
+                self.not_modified += 1
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        body = entry.body
+        if entry.gzipped is not None and b"gzip" in request_headers.get(b"accept-encoding", b""):
+            body = entry.gzipped
+            headers.append((b"content-encoding", b"gzip"))
+        headers.append((b"content-length", str(len(body)).encode()))
+        await send({"type": "http.response.start", "status": entry.status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "dataset_version": self.version.get()
+            }
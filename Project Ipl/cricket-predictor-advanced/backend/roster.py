@@ -0,0 +1,146 @@
+"""
+Player Roster Index
+In-memory index over players1.csv for the /players endpoint.
+
+The CSV is read once; players are grouped by team code, batting hand and
+bowling skill, and the JSON payload for the full roster and for every team
+is serialized up front. `/players?team=CSK` is then a dictionary lookup
+returning ready bytes. Filter combinations that include hand or bowling
+skill are built from the group index on first use and memoized.
+
+The file's (size, mtime) is checked at most every ROSTER_CHECK_INTERVAL
+seconds and the index is rebuilt when it changes. A file that cannot be read
+or lacks the expected columns leaves an empty index (payload() returns None)
+until it changes again.
+"""
+
+from typing import Optional
+import os
+import threading
+import time
+
+import pandas as pd
+
+from fast_json import dataframe_json, dumps
+from metrics import timed_load
+
+ROSTER_CHECK_INTERVAL = float(os.getenv("ROSTER_CHECK_INTERVAL", "5"))
+
+
+def normalize_hand(value) -> str:
+    """'Right_Hand' / 'Right_hand' / 'right' -> 'RIGHT'"""
+    return str(value or "").split("_")[0].strip().upper()
+
+
+def normalize_skill(value) -> str:
+    return " ".join(str(value or "").lower().split())
+
+
+class RosterIndex:
+    """Pre-serialized roster payloads keyed by (team, hand, skill)"""
+
+    def __init__(self, path: str, player_to_team: dict, team_codes=(), check_interval: float = ROSTER_CHECK_INTERVAL):
+        self.path = path
+        self.player_to_team = player_to_team
+        self.team_codes = list(team_codes)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._signature = None
+        self._checked_at = 0.0
+        self._df = None
+        self._groups = {}
+        self._payloads = {}
+        self.loads = 0
+
+    def _file_signature(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_size, st.st_mtime_ns)
+
+    @timed_load("roster")
+    def load(self):
+        """(Re)build the index from the CSV"""
+        signature = self._file_signature()
+        try:
+            df, groups, payloads = self._build(signature)
+        except Exception as e:
+            print(f"[ROSTER] Could not index {self.path}: {e}")
+            df, groups, payloads = None, {}, {}
+
+        with self._lock:
+            self._df = df
+            self._groups = groups
+            self._payloads = payloads
+            self._signature = signature
+            self._checked_at = time.monotonic()
+            self.loads += 1
+        if df is not None:
+            print(f"[ROSTER] Indexed {len(df)} players ({len(groups['team'])} team groups)")
+
+    def _build(self, signature):
+        if signature is None:
+            df = None
+        else:
+            df = pd.read_csv(self.path, encoding="utf-8-sig")
+            df["Team"] = df["Player_Name"].map(self.player_to_team)
+            df = df.reset_index(drop=True)
+
+        groups, payloads = {}, {}
+        if df is not None:
+            for label, series in (
+                ("team", df["Team"].fillna("")),
+                ("hand", df["Batting_Hand"].map(normalize_hand)),
+                ("skill", df["Bowling_Skill"].map(normalize_skill)),
+            ):
+                groups[label] = {key: idx.to_numpy() for key, idx in series.groupby(series).groups.items()}
+            payloads[(None, None, None)] = self._serialize(df)
+            payloads["empty"] = self._serialize(df.iloc[[]])
+            for code in set(self.team_codes) | set(groups["team"]):
+                if code:
+                    payloads[(code, None, None)] = self._serialize(df.iloc[groups["team"].get(code, [])])
+        return df, groups, payloads
+
+    @staticmethod
+    def _serialize(df) -> bytes:
+        return b'{"players":' + dataframe_json(df) + b',"count":' + dumps(len(df)) + b'}'
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self.loads and now - self._checked_at < self.check_interval:
+            return
+        with self._lock:
+            if self.loads and now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+            changed = self.loads == 0 or self._file_signature() != self._signature
+        if changed:
+            self.load()
+
+    def payload(self, team: str = None, hand: str = None, skill: str = None) -> Optional[bytes]:
+        """JSON bytes for the filtered roster, or None when players1.csv is missing"""
+        self._refresh()
+        key = (team.upper() if team else None,
+               normalize_hand(hand) if hand else None,
+               normalize_skill(skill) if skill else None)
+        with self._lock:
+            df, groups, body = self._df, self._groups, self._payloads.get(key)
+        if df is None or body is not None:
+            return body
+
+        # Uncommon combination: intersect the group indexes once and memoize.
+        # Unknown values share one empty payload so arbitrary queries cannot grow the memo.
+        rows = None
+        for label, value in zip(("team", "hand", "skill"), key):
+            if value is None:
+                continue
+            if value not in groups[label]:
+                return self._payloads["empty"]
+            idx = set(groups[label][value])
+            rows = idx if rows is None else rows & idx
+        body = self._serialize(df.iloc[sorted(rows)] if rows is not None else df)
+        with self._lock:
+            if self._df is df:
+                self._payloads[key] = body
+        return body
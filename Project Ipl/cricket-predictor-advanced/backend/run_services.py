@@ -1,126 +1,376 @@
 """
-Startup script to run both FastAPI services simultaneously
+Service Supervisor
+Runs the FastAPI service (api:app) as N uvicorn worker processes.
 
 Usage:
-    python run_services.py
-    
-This will start:
-    - Main API on http://127.0.0.1:8000 (predictions, matches, etc.)
-    - Auth DB API on http://127.0.0.1:8001 (user authentication & storage)
+    python run_services.py [--workers 4] [--host 127.0.0.1] [--port 8000]
+
+    kill -HUP <supervisor pid>    rolling restart (zero downtime)
+    Ctrl+C / SIGTERM              graceful shutdown
+
+The supervisor opens the listening socket itself and hands it to every
+worker (uvicorn --fd), so the port keeps accepting connections while
+individual workers come and go.
+
+A worker counts as ready when uvicorn logs "Application startup complete"
+(its lifespan has run) and the worker itself then answers GET /health.
+All workers accept on one socket, so a probe is repeated until a response
+carries that worker's PID ("pid" in the /health body). Nothing sleeps for a
+fixed time. A rolling restart starts a replacement, waits until it is ready,
+then stops the old worker. uvicorn finishes that worker's in-flight requests
+before exiting.
+
+Worker output is read line by line by an asyncio task and printed with a
+[api.<n>] prefix, so a full pipe can never block a worker. A worker that
+exits unexpectedly is restarted with exponential backoff. Every
+HEALTH_INTERVAL seconds each worker is probed the same way; one that fails
+HEALTH_FAILURES checks in a row is replaced like in a rolling restart.
+
+On platforms without fd passing (Windows) a single worker binds the port
+directly.
 """
 
-import subprocess
-import sys
+from dataclasses import dataclass
+import argparse
+import asyncio
+import json
 import os
+import signal
+import socket
+import sys
 import time
 from pathlib import Path
 
-def run_services():
-    """Start both FastAPI services in parallel"""
-    
-    print("=" * 60)
-    print("Cricket Prediction Services Startup")
-    print("=" * 60)
-    print()
-    
-    # Get backend directory
-    backend_dir = Path(__file__).parent
-    
-    print(f"Backend Directory: {backend_dir}")
-    print()
-    
-    # Check if required files exist
-    api_file = backend_dir / "api.py"
-    auth_db_file = backend_dir / "auth_db.py"
-    
-    if not api_file.exists():
-        print(f"❌ Error: {api_file} not found")
-        return False
-    
-    if not auth_db_file.exists():
-        print(f"❌ Error: {auth_db_file} not found")
-        return False
-    
-    print("✓ Found api.py")
-    print("✓ Found auth_db.py")
-    print()
-    
-    print("Starting services...")
-    print()
-    
-    # Start Main API on port 8000
-    print("📡 Starting Main API on http://127.0.0.1:8000")
-    print("   (Predictions, Matches, Spin features)")
+BACKEND_DIR = Path(__file__).parent
+API_WORKERS = int(os.getenv("API_WORKERS", "2"))
+STARTUP_TIMEOUT = float(os.getenv("WORKER_STARTUP_TIMEOUT", "120"))
+GRACEFUL_TIMEOUT = float(os.getenv("WORKER_GRACEFUL_TIMEOUT", "20"))
+HEALTH_INTERVAL = float(os.getenv("HEALTH_INTERVAL", "10"))
+HEALTH_TIMEOUT = float(os.getenv("HEALTH_TIMEOUT", "5"))  # to reach one particular worker
+HEALTH_FAILURES = int(os.getenv("HEALTH_FAILURES", "3"))
+MAX_BACKOFF = 30.0
+STABLE_AFTER = 60.0  # seconds up before a worker's crash count is reset
+READY_MARKER = "Application startup complete"
+LOG_LINE_LIMIT = 1024 * 1024
+FD_PASSING = os.name == "posix"
+
+
+@dataclass
+class ServiceSpec:
+    name: str
+    app: str
+    port: int
+    workers: int = 1
+    health_path: str = "/health"
+
+
+class Worker:
+    def __init__(self, spec: ServiceSpec, index: int):
+        self.spec = spec
+        self.index = index
+        self.label = f"{spec.name}.{index}"
+        self.proc = None
+        self.ready = asyncio.Event()
+        self.started_at = 0.0
+        self.retiring = False
+
+
+def listen_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+async def _get(host: str, port: int, path: str, timeout: float):
+    """(status line, body) of GET path, or None if it could not be fetched"""
     try:
-        main_api_process = subprocess.Popen(
-            [sys.executable, "-m", "uvicorn", "api:app", "--host", "127.0.0.1", "--port", "8000", "--reload"],
-            cwd=str(backend_dir),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-        print("   ✓ Main API started (PID: {})".format(main_api_process.pid))
-    except Exception as e:
-        print(f"   ❌ Failed to start Main API: {e}")
-        return False
-    
-    time.sleep(2)  # Wait for first service to start
-    
-    # Start Auth Database API on port 8001
-    print()
-    print("🔐 Starting Auth DB API on http://127.0.0.1:8001")
-    print("   (User registration, login, token management)")
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return None
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout)  # until the server closes
+    except (OSError, asyncio.TimeoutError):
+        return None
+    finally:
+        writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    return head.split(b"\r\n", 1)[0], body
+
+
+async def probe(host: str, port: int, path: str, timeout: float = 2.0) -> bool:
+    """True if GET path answers 200"""
+    response = await _get(host, port, path, timeout)
+    return response is not None and response[0].split()[1:2] == [b"200"]
+
+
+async def probe_pid(host: str, port: int, path: str, timeout: float = 2.0):
+    """PID of the worker that answered GET path with 200, or None"""
+    response = await _get(host, port, path, timeout)
+    if response is None or response[0].split()[1:2] != [b"200"]:
+        return None
     try:
-        auth_db_process = subprocess.Popen(
-            [sys.executable, "-m", "uvicorn", "auth_db:app", "--host", "127.0.0.1", "--port", "8001", "--reload"],
-            cwd=str(backend_dir),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-        print("   ✓ Auth DB API started (PID: {})".format(auth_db_process.pid))
-    except Exception as e:
-        print(f"   ❌ Failed to start Auth DB API: {e}")
-        main_api_process.terminate()
+        return json.loads(response[1]).get("pid")
+    except (ValueError, AttributeError):
+        return None
+
+
+class Supervisor:
+    """Starts, health-checks, restarts and rolls uvicorn workers"""
+
+    def __init__(self, specs, host: str = "127.0.0.1", startup_timeout: float = STARTUP_TIMEOUT,
+                 graceful_timeout: float = GRACEFUL_TIMEOUT):
+        self.specs = specs
+        self.host = host
+        self.startup_timeout = startup_timeout
+        self.graceful_timeout = graceful_timeout
+        self.sockets = {}
+        self.workers = {}  # service name -> list of Worker
+        self.pending = set()  # replacements started but not yet in self.workers
+        self.failures = {}
+        self.unhealthy = {}  # worker label -> consecutive failed health checks
+        self.stopping = False
+        self.rolling = False
+        self._stopped = None
+        self._tasks = set()
+
+    # ---------- workers ----------
+
+    def _command(self, spec: ServiceSpec):
+        cmd = [sys.executable, "-m", "uvicorn", spec.app, "--timeout-graceful-shutdown",
+               str(int(self.graceful_timeout))]
+        if FD_PASSING:
+            return cmd + ["--fd", str(self.sockets[spec.name].fileno())]
+        return cmd + ["--host", self.host, "--port", str(spec.port)]
+
+    async def start_worker(self, spec: ServiceSpec, index: int) -> Worker:
+        worker = Worker(spec, index)
+        kwargs = {"pass_fds": (self.sockets[spec.name].fileno(),)} if FD_PASSING else {}
+        worker.proc = await asyncio.create_subprocess_exec(
+            *self._command(spec), cwd=str(BACKEND_DIR),
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT,
+            env=dict(os.environ, PYTHONUNBUFFERED="1"), limit=LOG_LINE_LIMIT, **kwargs)
+        worker.started_at = time.monotonic()
+        print(f"[SUPERVISOR] Started {worker.label} (PID {worker.proc.pid})")
+        self._spawn(self._drain(worker))
+        self._spawn(self._watch(worker))
+        return worker
+
+    async def _drain(self, worker: Worker):
+        async for raw in worker.proc.stdout:
+            line = raw.decode(errors="replace").rstrip()
+            if READY_MARKER in line:
+                worker.ready.set()
+            print(f"[{worker.label}] {line}")
+
+    async def wait_ready(self, worker: Worker) -> bool:
+        spec = worker.spec
+        exited = asyncio.ensure_future(worker.proc.wait())
+        ready = asyncio.ensure_future(worker.ready.wait())
+        try:
+            await asyncio.wait({exited, ready}, timeout=self.startup_timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            exited.cancel()
+            ready.cancel()
+        if not worker.ready.is_set():
+            return False
+        return await self.probe_worker(worker, self.startup_timeout)
+
+    async def probe_worker(self, worker: Worker, timeout: float) -> bool:
+        """True once `worker` itself answers the health check; other workers' answers don't count"""
+        spec = worker.spec
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and worker.proc.returncode is None:
+            if await probe_pid(self._probe_host(), spec.port, spec.health_path) == worker.proc.pid:
+                return True
+            await asyncio.sleep(0.05)
         return False
-    
-    print()
+
+    async def stop_worker(self, worker: Worker):
+        worker.retiring = True
+        if worker.proc.returncode is not None:
+            return
+        worker.proc.terminate()  # uvicorn drains in-flight requests on SIGTERM
+        try:
+            await asyncio.wait_for(worker.proc.wait(), self.graceful_timeout + 5)
+        except asyncio.TimeoutError:
+            print(f"[SUPERVISOR] {worker.label} did not stop in time; killing")
+            worker.proc.kill()
+            await worker.proc.wait()
+
+    async def _watch(self, worker: Worker):
+        code = await worker.proc.wait()
+        if self.stopping or worker.retiring:
+            return
+        spec = worker.spec
+        uptime = time.monotonic() - worker.started_at
+        failures = 0 if uptime > STABLE_AFTER else self.failures.get(worker.label, 0)
+        self.failures[worker.label] = failures + 1
+        delay = min(MAX_BACKOFF, 0.5 * 2 ** failures)
+        print(f"[SUPERVISOR] {worker.label} exited with code {code} after {uptime:.1f}s; restarting in {delay:.1f}s")
+        await asyncio.sleep(delay)
+        # a rolling restart, health replacement or shutdown may have taken over the slot meanwhile
+        if self.stopping or worker.retiring or worker not in self.workers.get(spec.name, []):
+            return
+        replacement = await self.start_worker(spec, worker.index)
+        self._replace(worker, replacement)
+        if await self.wait_ready(replacement):
+            print(f"[SUPERVISOR] {replacement.label} ready")
+
+    def _replace(self, old: Worker, new: Worker) -> bool:
+        workers = self.workers.get(old.spec.name, [])
+        if old not in workers:
+            return False
+        workers[workers.index(old)] = new
+        return True
+
+    async def _swap(self, old: Worker) -> bool:
+        """Start a replacement for `old`, wait until it is ready, then stop `old`"""
+        new = await self.start_worker(old.spec, old.index)
+        new.retiring = True  # not in the pool yet: if it dies, _watch must not restart it
+        self.pending.add(new)
+        try:
+            ready = await self.wait_ready(new)
+        finally:
+            self.pending.discard(new)
+        if not ready or self.stopping:
+            await self.stop_worker(new)
+            return False
+        new.retiring = False
+        if not self._replace(old, new):
+            # old crashed meanwhile and _watch already put a worker in its slot
+            await self.stop_worker(new)
+            return True
+        await self.stop_worker(old)
+        return True
+
+    def _probe_host(self) -> str:
+        return "127.0.0.1" if self.host in ("0.0.0.0", "") else self.host
+
+    def _spawn(self, coro):
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    # ---------- lifecycle ----------
+
+    async def start(self) -> bool:
+        for spec in self.specs:
+            if FD_PASSING:
+                self.sockets[spec.name] = listen_socket(self.host, spec.port)
+            else:
+                spec.workers = 1
+                self.sockets[spec.name] = None
+            self.workers[spec.name] = [await self.start_worker(spec, i) for i in range(spec.workers)]
+        results = await asyncio.gather(*(self.wait_ready(w) for ws in self.workers.values() for w in ws))
+        return all(results)
+
+    async def rolling_restart(self):
+        """Replace every worker one at a time, never dropping below N ready workers"""
+        if self.rolling:
+            print("[SUPERVISOR] Rolling restart already in progress")
+            return
+        self.rolling = True
+        print("[SUPERVISOR] Rolling restart")
+        try:
+            await self._roll()
+        finally:
+            self.rolling = False
+
+    async def _roll(self):
+        for spec in self.specs:
+            for old in list(self.workers[spec.name]):
+                if self.stopping:
+                    return
+                if not await self._swap(old):
+                    print(f"[SUPERVISOR] Replacement for {old.label} failed to start; keeping the old worker")
+                    return
+                print(f"[SUPERVISOR] {old.label} replaced")
+
+    async def check_health(self):
+        """Probe every worker once; replace those that failed HEALTH_FAILURES checks in a row"""
+        for spec in self.specs:
+            for worker in list(self.workers[spec.name]):
+                if self.stopping or self.rolling or worker.retiring or worker.proc.returncode is not None \
+                        or not worker.ready.is_set():
+                    continue  # restarts and rolls own these workers
+                if await self.probe_worker(worker, HEALTH_TIMEOUT):
+                    self.unhealthy.pop(worker.label, None)
+                    continue
+                failed = self.unhealthy.get(worker.label, 0) + 1
+                self.unhealthy[worker.label] = failed
+                print(f"[SUPERVISOR] {worker.label} failed its health check ({failed}/{HEALTH_FAILURES})")
+                if failed >= HEALTH_FAILURES and not self.rolling:
+                    self.unhealthy.pop(worker.label, None)
+                    print(f"[SUPERVISOR] Replacing unhealthy {worker.label}")
+                    if not await self._swap(worker):
+                        print(f"[SUPERVISOR] Replacement for {worker.label} failed to start; keeping it")
+
+    async def monitor(self):
+        while not self.stopping:
+            await asyncio.sleep(HEALTH_INTERVAL)
+            await self.check_health()
+
+    async def shutdown(self):
+        if self.stopping:
+            return
+        self.stopping = True
+        print("[SUPERVISOR] Shutting down services...")
+        workers = [w for ws in self.workers.values() for w in ws] + list(self.pending)
+        await asyncio.gather(*(self.stop_worker(w) for w in workers))
+        for sock in self.sockets.values():
+            if sock is not None:
+                sock.close()
+        self._stopped.set()
+
+    async def run(self) -> bool:
+        self._stopped = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        if os.name == "posix":
+            loop.add_signal_handler(signal.SIGINT, lambda: self._spawn(self.shutdown()))
+            loop.add_signal_handler(signal.SIGTERM, lambda: self._spawn(self.shutdown()))
+            loop.add_signal_handler(signal.SIGHUP, lambda: self._spawn(self.rolling_restart()))
+        started = time.perf_counter()
+        if not await self.start():
+            print("[SUPERVISOR] Services failed to become ready")
+            await self.shutdown()
+            return False
+        print(f"[SUPERVISOR] Ready in {time.perf_counter() - started:.1f}s")
+        for spec in self.specs:
+            print(f"  🌐 {spec.name}: http://{self._probe_host()}:{spec.port} ({spec.workers} workers)")
+            print(f"  📚 Docs:   http://{self._probe_host()}:{spec.port}/docs")
+        self._spawn(self.monitor())
+        try:
+            await self._stopped.wait()
+        except asyncio.CancelledError:  # Ctrl+C where signal handlers are unavailable
+            await self.shutdown()
+        return True
+
+
+def run_services(workers: int = API_WORKERS, host: str = "127.0.0.1", port: int = 8000) -> bool:
+    """Start the API service and supervise it until interrupted"""
     print("=" * 60)
-    print("✅ Both services are running!")
+    print("Cricket Prediction Services")
     print("=" * 60)
-    print()
-    print("Available at:")
-    print("  🌐 Main API:     http://127.0.0.1:8000")
-    print("  📚 Main Docs:    http://127.0.0.1:8000/docs")
-    print()
-    print("  🔐 Auth API:     http://127.0.0.1:8001")
-    print("  📚 Auth Docs:    http://127.0.0.1:8001/docs")
-    print()
-    print("Press Ctrl+C to stop all services...")
-    print()
-    
+    if not (BACKEND_DIR / "api.py").exists():
+        print(f"❌ Error: {BACKEND_DIR / 'api.py'} not found")
+        return False
+    supervisor = Supervisor([ServiceSpec("api", "api:app", port, workers)], host)
     try:
-        # Keep processes running
-        while True:
-            time.sleep(1)
-            if main_api_process.poll() is not None:
-                print("❌ Main API crashed!")
-                auth_db_process.terminate()
-                break
-            if auth_db_process.poll() is not None:
-                print("❌ Auth DB API crashed!")
-                main_api_process.terminate()
-                break
+        return asyncio.run(supervisor.run())
     except KeyboardInterrupt:
-        print()
-        print("Shutting down services...")
-        main_api_process.terminate()
-        auth_db_process.terminate()
-        print("✓ Services stopped")
         return True
-    
-    return False
+
 
 if __name__ == "__main__":
-    success = run_services()
+    parser = argparse.ArgumentParser(description="Run and supervise the API workers")
+    parser.add_argument("--workers", type=int, default=API_WORKERS)
+    parser.add_argument("--host", default=os.getenv("HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    args = parser.parse_args()
+    success = run_services(args.workers, args.host, args.port)
     sys.exit(0 if success else 1)
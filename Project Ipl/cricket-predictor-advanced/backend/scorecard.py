@@ -0,0 +1,369 @@
+"""
+Scorecard Uploads
+Streaming upload storage and incremental ball-by-ball scorecard analysis.
+
+Uploads are copied to disk in UPLOAD_CHUNK_SIZE pieces while being hashed,
+so memory stays flat however large the file is. The copy is aborted with
+UploadTooLarge past SCORECARD_MAX_BYTES. The stored file is named after its
+SHA-256, which means user-supplied filenames never reach the filesystem and
+re-uploading the same file is free.
+
+analyze_scorecard() reads the CSV in SCORECARD_CHUNK_ROWS chunks (only the
+columns it needs) and folds every chunk into running per-innings totals with
+vectorized groupbys. Deliveries must be in match order within an innings,
+which is how Cricsheet and the Kaggle IPL exports are laid out. Column names
+from both layouts are recognised, as is the older aggregate
+batsman/runs/bowler/wickets format. The result has one summary per
+innings: batting and bowling cards, powerplay/middle/death splits, fall of
+wickets and partnerships.
+"""
+
+from dataclasses import dataclass
+import hashlib
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+from fastapi.concurrency import run_in_threadpool
+
+SCORECARD_MAX_BYTES = int(os.getenv("SCORECARD_MAX_BYTES", str(64 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+SCORECARD_CHUNK_ROWS = int(os.getenv("SCORECARD_CHUNK_ROWS", "50000"))
+ALLOWED_EXTENSIONS = {".csv", ".txt"}
+
+# Canonical column -> accepted spellings (matched case-insensitively)
+COLUMN_ALIASES = {
+    "match": ["match_id", "id", "match"],
+    "innings": ["inning", "innings"],
+    "over": ["over", "overs"],
+    "batter": ["batter", "batsman", "striker", "batsman_name"],
+    "non_striker": ["non_striker", "non-striker"],
+    "bowler": ["bowler", "bowler_name"],
+    "batter_runs": ["batsman_runs", "batsman_run", "runs_off_bat", "batter_runs", "runs"],
+    "extras": ["extra_runs", "extras_run", "extras"],
+    "total_runs": ["total_runs", "total_run"],
+    "player_out": ["player_dismissed", "player_out"],
+    "dismissal": ["dismissal_kind", "kind", "wicket_type"],
+    "wicket_flag": ["isWicketDelivery", "is_wicket", "wickets"],
+    "batting_team": ["batting_team", "BattingTeam"],
+    "extra_type": ["extra_type"],
+    "wide_runs": ["wide_runs", "wides"],
+    "noball_runs": ["noball_runs", "noballs"],
+}
+# Dismissals not credited to the bowler
+NOT_BOWLER_WICKETS = {"run out", "retired hurt", "retired out", "obstructing the field"}
+PHASES = (("powerplay", 1, 6), ("middle", 7, 15), ("death", 16, 50))
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+@dataclass
+class StoredUpload:
+    path: str
+    sha256: str
+    size: int
+    duplicate: bool
+
+
+# ==================== STREAMING UPLOAD ====================
+
+def _extension(filename: str) -> str:
+    ext = os.path.splitext(filename or "")[1].lower()
+    return ext if ext in ALLOWED_EXTENSIONS else ".csv"
+
+
+async def store_upload(file, dest_dir: str, max_bytes: int = SCORECARD_MAX_BYTES) -> StoredUpload:
+    """Stream an UploadFile to dest_dir/<sha256><ext> without buffering it whole"""
+    os.makedirs(dest_dir, exist_ok=True)
+    tmp_path = os.path.join(dest_dir, f".upload-{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    size = 0
+    fh = await run_in_threadpool(open, tmp_path, "wb")
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge(f"upload exceeds {max_bytes} bytes")
+            digest.update(chunk)
+            await run_in_threadpool(fh.write, chunk)
+    except BaseException:
+        fh.close()
+        os.remove(tmp_path)
+        raise
+    await run_in_threadpool(fh.close)
+
+    sha = digest.hexdigest()
+    final_path = os.path.join(dest_dir, sha + _extension(file.filename))
+    duplicate = os.path.exists(final_path)
+    if duplicate:
+        os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, final_path)
+    return StoredUpload(final_path, sha, size, duplicate)
+
+
+# ==================== INCREMENTAL ANALYSIS ====================
+
+def resolve_columns(header) -> dict:
+    """Map canonical names to the file's own column names"""
+    lowered = {str(c).strip().lower(): c for c in header}
+    resolved = {}
+    for canonical, options in COLUMN_ALIASES.items():
+        for option in options:
+            if option.lower() in lowered:
+                resolved[canonical] = lowered[option.lower()]
+                break
+    # "runs" is the batter's runs in the old aggregate format, never the total
+    if resolved.get("total_runs") == resolved.get("batter_runs"):
+        resolved.pop("total_runs", None)
+    return resolved
+
+
+def normalize_deliveries(chunk: pd.DataFrame, cols: dict, offset: int = 0) -> pd.DataFrame:
+    """One chunk in canonical columns"""
+    def num(name):
+        if name not in cols:
+            return pd.Series(0, index=chunk.index, dtype="int64")
+        return pd.to_numeric(chunk[cols[name]], errors="coerce").fillna(0).astype("int64")
+
+    def text(name):
+        if name not in cols:
+            return pd.Series(None, index=chunk.index, dtype=object)
+        # read_csv already maps "", "NA" and friends to NaN
+        values = chunk[cols[name]].astype(object)
+        return values.where(values.notna(), None)
+
+    out = pd.DataFrame({
+        "match": chunk[cols["match"]].astype(str) if "match" in cols else "1",
+        "innings": num("innings").clip(lower=1) if "innings" in cols else 1,
+        "over": num("over"),
+        "batter": text("batter"),
+        "non_striker": text("non_striker"),
+        "bowler": text("bowler"),
+        "batter_runs": num("batter_runs"),
+        "extras": num("extras"),
+        "player_out": text("player_out"),
+        "dismissal": text("dismissal").str.lower() if "dismissal" in cols else None,
+        "batting_team": text("batting_team"),
+        "row": np.arange(offset, offset + len(chunk)),
+    }, index=chunk.index)
+    out["total_runs"] = num("total_runs") if "total_runs" in cols else out["batter_runs"] + out["extras"]
+
+    if "extra_type" in cols:
+        kind = chunk[cols["extra_type"]].astype("string").str.lower().fillna("")
+        out["is_wide"] = kind.str.startswith("wide").to_numpy()
+        out["is_noball"] = kind.str.startswith("noball").to_numpy()
+        out["bowler_extras"] = np.where(out["is_wide"] | out["is_noball"], out["extras"], 0)
+    else:
+        wides, noballs = num("wide_runs"), num("noball_runs")
+        out["is_wide"], out["is_noball"] = (wides > 0).to_numpy(), (noballs > 0).to_numpy()
+        out["bowler_extras"] = wides + noballs
+
+    if "player_out" in cols:
+        out["wicket"] = out["player_out"].notna().astype("int64")
+    else:
+        out["wicket"] = num("wicket_flag")
+    credited = ~out["dismissal"].isin(NOT_BOWLER_WICKETS) if "dismissal" in cols else True
+    out["bowler_wicket"] = out["wicket"] * credited
+    out["legal"] = (~(out["is_wide"] | out["is_noball"])).astype("int64")
+    out["faced"] = (~out["is_wide"]).astype("int64")
+    out["four"] = (out["batter_runs"] == 4).astype("int64")
+    out["six"] = (out["batter_runs"] == 6).astype("int64")
+    out["dot"] = ((out["total_runs"] == 0) & out["legal"].astype(bool)).astype("int64")
+    return out
+
+
+def _accumulate(total, part):
+    return part if total is None else total.add(part, fill_value=0)
+
+
+class ScorecardAccumulator:
+    """Running per-innings state folded one chunk at a time"""
+
+    def __init__(self):
+        self.rows = 0
+        self.innings = None   # (match, innings) -> runs, wickets, legal, extras
+        self.teams = {}
+        self.batting = None   # (match, innings, batter) -> runs, balls, 4s, 6s
+        self.batting_order = None  # (match, innings, batter) -> first row seen
+        self.bowling = None   # (match, innings, bowler) -> legal, runs, wickets, dots
+        self.overs = None     # (match, innings, over) -> runs, wickets, legal
+        self.dismissed = {}
+        self.fow = {}         # (match, innings) -> [fall of wicket dicts]
+        self.last_pair = {}   # (match, innings) -> (batter, non_striker) at the latest ball
+
+    def add(self, df: pd.DataFrame):
+        key = ["match", "innings"]
+        self.rows += len(df)
+
+        # running totals before this chunk, for fall-of-wicket scores
+        prior = self.innings if self.innings is not None else pd.DataFrame(columns=["runs", "wickets", "legal"])
+        df = df.assign(
+            score=df.groupby(key)["total_runs"].cumsum(),
+            wkts=df.groupby(key)["wicket"].cumsum(),
+            balls=df.groupby(key)["legal"].cumsum(),
+        )
+        if len(prior):
+            base = prior.reindex(pd.MultiIndex.from_frame(df[key])).fillna(0).to_numpy()
+            df["score"] += base[:, 0].astype("int64")
+            df["wkts"] += base[:, 1].astype("int64")
+            df["balls"] += base[:, 2].astype("int64")
+
+        self.innings = _accumulate(self.innings, df.groupby(key).agg(
+            runs=("total_runs", "sum"), wickets=("wicket", "sum"), legal=("legal", "sum"), extras=("extras", "sum")))
+        for (match, inn), team in df.dropna(subset=["batting_team"]).groupby(key)["batting_team"].first().items():
+            self.teams.setdefault((match, inn), team)
+
+        batters = df.dropna(subset=["batter"])
+        self.batting = _accumulate(self.batting, batters.groupby(key + ["batter"]).agg(
+            runs=("batter_runs", "sum"), balls=("faced", "sum"), fours=("four", "sum"), sixes=("six", "sum")))
+        first_seen = batters.groupby(key + ["batter"])["row"].min()
+        self.batting_order = first_seen if self.batting_order is None else \
+            pd.concat([self.batting_order, first_seen]).groupby(level=[0, 1, 2]).min()
+
+        bowlers = df.dropna(subset=["bowler"]).assign(conceded=lambda d: d["batter_runs"] + d["bowler_extras"])
+        self.bowling = _accumulate(self.bowling, bowlers.groupby(key + ["bowler"]).agg(
+            balls=("legal", "sum"), runs=("conceded", "sum"), wickets=("bowler_wicket", "sum"), dots=("dot", "sum")))
+
+        self.overs = _accumulate(self.overs, df.groupby(key + ["over"]).agg(
+            runs=("total_runs", "sum"), wickets=("wicket", "sum"), balls=("legal", "sum")))
+
+        # wicket deliveries are few: walk only those rows
+        for row in df[df["wicket"] > 0].itertuples(index=False):
+            innings_key = (row.match, row.innings)
+            out = row.player_out or row.batter
+            if out:
+                self.dismissed[innings_key + (out,)] = row.dismissal or "out"
+            self.fow.setdefault(innings_key, []).append({
+                "wicket": int(row.wkts),
+                "score": int(row.score),
+                "player_out": out,
+                "over": _overs(row.balls),
+                "balls": int(row.balls),
+                "pair": [p for p in (row.batter, row.non_striker) if p],
+            })
+        for (match, inn), last in df.groupby(key)[["batter", "non_striker"]].last().iterrows():
+            self.last_pair[(match, inn)] = [p for p in (last["batter"], last["non_striker"]) if isinstance(p, str)]
+
+    def summary(self) -> dict:
+        if self.innings is None:
+            return {"rows": 0, "innings": [], "top_batsmen": {}, "top_bowlers": {}}
+        # Cards and phases are shaped once over all innings, then split by key
+        # (per-innings .loc lookups dominate the runtime on season-sized files)
+        batting = self.batting.join(self.batting_order.rename("order")).reset_index()
+        batting = batting.sort_values(["match", "innings", "order"])
+        batting["strike_rate"] = _rate(batting["runs"] * 100, batting["balls"])
+        dismissals = pd.Series(self.dismissed, dtype=object)
+        batting["dismissal"] = (dismissals.reindex(pd.MultiIndex.from_frame(batting[["match", "innings", "batter"]]))
+                                .fillna("not out").to_numpy() if len(dismissals) else "not out")
+        batting_cards = _split(batting, ["batter", "runs", "balls", "fours", "sixes", "strike_rate", "dismissal"])
+
+        bowling = self.bowling.reset_index().sort_values(["match", "innings", "wickets", "runs"],
+                                                         ascending=[True, True, False, True])
+        bowling["economy"] = _rate(bowling["runs"] * 6, bowling["balls"])
+        bowling["overs"] = [_overs(b) for b in bowling["balls"]]
+        bowling_cards = _split(bowling, ["bowler", "overs", "runs", "wickets", "dots", "economy"])
+
+        overs = self.overs.reset_index()
+        over_no = overs["over"] + (1 if overs["over"].min() == 0 else 0)
+        overs["phase"] = np.select([over_no <= hi for _, _, hi in PHASES], [name for name, _, _ in PHASES], "death")
+        phases = overs.groupby(["match", "innings", "phase"])[["runs", "wickets", "balls"]].sum().reset_index()
+        phases["run_rate"] = _rate(phases["runs"] * 6, phases["balls"])
+        phase_rows = _split(phases, ["phase", "runs", "wickets", "balls", "run_rate"])
+
+        innings = []
+        for (match, inn), totals in zip(self.innings.index, self.innings.to_dict("records")):
+            key = (match, inn)
+            split = {row.pop("phase"): row for row in phase_rows.get(key, [])}
+            empty = {"runs": 0, "wickets": 0, "balls": 0, "run_rate": 0.0}
+            innings.append(self._innings(key, totals, batting_cards.get(key, []), bowling_cards.get(key, []),
+                                         {name: split.get(name, empty) for name, _, _ in PHASES}))
+
+        top_bats = self.batting.groupby(level="batter")["runs"].sum().nlargest(3)
+        top_bowl = self.bowling.groupby(level="bowler")["wickets"].sum().nlargest(3)
+        return {
+            "rows": self.rows,
+            "innings": innings,
+            "top_batsmen": {name: int(v) for name, v in top_bats.items()},
+            "top_bowlers": {name: int(v) for name, v in top_bowl.items()},
+        }
+
+    def _innings(self, key, totals, batting, bowling, phases) -> dict:
+        runs, legal = int(totals["runs"]), int(totals["legal"])
+        fow = self.fow.get(key, [])
+        partnerships, prev_score, prev_balls = [], 0, 0
+        for i, fall in enumerate(fow, start=1):
+            partnerships.append({"wicket": i, "runs": fall["score"] - prev_score,
+                                 "balls": fall["balls"] - prev_balls, "batters": fall["pair"]})
+            prev_score, prev_balls = fall["score"], fall["balls"]
+        if runs > prev_score or legal > prev_balls:
+            partnerships.append({"wicket": len(fow) + 1, "runs": runs - prev_score, "balls": legal - prev_balls,
+                                 "batters": self.last_pair.get(key, []), "unbroken": True})
+
+        return {
+            "match": key[0],
+            "innings": int(key[1]),
+            "batting_team": self.teams.get(key),
+            "runs": runs,
+            "wickets": int(totals["wickets"]),
+            "overs": _overs(legal),
+            "extras": int(totals["extras"]),
+            "run_rate": round(runs * 6 / legal, 2) if legal else 0.0,
+            "batting": batting,
+            "bowling": bowling,
+            "phases": phases,
+            "fall_of_wickets": [{k: v for k, v in f.items() if k not in ("pair", "balls")} for f in fow],
+            "partnerships": partnerships,
+        }
+
+
+def _rate(numerator, balls):
+    return (numerator / balls.where(balls > 0)).round(2).fillna(0.0)
+
+
+def _split(df: pd.DataFrame, columns) -> dict:
+    """Rows of df as plain-Python dicts grouped by (match, innings), in df order"""
+    counts = [c for c in ("runs", "balls", "fours", "sixes", "wickets", "dots") if c in columns]
+    df = df.astype({c: "int64" for c in counts})
+    grouped = {}
+    keys = zip(df["match"], df["innings"])
+    for key, record in zip(keys, df[list(columns)].to_dict("records")):
+        grouped.setdefault(key, []).append(record)
+    return grouped
+
+
+def _overs(legal_balls) -> str:
+    legal_balls = int(legal_balls)
+    return f"{legal_balls // 6}.{legal_balls % 6}"
+
+
+def read_columns(path: str) -> dict:
+    header = pd.read_csv(path, nrows=0, encoding="utf-8-sig").columns
+    return resolve_columns(header)
+
+
+def iter_deliveries(path: str, cols: dict, chunk_rows: int = SCORECARD_CHUNK_ROWS):
+    """Normalized delivery chunks, reading only the recognised columns"""
+    offset = 0
+    reader = pd.read_csv(path, usecols=sorted(set(cols.values())), chunksize=chunk_rows,
+                         encoding="utf-8-sig", low_memory=False)
+    for chunk in reader:
+        yield normalize_deliveries(chunk, cols, offset)
+        offset += len(chunk)
+
+
+def analyze_scorecard(path: str, chunk_rows: int = SCORECARD_CHUNK_ROWS) -> dict:
+    """Innings summaries for a ball-by-ball (or aggregate) scorecard CSV, read chunk by chunk"""
+    cols = read_columns(path)
+    if "batter" not in cols and "bowler" not in cols:
+        raise ValueError("scorecard needs a batter/batsman or bowler column")
+    state = ScorecardAccumulator()
+    for chunk in iter_deliveries(path, cols, chunk_rows):
+        state.add(chunk)
+    return state.summary()
@@ -0,0 +1,86 @@
+"""JSON serialization throughput for the largest API payloads.
+
+Requests /matches, /players and /pvp/players in-process, with the response
+cache disabled so every call serializes, and reports payload size, p50/p99
+latency and bytes/sec. For the DataFrame endpoints it also
+times the previous path, which was to_dict(orient="records") followed by
+jsonable_encoder and the stdlib encoder, on the same data.
+
+    python scripts/bench_json.py --iterations 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+os.environ["RESPONSE_CACHE_ENABLED"] = "0"
+import api
+
+ENDPOINTS = ["/matches", "/players", "/pvp/players"]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[k]
+
+
+def report(name, samples, size):
+    ms = [s * 1000 for s in samples]
+    total = sum(samples)
+    print(f"{name:<28} {size / 1024:9.1f} KiB  p50={percentile(ms, 50):7.2f}ms "
+          f"p99={percentile(ms, 99):7.2f}ms  {size * len(samples) / total / 1e6:8.1f} MB/s")
+
+
+def legacy_matches():
+    df = pd.read_csv(Path(api.__file__).parent / "data" / "matches.csv")
+    df = df.fillna("").astype(str).replace("nan", "")
+    content = {"matches": df.to_dict(orient="records"), "count": len(df)}
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def legacy_players():
+    df = pd.read_csv(Path(api.__file__).parent / "data" / "players1.csv")
+    df["Team"] = df["Player_Name"].apply(lambda x: api.PLAYER_TO_TEAM.get(x))
+    df = df.astype(object).where(df.notna(), None)
+    players = df.to_dict(orient="records")
+    content = {"players": players, "count": len(players)}
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+async def run(args):
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for path in ENDPOINTS:
+            await client.get(path)  # warm-up (lru caches, file cache)
+            samples, size = [], 0
+            for _ in range(args.iterations):
+                start = time.perf_counter()
+                resp = await client.get(path)
+                samples.append(time.perf_counter() - start)
+                size = len(resp.content)
+            report(f"GET {path}", samples, size)
+
+    for name, fn in (("legacy /matches", legacy_matches), ("legacy /players", legacy_players)):
+        samples, size = [], 0
+        for _ in range(args.iterations):
+            start = time.perf_counter()
+            size = len(fn())
+            samples.append(time.perf_counter() - start)
+        report(name, samples, size)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,121 @@
+"""Login latency under concurrent load.
+
+Drives /users/login in-process (httpx + ASGI transport, one event loop like a
+single uvicorn worker) against a throwaway SQLite database while a probe
+polls /health. Reports login and probe p50/p95/p99 so the effect of KDF
+cost and pool size on both login latency and event-loop responsiveness is
+visible.
+
+    python scripts/bench_login.py --users 20 --concurrency 32 --requests 400
+    PASSWORD_HASH_WORKERS=4 PASSWORD_HASH_ITERATIONS=200000 python scripts/bench_login.py
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import api
+import password_hashing
+from async_db import get_async_db
+from storage_config import create_async_storage_engine
+from unified_db import Base, create_user
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[k]
+
+
+def summarize(name, samples, elapsed=None):
+    ms = [s * 1000 for s in samples]
+    line = (f"{name:<8} n={len(ms):<5} p50={percentile(ms, 50):8.2f}ms "
+            f"p95={percentile(ms, 95):8.2f}ms p99={percentile(ms, 99):8.2f}ms "
+            f"mean={statistics.mean(ms) if ms else 0:8.2f}ms")
+    if elapsed:
+        line += f"  {len(ms) / elapsed:8.1f} req/s"
+    print(line)
+
+
+async def run(args):
+    tmp = tempfile.TemporaryDirectory()
+    url = f"sqlite:///{Path(tmp.name) / 'bench.db'}"
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    db = Session()
+    usernames = [f"bench_{i}" for i in range(args.users)]
+    for name in usernames:
+        create_user(db, name, name, "Secret123")
+    db.close()
+
+    async_engine = create_async_storage_engine(url)
+    AsyncSession = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def override_db():
+        async with AsyncSession() as session:
+            yield session
+
+    api.app.dependency_overrides[get_async_db] = override_db
+    transport = httpx.ASGITransport(app=api.app)
+    login_samples, probe_samples, errors = [], [], 0
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        queue = asyncio.Queue()
+        for i in range(args.requests):
+            queue.put_nowait(usernames[i % len(usernames)])
+
+        async def login_worker():
+            nonlocal errors
+            while not queue.empty():
+                name = queue.get_nowait()
+                start = time.perf_counter()
+                resp = await client.post("/users/login", json={"username": name, "password": "Secret123"})
+                login_samples.append(time.perf_counter() - start)
+                if resp.status_code != 200 or not resp.json().get("ok"):
+                    errors += 1
+
+        async def probe():
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/health")
+                probe_samples.append(time.perf_counter() - start)
+                await asyncio.sleep(0.01)
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(login_worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+
+    api.app.dependency_overrides.clear()
+    await async_engine.dispose()
+    stats = password_hashing.pool_stats()
+    print(f"KDF={password_hashing.PASSWORD_HASH_ALGORITHM} iterations={password_hashing.PBKDF2_ITERATIONS} "
+          f"workers={stats['workers']} max_pending={stats['max_pending']} concurrency={args.concurrency}")
+    summarize("login", login_samples, elapsed)
+    summarize("/health", probe_samples)
+    print(f"errors={errors}")
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=400)
+    asyncio.run(run(parser.parse_args()))
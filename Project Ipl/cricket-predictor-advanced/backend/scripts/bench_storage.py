@@ -0,0 +1,123 @@
+"""Concurrent register/login/deduct against the user store.
+
+Runs N worker processes (like N uvicorn workers) against one database file,
+each performing a mix of register, login and deduct operations through
+unified_db. Runs once with the plain SQLite engine and once with the tuned
+storage_config engine, and reports throughput, p50/p99 and lock errors.
+Password hashing is done once up front so the numbers reflect the database.
+
+    python scripts/bench_storage.py --workers 4 --ops 500
+    python scripts/bench_storage.py --url postgresql://user:pw@localhost/bench
+"""
+import argparse
+import multiprocessing as mp
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import password_hashing
+from storage_config import create_storage_engine
+from unified_db import Base, User, create_user, deduct_tokens, get_user_by_username, record_login
+
+OPS = ("register", "login", "deduct")
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[k]
+
+
+def worker(url, tuned, worker_id, ops, seed_users, password_hash, salt, results):
+    engine = create_storage_engine(url, tuned=tuned)
+    Session = sessionmaker(bind=engine)
+    rng = random.Random(worker_id)
+    samples = {op: [] for op in OPS}
+    errors = 0
+    for i in range(ops):
+        op = rng.choice(OPS)
+        db = Session()
+        start = time.perf_counter()
+        try:
+            if op == "register":
+                name = f"w{worker_id}_{i}"
+                create_user(db, name, name, None, password_hash=password_hash, salt=salt)
+            elif op == "login":
+                user = get_user_by_username(db, f"seed_{rng.randrange(seed_users)}")
+                record_login(db, user)
+            else:
+                deduct_tokens(db, f"seed_{rng.randrange(seed_users)}", 1)
+            samples[op].append(time.perf_counter() - start)
+        except OperationalError:
+            # "database is locked" and friends
+            db.rollback()
+            errors += 1
+        finally:
+            db.close()
+    engine.dispose()
+    results.put((samples, errors))
+
+
+def run(url, tuned, args):
+    engine = create_storage_engine(url, tuned=tuned)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    password_hash, salt = password_hashing.hash_password("Secret123")
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    db.add_all([
+        User(username=f"seed_{i}", display_name=f"seed_{i}", email=f"seed_{i}@bench.local",
+             password_hash=password_hash, salt=salt, referral_code=f"S{i:07d}", tokens=10 ** 6)
+        for i in range(args.seed_users)
+    ])
+    db.commit()
+    db.close()
+    engine.dispose()
+
+    results = mp.Queue()
+    procs = [
+        mp.Process(target=worker, args=(url, tuned, w, args.ops, args.seed_users, password_hash, salt, results))
+        for w in range(args.workers)
+    ]
+    started = time.perf_counter()
+    for p in procs:
+        p.start()
+    collected = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - started
+
+    label = "tuned" if tuned else "default"
+    total = sum(len(s) for samples, _ in collected for s in samples.values())
+    errors = sum(e for _, e in collected)
+    print(f"[{label}] workers={args.workers} ops={total} in {elapsed:.2f}s "
+          f"-> {total / elapsed:8.1f} ops/s  lock_errors={errors}")
+    for op in OPS:
+        ms = [s * 1000 for samples, _ in collected for s in samples[op]]
+        print(f"    {op:<8} n={len(ms):<5} p50={percentile(ms, 50):7.2f}ms p99={percentile(ms, 99):7.2f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--ops", type=int, default=500, help="operations per worker")
+    parser.add_argument("--seed-users", type=int, default=200)
+    parser.add_argument("--url", help="database URL (default: a throwaway SQLite file)")
+    args = parser.parse_args()
+
+    if args.url:
+        run(args.url, True, args)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            for tuned in (False, True):
+                path = os.path.join(tmp, f"bench_{int(tuned)}.db")
+                run(f"sqlite:///{path}", tuned, args)
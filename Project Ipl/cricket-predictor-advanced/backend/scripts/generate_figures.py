@@ -1,317 +1,432 @@
+"""Report figures for reports/figures.
+
+Every chart is registered with @figure(name, inputs). Each source
+(matches.csv, predictions.json, users.json) is read once in the parent
+process. The charts are then rendered in a process pool, and the parsed
+sources are shipped to each worker once.
+
+A chart is skipped when nothing it depends on has changed. The key hashes
+the chart's inputs, the source of the chart, of every function in this
+module it reaches (directly or through other helpers), of the input parsers
+and of the worker setup (theme), plus the dpi, the matplotlib and seaborn
+versions and FIGURES_VERSION. Keys are kept in
+reports/figures/.figures_manifest.json, so a nightly build only redraws
+charts whose data or code changed. Bump FIGURES_VERSION for a change the
+key cannot see, e.g. in matplotlibrc or fonts.
+
+    python scripts/generate_figures.py                       # changed charts only
+    python scripts/generate_figures.py --only team_wins,toss_*
+    python scripts/generate_figures.py --force --jobs 4
+    python scripts/generate_figures.py --list
+"""
+import argparse
+import fnmatch
+import hashlib
+import inspect
+import io
 import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-import pandas as pd
+
+import matplotlib
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
+import pandas as pd
 import seaborn as sns
 
-sns.set(style="whitegrid", context="talk")
-
 repo_root = Path(__file__).resolve().parents[1]  # backend/
 data_dir = repo_root / "data"
 out_dir = repo_root.parent / "reports" / "figures"
-out_dir.mkdir(parents=True, exist_ok=True)
+MANIFEST = ".figures_manifest.json"
+DPI = 200
+FIGURES_VERSION = 1
+
+FIGURES = {}  # name -> (draw function, input names)
+
+
+class Skip(Exception):
+    """Raised by a chart whose data is missing or unusable"""
 
-# Helper to safe read CSV
-def read_csv_safe(p):
-    try:
-        return pd.read_csv(p, low_memory=False)
-    except Exception as e:
-        print(f"Error reading {p}: {e}")
-        return pd.DataFrame()
 
-# 1) Matches per year
-matches_path = data_dir / "matches.csv"
-if matches_path.exists():
-    df = read_csv_safe(matches_path)
+def figure(name, inputs):
+    """Register draw(sources) -> matplotlib figure as <name>.png"""
+    def register(fn):
+        FIGURES[name] = (fn, tuple(inputs))
+        return fn
+    return register
+
+
+# ==================== SOURCES ====================
+
+def parse_matches(raw):
+    df = pd.read_csv(io.BytesIO(raw), low_memory=False)
     # Try to parse date column
     if "date" in df.columns:
         df["date_parsed"] = pd.to_datetime(df["date"], errors="coerce")
     else:
         df["date_parsed"] = pd.NaT
-    df["year"] = df["date_parsed"].dt.year.fillna("Unknown")
-    try:
-        order = df["year"].value_counts().index.tolist()
-        plt.figure(figsize=(8,5))
-        sns.countplot(data=df, y="year", order=order, palette="Blues_d")
-        plt.title("Matches per Year")
-        plt.xlabel("Count")
-        plt.ylabel("Year")
-        plt.tight_layout()
-        plt.savefig(out_dir / "matches_per_year.png", dpi=200)
-        plt.close()
-        print("Saved matches_per_year.png")
-    except Exception as e:
-        print("Error plotting matches_per_year:", e)
-else:
-    print("matches.csv not found; skipping matches_per_year")
-
-# 2) Team wins (assumes 'winner' column or 'winner' named differently)
-if matches_path.exists() and not df.empty:
-    if "winner" in df.columns:
-        wins = df["winner"].fillna("TBD").value_counts().reset_index()
-        wins.columns = ["team", "wins"]
-        plt.figure(figsize=(9,6))
-        sns.barplot(data=wins.head(20), x="wins", y="team", palette="viridis")
-        plt.title("Top Teams by Wins")
-        plt.tight_layout()
-        plt.savefig(out_dir / "team_wins.png", dpi=200)
-        plt.close()
-        print("Saved team_wins.png")
-    else:
-        print("No 'winner' column in matches.csv; skipping team_wins")
+    df["year"] = df["date_parsed"].dt.year.astype("Int64").astype(str).replace("<NA>", "Unknown")
+    return df
 
-# 3) Winning probability histogram from predictions.json
-pred_json = data_dir / "predictions.json"
-if pred_json.exists():
-    try:
-        with open(pred_json) as fh:
-            preds = json.load(fh)
-    except Exception as e:
-        preds = []
-        print("Error reading predictions.json:", e)
-    preds_list = []
+
+def parse_predictions(raw):
+    preds = json.loads(raw)
     if isinstance(preds, dict):
-        if "predictions" in preds and isinstance(preds["predictions"], list):
-            preds_list = preds["predictions"]
-        else:
-            # try to collect list values
-            for v in preds.values():
-                if isinstance(v, list):
-                    preds_list = v
-                    break
-    elif isinstance(preds, list):
-        preds_list = preds
-
-    prob_vals = [float(p.get("winning_probability")) for p in preds_list if p and p.get("winning_probability") is not None]
-    if prob_vals:
-        plt.figure(figsize=(8,5))
-        sns.histplot(prob_vals, bins=20, kde=True, color="#2a9d8f")
-        plt.title("Distribution of Winning Probability (Predictions)")
-        plt.xlabel("Winning Probability (%)")
-        plt.tight_layout()
-        plt.savefig(out_dir / "winning_probability_hist.png", dpi=200)
-        plt.close()
-        print("Saved winning_probability_hist.png")
-    else:
-        print("No winning_probability values found in predictions.json; skipping histogram")
-else:
-    print("predictions.json not found; skipping probability histogram")
+        if isinstance(preds.get("predictions"), list):
+            return preds["predictions"]
+        # try to collect list values
+        return next((v for v in preds.values() if isinstance(v, list)), [])
+    return preds if isinstance(preds, list) else []
+
+
+def parse_users(raw):
+    return pd.read_json(io.BytesIO(raw))
+
+
+SOURCES = {
+    "matches": ("matches.csv", parse_matches),
+    "predictions": ("predictions.json", parse_predictions),
+    "users": ("users.json", parse_users),
+}
+
+
+def load_sources(names):
+    """{name: parsed value or None}, {name: content hash}; each file is read once"""
+    values, hashes = {}, {}
+    for name in names:
+        filename, parse = SOURCES[name]
+        path = data_dir / filename
+        if not path.exists():
+            values[name], hashes[name] = None, "missing"
+            continue
+        raw = path.read_bytes()
+        hashes[name] = hashlib.sha256(raw).hexdigest()
+        try:
+            values[name] = parse(raw)
+        except Exception as e:
+            print(f"Error reading {path}: {e}")
+            values[name] = None
+    return values, hashes
+
+
+def require(sources, name, *columns):
+    value = sources.get(name)
+    if value is None or (isinstance(value, (pd.DataFrame, list)) and len(value) == 0):
+        raise Skip(f"{SOURCES[name][0]} not found or empty")
+    missing = [c for c in columns if c not in value.columns]
+    if missing:
+        raise Skip(f"no {', '.join(missing)} column in {SOURCES[name][0]}")
+    return value
+
+
+def barh(data, x, y, palette, title, xlabel=None, ylabel=None, size=(9, 6)):
+    fig = plt.figure(figsize=size)
+    sns.barplot(data=data, x=x, y=y, hue=y, palette=palette, legend=False)
+    plt.title(title)
+    if xlabel:
+        plt.xlabel(xlabel)
+    if ylabel:
+        plt.ylabel(ylabel)
+    return fig
+
+
+def counts(series, label, fill="Unknown"):
+    out = series.fillna(fill).value_counts().reset_index()
+    out.columns = [label, "count"]
+    return out
+
+
+# ==================== FIGURES ====================
+
+@figure("matches_per_year", inputs=["matches"])
+def matches_per_year(sources):
+    df = require(sources, "matches")
+    fig = plt.figure(figsize=(8, 5))
+    sns.countplot(data=df, y="year", order=df["year"].value_counts().index, hue="year", palette="Blues_d",
+                  legend=False)
+    plt.title("Matches per Year")
+    plt.xlabel("Count")
+    plt.ylabel("Year")
+    return fig
+
+
+@figure("team_wins", inputs=["matches"])
+def team_wins(sources):
+    df = require(sources, "matches", "winner")
+    return barh(counts(df["winner"], "team", "TBD").head(20), "count", "team", "viridis", "Top Teams by Wins",
+                xlabel="wins")
+
+
+@figure("winning_probability_hist", inputs=["predictions"])
+def winning_probability_hist(sources):
+    preds = sources.get("predictions") or []
+    values = [float(p.get("winning_probability")) for p in preds if p and p.get("winning_probability") is not None]
+    if not values:
+        raise Skip("no winning_probability values in predictions.json")
+    fig = plt.figure(figsize=(8, 5))
+    sns.histplot(values, bins=20, kde=True, color="#2a9d8f")
+    plt.title("Distribution of Winning Probability (Predictions)")
+    plt.xlabel("Winning Probability (%)")
+    return fig
+
+
+@figure("tokens_distribution", inputs=["users"])
+def tokens_distribution(sources):
+    users = require(sources, "users", "tokens")
+    fig = plt.figure(figsize=(8, 5))
+    sns.histplot(users["tokens"].fillna(0).astype(int), bins=15, kde=False, color="#4f6ef7")
+    plt.title("Users: Tokens Distribution")
+    plt.xlabel("Tokens")
+    return fig
+
+
+@figure("head_to_head_top20", inputs=["matches"])
+def head_to_head_top20(sources):
+    df = require(sources, "matches", "team1", "team2")
+    pairs = pd.Series([tuple(sorted(p)) for p in zip(df["team1"].astype(str), df["team2"].astype(str))])
+    top = pairs.value_counts().head(20).reset_index()
+    top.columns = ["pair", "count"]
+    top["pair_label"] = [f"{a} \nvs\n {b}" for a, b in top["pair"]]
+    return barh(top, "count", "pair_label", "magma", "Top 20 Head-to-Head Matchups", "Matches", "Team Pair",
+                size=(10, 8))
+
 
-# 4) Tokens distribution from users.json
-users_path = data_dir / "users.json"
-if users_path.exists():
+@figure("venue_distribution_top25", inputs=["matches"])
+def venue_distribution_top25(sources):
+    df = require(sources, "matches", "venue")
+    return barh(counts(df["venue"], "venue").head(25), "count", "venue", "cubehelix",
+                "Top Venues by Number of Matches", "Matches", "Venue", size=(10, 8))
+
+
+@figure("top_player_of_match_awards", inputs=["matches"])
+def top_player_of_match_awards(sources):
+    df = require(sources, "matches", "player_of_match")
+    return barh(counts(df["player_of_match"], "player").head(30), "count", "player", "viridis",
+                "Top Players by Player-of-the-Match Awards", "Awards", "Player", size=(8, 10))
+
+
+@figure("team_wins_timeseries_top6", inputs=["matches"])
+def team_wins_timeseries_top6(sources):
+    df = require(sources, "matches", "winner", "year")
+    years = pd.to_numeric(df["year"], errors="coerce")
+    valid = df[df["winner"].notna() & years.notna()].assign(year_num=years)
+    top_teams = df["winner"].value_counts().head(6).index
+    pivot = (valid[valid["winner"].isin(top_teams)].groupby(["year_num", "winner"]).size()
+             .unstack(fill_value=0).sort_index())
+    if pivot.empty:
+        raise Skip("no numeric year data")
+    fig, ax = plt.subplots(figsize=(12, 6))
+    pivot.plot(marker="o", ax=ax)
+    ax.set_title("Wins per Year — Top Teams")
+    ax.set_xlabel("Year")
+    ax.set_ylabel("Wins")
+    ax.legend(title="Team", bbox_to_anchor=(1.05, 1), loc="upper left")
+    return fig
+
+
+@figure("toss_decision_distribution", inputs=["matches"])
+def toss_decision_distribution(sources):
+    df = require(sources, "matches", "toss_decision")
+    fig = plt.figure(figsize=(6, 5))
+    sns.barplot(data=counts(df["toss_decision"], "decision"), x="decision", y="count", hue="decision",
+                palette="pastel", legend=False)
+    plt.title("Toss Decision Distribution")
+    plt.xlabel("Decision")
+    plt.ylabel("Count")
+    return fig
+
+
+@figure("result_margin_hist", inputs=["matches"])
+def result_margin_hist(sources):
+    df = require(sources, "matches", "result_margin")
+    margins = pd.to_numeric(df["result_margin"], errors="coerce").dropna()
+    if margins.empty:
+        raise Skip("no numeric result_margin values")
+    fig = plt.figure(figsize=(8, 5))
+    sns.histplot(margins, bins=30, kde=False, color="#ff7f0e")
+    plt.title("Result Margin Distribution")
+    plt.xlabel("Margin (runs/wickets)")
+    return fig
+
+
+@figure("toss_winner_top20", inputs=["matches"])
+def toss_winner_top20(sources):
+    df = require(sources, "matches", "toss_winner")
+    return barh(counts(df["toss_winner"], "team").head(20), "count", "team", "rocket", "Top Teams by Toss Wins",
+                "Toss Wins", "Team", size=(8, 6))
+
+
+@figure("team_vs_team_heatmap_top12", inputs=["matches"])
+def team_vs_team_heatmap_top12(sources):
+    df = require(sources, "matches", "team1", "team2")
+    mat = pd.crosstab(df["team1"].fillna("Unknown"), df["team2"].fillna("Unknown"))
+    # reduce to top teams to keep heatmap readable
+    top = mat.sum(axis=1).add(mat.sum(axis=0), fill_value=0).sort_values(ascending=False).head(12).index
+    fig = plt.figure(figsize=(10, 8))
+    sns.heatmap(mat.loc[mat.index.isin(top), mat.columns.isin(top)], cmap="YlGnBu", annot=False)
+    plt.title("Team vs Team Match Counts (Top 12 Teams)")
+    plt.xlabel("Team 2")
+    plt.ylabel("Team 1")
+    return fig
+
+
+def scored_predictions(sources):
+    """Predictions joined to the actual winner by match_id, with pred_correct"""
+    df = require(sources, "matches", "id", "winner")
+    preds = sources.get("predictions")
+    if not preds:
+        raise Skip("predictions.json not found or empty")
+    preds_df = pd.DataFrame(preds)
+    preds_df["match_id"] = pd.to_numeric(preds_df.get("match_id"), errors="coerce")
+    matches = df[["id", "winner"]].assign(id=pd.to_numeric(df["id"], errors="coerce"))
+    merged = preds_df.merge(matches, left_on="match_id", right_on="id", how="left")
+    merged = merged[merged["winner"].notna()].copy()
+    if merged.empty:
+        raise Skip("no predictions match a match_id")
+    merged["pred_correct"] = merged["predicted_winner"].astype(str) == merged["winner"].astype(str)
+    return merged
+
+
+@figure("prediction_accuracy", inputs=["matches", "predictions"])
+def prediction_accuracy(sources):
+    acc = scored_predictions(sources)["pred_correct"].mean() * 100
+    fig = plt.figure(figsize=(6, 4))
+    sns.barplot(x=["Accuracy"], y=[acc], color="#2ca02c")
+    plt.ylim(0, 100)
+    plt.title(f"Prediction Accuracy (matched by match_id): {acc:.1f}%")
+    return fig
+
+
+@figure("winning_probability_by_outcome", inputs=["matches", "predictions"])
+def winning_probability_by_outcome(sources):
+    merged = scored_predictions(sources)
+    merged["winning_probability"] = pd.to_numeric(merged.get("winning_probability"), errors="coerce")
+    fig = plt.figure(figsize=(8, 5))
+    sns.kdeplot(data=merged, x="winning_probability", hue="pred_correct", common_norm=False)
+    plt.title("Winning Probability Distribution: Correct vs Incorrect Predictions")
+    plt.xlabel("Winning Probability (%)")
+    return fig
+
+
+# ==================== RENDERING ====================
+
+_sources = {}
+
+
+def init_worker(sources):
+    global _sources
+    _sources = sources
+    sns.set_theme(style="whitegrid", context="talk")
+
+
+def render(name, dpi):
+    """Draw one chart in a worker; returns (name, status, message, seconds)"""
+    started = time.perf_counter()
+    draw, _ = FIGURES[name]
     try:
-        users = pd.read_json(users_path)
+        fig = draw(_sources)
+    except Skip as e:
+        return name, "skipped", str(e), time.perf_counter() - started
     except Exception as e:
-        users = pd.DataFrame()
-        print("Error reading users.json:", e)
-    if not users.empty and "tokens" in users.columns:
-        plt.figure(figsize=(8,5))
-        sns.histplot(users["tokens"].fillna(0).astype(int), bins=15, kde=False, color="#4f6ef7")
-        plt.title("Users: Tokens Distribution")
-        plt.xlabel("Tokens")
-        plt.tight_layout()
-        plt.savefig(out_dir / "tokens_distribution.png", dpi=200)
-        plt.close()
-        print("Saved tokens_distribution.png")
-    else:
-        print("No 'tokens' in users.json or users empty; skipping tokens_distribution")
-else:
-    print("users.json not found; skipping tokens_distribution")
-
-print("Figures generation complete. Output directory:", out_dir)
-
-# --- Additional figures ---
-try:
-    # Head-to-head (unordered pair counts)
-    if not df.empty and "team1" in df.columns and "team2" in df.columns:
-        pair_series = df.apply(lambda r: tuple(sorted([str(r['team1']), str(r['team2'])])), axis=1)
-        pair_counts = pair_series.value_counts().reset_index()
-        pair_counts.columns = ['pair', 'count']
-        pair_counts['pair_label'] = pair_counts['pair'].apply(lambda t: f"{t[0]} \nvs\n {t[1]}")
-        plt.figure(figsize=(10,8))
-        sns.barplot(data=pair_counts.head(20), x='count', y='pair_label', palette='magma')
-        plt.title('Top 20 Head-to-Head Matchups')
-        plt.xlabel('Matches')
-        plt.ylabel('Team Pair')
-        plt.tight_layout()
-        plt.savefig(out_dir / 'head_to_head_top20.png', dpi=200)
-        plt.close()
-        print('Saved head_to_head_top20.png')
-    else:
-        print('Insufficient team columns for head-to-head; skipping')
-
-    # Venue distribution (top venues)
-    if not df.empty and 'venue' in df.columns:
-        venue_counts = df['venue'].fillna('Unknown').value_counts().reset_index()
-        venue_counts.columns = ['venue', 'count']
-        plt.figure(figsize=(10,8))
-        sns.barplot(data=venue_counts.head(25), x='count', y='venue', palette='cubehelix')
-        plt.title('Top Venues by Number of Matches')
-        plt.xlabel('Matches')
-        plt.ylabel('Venue')
-        plt.tight_layout()
-        plt.savefig(out_dir / 'venue_distribution_top25.png', dpi=200)
-        plt.close()
-        print('Saved venue_distribution_top25.png')
-    else:
-        print('No venue column; skipping venue distribution')
-
-    # Top players by 'player_of_match' awards
-    if not df.empty and 'player_of_match' in df.columns:
-        pom = df['player_of_match'].fillna('Unknown').value_counts().reset_index()
-        pom.columns = ['player', 'awards']
-        plt.figure(figsize=(8,10))
-        sns.barplot(data=pom.head(30), x='awards', y='player', palette='viridis')
-        plt.title('Top Players by Player-of-the-Match Awards')
-        plt.xlabel('Awards')
-        plt.ylabel('Player')
-        plt.tight_layout()
-        plt.savefig(out_dir / 'top_player_of_match_awards.png', dpi=200)
-        plt.close()
-        print('Saved top_player_of_match_awards.png')
-    else:
-        print("No 'player_of_match' column; skipping top players chart")
-
-    # Team wins time-series (top teams over years)
-    if not df.empty and 'winner' in df.columns and 'year' in df.columns:
-        # ensure year is numeric for sorting
-        df_year = df.copy()
-        df_year['year_num'] = pd.to_numeric(df_year['year'], errors='coerce')
-        wins_by_year = df_year[df_year['winner'].notna() & df_year['year_num'].notna()].groupby(['year_num', 'winner']).size().reset_index(name='wins')
-        # pick top teams overall
-        top_teams = df['winner'].value_counts().head(6).index.tolist()
-        pivot = wins_by_year[wins_by_year['winner'].isin(top_teams)].pivot(index='year_num', columns='winner', values='wins').fillna(0)
-        pivot = pivot.sort_index()
-        if not pivot.empty:
-            plt.figure(figsize=(12,6))
-            pivot.plot(marker='o')
-            plt.title('Wins per Year — Top Teams')
-            plt.xlabel('Year')
-            plt.ylabel('Wins')
-            plt.legend(title='Team', bbox_to_anchor=(1.05, 1), loc='upper left')
-            plt.tight_layout()
-            plt.savefig(out_dir / 'team_wins_timeseries_top6.png', dpi=200)
-            plt.close()
-            print('Saved team_wins_timeseries_top6.png')
-        else:
-            print('No numeric year data for team wins time-series; skipping')
-    else:
-        print('Insufficient data for team wins time-series; skipping')
-except Exception as e:
-    print('Error while generating additional figures:', e)
-
-# --- Even more figures ---
-try:
-    # Toss decision distribution
-    if not df.empty and 'toss_decision' in df.columns:
-        td = df['toss_decision'].fillna('Unknown').value_counts().reset_index()
-        td.columns = ['decision', 'count']
-        plt.figure(figsize=(6,5))
-        sns.barplot(data=td, x='decision', y='count', palette='pastel')
-        plt.title('Toss Decision Distribution')
-        plt.xlabel('Decision')
-        plt.ylabel('Count')
-        plt.tight_layout()
-        plt.savefig(out_dir / 'toss_decision_distribution.png', dpi=200)
-        plt.close()
-        print('Saved toss_decision_distribution.png')
-    else:
-        print('No toss_decision column; skipping toss decision distribution')
-
-    # Result margin distribution (numeric)
-    if not df.empty and 'result_margin' in df.columns:
-        rm = pd.to_numeric(df['result_margin'], errors='coerce').dropna()
-        if not rm.empty:
-            plt.figure(figsize=(8,5))
-            sns.histplot(rm, bins=30, kde=False, color='#ff7f0e')
-            plt.title('Result Margin Distribution')
-            plt.xlabel('Margin (runs/wickets)')
-            plt.tight_layout()
-            plt.savefig(out_dir / 'result_margin_hist.png', dpi=200)
-            plt.close()
-            print('Saved result_margin_hist.png')
-        else:
-            print('No numeric result_margin values; skipping result margin histogram')
-    else:
-        print('No result_margin column; skipping result margin histogram')
-
-    # Toss winners top teams
-    if not df.empty and 'toss_winner' in df.columns:
-        tw = df['toss_winner'].fillna('Unknown').value_counts().reset_index()
-        tw.columns = ['team', 'count']
-        plt.figure(figsize=(8,6))
-        sns.barplot(data=tw.head(20), x='count', y='team', palette='rocket')
-        plt.title('Top Teams by Toss Wins')
-        plt.xlabel('Toss Wins')
-        plt.ylabel('Team')
-        plt.tight_layout()
-        plt.savefig(out_dir / 'toss_winner_top20.png', dpi=200)
-        plt.close()
-        print('Saved toss_winner_top20.png')
-    else:
-        print('No toss_winner column; skipping toss winners chart')
-
-    # Team vs Team matrix heatmap (team1 vs team2 counts)
-    if not df.empty and 'team1' in df.columns and 'team2' in df.columns:
-        mat = pd.crosstab(df['team1'].fillna('Unknown'), df['team2'].fillna('Unknown'))
-        # reduce to top teams to keep heatmap readable
-        top = (mat.sum(axis=1) + mat.sum(axis=0)).sort_values(ascending=False).head(12).index.tolist()
-        mat_small = mat.loc[mat.index.isin(top), mat.columns.isin(top)]
-        plt.figure(figsize=(10,8))
-        sns.heatmap(mat_small, cmap='YlGnBu', annot=False)
-        plt.title('Team vs Team Match Counts (Top 12 Teams)')
-        plt.xlabel('Team 2')
-        plt.ylabel('Team 1')
-        plt.tight_layout()
-        plt.savefig(out_dir / 'team_vs_team_heatmap_top12.png', dpi=200)
-        plt.close()
-        print('Saved team_vs_team_heatmap_top12.png')
-    else:
-        print('Insufficient team columns for team-vs-team heatmap; skipping')
+        plt.close("all")
+        return name, "error", f"{type(e).__name__}: {e}", time.perf_counter() - started
+    try:
+        fig.tight_layout()
+        fig.savefig(out_dir / f"{name}.png", dpi=dpi)
+    finally:
+        plt.close(fig)
+    return name, "saved", "", time.perf_counter() - started
 
-    # Prediction accuracy analysis (where match_id maps to actual match winner)
-    pred_path = data_dir / 'predictions.json'
-    if pred_path.exists():
-        try:
-            with open(pred_path, 'r', encoding='utf-8') as fh:
-                preds = json.load(fh)
-        except Exception:
-            preds = []
-
-        if preds and not df.empty and 'id' in df.columns and 'winner' in df.columns:
-            preds_df = pd.DataFrame(preds)
-            preds_df['match_id'] = pd.to_numeric(preds_df.get('match_id'), errors='coerce')
-            matches_df = df.copy()
-            matches_df['id'] = pd.to_numeric(matches_df['id'], errors='coerce')
-            merged = preds_df.merge(matches_df[['id', 'winner']], left_on='match_id', right_on='id', how='left')
-            merged_valid = merged[merged['winner'].notna()]
-            if not merged_valid.empty:
-                merged_valid['pred_correct'] = merged_valid.apply(lambda r: str(r.get('predicted_winner')) == str(r.get('winner')), axis=1)
-                acc = merged_valid['pred_correct'].mean() * 100
-                plt.figure(figsize=(6,4))
-                sns.barplot(x=['Accuracy'], y=[acc], palette=['#2ca02c'])
-                plt.ylim(0,100)
-                plt.title(f'Prediction Accuracy (matched by match_id): {acc:.1f}%')
-                plt.tight_layout()
-                plt.savefig(out_dir / 'prediction_accuracy.png', dpi=200)
-                plt.close()
-                print('Saved prediction_accuracy.png')
-
-                plt.figure(figsize=(8,5))
-                merged_valid['winning_probability'] = pd.to_numeric(merged_valid.get('winning_probability'), errors='coerce')
-                sns.kdeplot(data=merged_valid, x='winning_probability', hue='pred_correct', common_norm=False)
-                plt.title('Winning Probability Distribution: Correct vs Incorrect Predictions')
-                plt.xlabel('Winning Probability (%)')
-                plt.tight_layout()
-                plt.savefig(out_dir / 'winning_probability_by_outcome.png', dpi=200)
-                plt.close()
-                print('Saved winning_probability_by_outcome.png')
-            else:
-                print('No matching match_id entries found to compute prediction accuracy; skipping accuracy plots')
-        else:
-            print('predictions.json missing or matches data inadequate; skipping prediction accuracy')
+
+def module_functions(fn, found=None):
+    """{name: function} for fn and every function of this module it calls, transitively
+    (scored_predictions -> require, ...), including calls made in nested lambdas"""
+    found = {} if found is None else found
+    found[fn.__name__] = fn
+    codes = [fn.__code__]
+    while codes:
+        code = codes.pop()
+        codes.extend(c for c in code.co_consts if inspect.iscode(c))
+        for ref in code.co_names:
+            helper = globals().get(ref)
+            if inspect.isfunction(helper) and helper.__module__ == __name__ and ref not in found:
+                module_functions(helper, found)
+    return found
+
+
+def figure_key(name, hashes, dpi):
+    draw, inputs = FIGURES[name]
+    functions = module_functions(draw)
+    for fn in [init_worker, render] + [SOURCES[source][1] for source in inputs]:
+        module_functions(fn, functions)
+    h = hashlib.sha256(f"v{FIGURES_VERSION} matplotlib={matplotlib.__version__} "
+                       f"seaborn={sns.__version__} dpi={dpi}".encode())
+    for ref in sorted(functions):
+        h.update(inspect.getsource(functions[ref]).encode())
+    for source in inputs:
+        h.update(f"{source}={hashes[source]}".encode())
+    return h.hexdigest()
+
+
+def select(patterns):
+    if not patterns:
+        return list(FIGURES)
+    wanted = [p.strip() for p in ",".join(patterns).split(",") if p.strip()]
+    names = [n for n in FIGURES if any(fnmatch.fnmatch(n, p) for p in wanted)]
+    unknown = [p for p in wanted if not any(fnmatch.fnmatch(n, p) for n in FIGURES)]
+    if unknown:
+        raise SystemExit(f"unknown figure(s): {', '.join(unknown)}; see --list")
+    return names
+
+
+def main(args):
+    names = select(args.only)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = out_dir / MANIFEST
+    try:
+        manifest = json.loads(manifest_path.read_text())
+    except (OSError, ValueError):
+        manifest = {}
+
+    started = time.perf_counter()
+    needed = sorted({s for n in names for s in FIGURES[n][1]})
+    sources, hashes = load_sources(needed)
+    keys = {n: figure_key(n, hashes, args.dpi) for n in names}
+    todo = [n for n in names
+            if args.force or manifest.get(n) != keys[n] or not (out_dir / f"{n}.png").exists()]
+    for name in names:
+        if name not in todo:
+            print(f"Unchanged {name}.png")
+    if todo:
+        used = {s: sources[s] for s in {s for n in todo for s in FIGURES[n][1]}}
+        jobs = max(1, min(args.jobs, len(todo)))
+        with ProcessPoolExecutor(jobs, initializer=init_worker, initargs=(used,)) as pool:
+            futures = [pool.submit(render, name, args.dpi) for name in todo]
+            for future in as_completed(futures):
+                name, status, message, seconds = future.result()
+                if status == "saved":
+                    manifest[name] = keys[name]
+                    print(f"Saved {name}.png ({seconds:.1f}s)")
+                else:
+                    manifest.pop(name, None)
+                    print(f"{'Skipping' if status == 'skipped' else 'Error in'} {name}: {message}")
+        manifest_path.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    print(f"Figures generation complete in {time.perf_counter() - started:.1f}s "
+          f"({len(todo)} rendered, {len(names) - len(todo)} unchanged). Output directory: {out_dir}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="*", help="figure names or globs (comma or space separated)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--dpi", type=int, default=DPI)
+    parser.add_argument("--force", action="store_true", help="redraw even if inputs are unchanged")
+    parser.add_argument("--list", action="store_true", help="list registered figures and exit")
+    args = parser.parse_args()
+    if args.list:
+        for name, (_, inputs) in FIGURES.items():
+            print(f"{name:<32}{', '.join(inputs)}")
     else:
-        print('predictions.json not found; skipping prediction accuracy')
-except Exception as e:
-    print('Error while generating extra figures:', e)
+        main(args)
@@ -0,0 +1,379 @@
+"""HTTP load test with a realistic traffic mix.
+
+Starts uvicorn (api:app) against a throwaway user database, unless --url
+points at a running server. Then N virtual users run weighted scenarios
+with exponential think time:
+
+    search    autocomplete burst: /pvp/search once per keystroke
+    pvp       /pvp lookup of a batter against a bowler
+    predict   POST /predict/match as a logged-in user (charges tokens)
+    login     POST /users/login
+    register  POST /users/register for a new account
+    board     /leaderboard poll
+    matches   /matches poll
+
+Accounts are seeded before the run. Their names are derived from data/users.json
+(like simulate_predictions.py), and each account gets enough tokens for the run
+through /_admin/tokens/grant. That needs the server's ADMIN_TOKEN: pass it with
+--admin-token (default: $ADMIN_TOKEN). A server started by the harness gets a
+fresh random one.
+For each route the harness reports throughput, p50/p95/p99 and errors. Errors are
+split into transport failures, non-2xx responses and 200 responses carrying
+{"ok": false} or "error". Results can be saved and compared with an earlier run.
+
+Needs httpx, which is in requirements-dev.txt (pip install -r requirements-dev.txt).
+
+    python scripts/load_test.py --users 50 --duration 60 --save before.json
+    python scripts/load_test.py --users 50 --duration 60 --compare before.json
+    python scripts/load_test.py --url http://127.0.0.1:8000 --mix search=50,pvp=30,matches=20
+
+PvP routes use the players the server knows about. To exercise
+compute_pvp/search_players at scale, generate deliveries first with
+python synthetic_data.py, which writes bench/ball_by_ball.csv. A server started
+by the harness reads that file through BALL_DATA_PATH; --ball-data picks
+another file. A server given with --url needs BALL_DATA_PATH set by hand.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import secrets
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+
+BACKEND = Path(__file__).resolve().parents[1]
+USERS_FILE = BACKEND / "data" / "users.json"
+PASSWORD = "load-test-password"
+MIX = {"search": 30, "pvp": 20, "predict": 20, "board": 10, "matches": 10, "login": 7, "register": 3}
+WEATHERS = ["Sunny", "Hot", "Rainy", "Cloudy"]
+SEED_TOKENS = 1000000
+BENCH_BALL_DATA = BACKEND / "bench" / "ball_by_ball.csv"  # synthetic_data.py's default output
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[k]
+
+
+class Stats:
+    """Latencies and outcomes per route label ("GET /pvp/search")"""
+
+    def __init__(self):
+        self.routes = {}
+        self.recording = False
+
+    def add(self, label, seconds, outcome=None, detail=None):
+        if not self.recording:
+            return
+        entry = self.routes.setdefault(label, {"latency": [], "transport": 0, "http": 0, "app": 0, "sample": None})
+        entry["latency"].append(seconds)
+        if outcome:
+            entry[outcome] += 1
+            entry["sample"] = detail
+
+    def summary(self, elapsed):
+        out = {}
+        for label, entry in sorted(self.routes.items()):
+            ms = [s * 1000 for s in entry["latency"]]
+            errors = entry["transport"] + entry["http"] + entry["app"]
+            out[label] = {
+                "n": len(ms), "rps": round(len(ms) / elapsed, 2),
+                "p50": round(percentile(ms, 50), 2), "p95": round(percentile(ms, 95), 2),
+                "p99": round(percentile(ms, 99), 2), "max": round(max(ms), 2),
+                "mean": round(statistics.mean(ms), 2),
+                "errors": errors, "error_rate": round(errors / len(ms), 4),
+                "transport_errors": entry["transport"], "http_errors": entry["http"], "app_errors": entry["app"],
+                "last_error": entry["sample"],
+            }
+        return out
+
+
+class LoadTest:
+    def __init__(self, client, stats, args):
+        self.client = client
+        self.stats = stats
+        self.args = args
+        self.run_id = uuid.uuid4().hex[:6]
+        self.accounts = []  # [username, bearer token]
+        self.batsmen = ["V Kohli"]
+        self.bowlers = ["JJ Bumrah"]
+        self.teams = ["CSK", "MI"]
+        self.venues = ["Wankhede Stadium, Mumbai"]
+        self.registered = 0
+
+    async def request(self, label, method, url, check_body=False, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            self.stats.add(label, time.perf_counter() - started, "transport", f"{type(e).__name__}: {e}")
+            return None
+        elapsed = time.perf_counter() - started
+        outcome = detail = None
+        body = None
+        if response.status_code >= 400:
+            outcome, detail = "http", f"HTTP {response.status_code}"
+        elif check_body:
+            try:
+                body = response.json()
+            except ValueError:
+                body = None
+            if isinstance(body, dict) and (body.get("ok") is False or "error" in body):
+                outcome, detail = "app", str(body.get("error"))[:200]
+        self.stats.add(label, elapsed, outcome, detail)
+        return body
+
+    # ---------- setup ----------
+
+    async def setup(self):
+        r = await self.client.get("/pvp/players")
+        if r.status_code == 200:
+            players = r.json()
+            self.batsmen = players.get("batsmen") or self.batsmen
+            self.bowlers = players.get("bowlers") or self.bowlers
+        self.teams = (await self.client.get("/teams")).json().get("teams") or self.teams
+        self.venues = (await self.client.get("/venues")).json().get("venues") or self.venues
+
+        bases = seed_usernames()
+        names = [f"{bases[i % len(bases)]}_lt{self.run_id}_{i}" for i in range(self.args.accounts)]
+        sem = asyncio.Semaphore(8)
+
+        async def register(name):
+            async with sem:
+                r = await self.client.post("/users/register", json={"username": name, "password": PASSWORD})
+                body = r.json()
+                if body.get("ok"):
+                    self.accounts.append([name, body["token"]])
+
+        await asyncio.gather(*(register(n) for n in names))
+        if not self.accounts:
+            raise RuntimeError("could not register any load-test accounts")
+        r = await self.client.post("/_admin/tokens/grant",
+                                   json={"tokens": SEED_TOKENS, "usernames": [a[0] for a in self.accounts]},
+                                   headers={"X-Admin-Token": self.args.admin_token or ""})
+        if r.status_code != 200 or not r.json().get("ok"):
+            raise RuntimeError(f"could not grant tokens (HTTP {r.status_code}); pass the server's --admin-token")
+        print(f"[LOAD] Seeded {len(self.accounts)} accounts, {len(self.batsmen)} batters, {len(self.bowlers)} bowlers")
+
+    # ---------- scenarios ----------
+
+    async def search(self):
+        name = random.choice(self.batsmen + self.bowlers)
+        query = name.split()[-1].lower()
+        for n in range(1, min(len(query), 6) + 1):
+            await self.request("GET /pvp/search", "GET", "/pvp/search", params={"q": query[:n], "limit": 10})
+            await asyncio.sleep(random.uniform(0.05, 0.15))  # typing
+
+    async def pvp(self):
+        await self.request("GET /pvp", "GET", "/pvp",
+                           params={"batsman": random.choice(self.batsmen), "bowler": random.choice(self.bowlers)})
+
+    async def predict(self):
+        account = random.choice(self.accounts)
+        team1, team2 = random.sample(self.teams, 2)
+        payload = {"team1": team1, "team2": team2, "venue": random.choice(self.venues),
+                   "weather": random.choice(WEATHERS), "runsTeam1": random.randint(80, 220),
+                   "runsTeam2": random.randint(80, 220), "wicketsTeam1": random.randint(0, 10),
+                   "wicketsTeam2": random.randint(0, 10), "username": account[0]}
+        await self.request("POST /predict/match", "POST", "/predict/match", check_body=True, json=payload,
+                           headers={"Authorization": f"Bearer {account[1]}"})
+
+    async def login(self):
+        account = random.choice(self.accounts)
+        body = await self.request("POST /users/login", "POST", "/users/login", check_body=True,
+                                  json={"username": account[0], "password": PASSWORD})
+        if body and body.get("token"):
+            account[1] = body["token"]
+
+    async def register(self):
+        self.registered += 1
+        name = f"new_lt{self.run_id}_{self.registered}"
+        await self.request("POST /users/register", "POST", "/users/register", check_body=True,
+                           json={"username": name, "password": PASSWORD})
+
+    async def board(self):
+        await self.request("GET /leaderboard", "GET", "/leaderboard", params={"top": 20})
+
+    async def matches(self):
+        await self.request("GET /matches", "GET", "/matches")
+
+    async def virtual_user(self, mix, deadline):
+        names, weights = zip(*mix.items())
+        while time.monotonic() < deadline:
+            await getattr(self, random.choices(names, weights)[0])()
+            await asyncio.sleep(random.expovariate(1.0 / self.args.think) if self.args.think else 0)
+
+
+def seed_usernames():
+    try:
+        users = json.loads(USERS_FILE.read_text())
+        names = [u["username"] for u in users if u.get("username")]
+    except (OSError, ValueError, TypeError, KeyError):
+        names = []
+    return names or ["testuser"]
+
+
+def parse_mix(text):
+    if not text:
+        return dict(MIX)
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in MIX:
+            raise SystemExit(f"unknown scenario {name!r}; choose from {', '.join(MIX)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+# ==================== SERVER ====================
+
+def start_server(args, workdir):
+    env = dict(os.environ, USERS_DATABASE_URL=f"sqlite:///{Path(workdir) / 'load_users.db'}",
+               ADMIN_TOKEN=args.admin_token, PYTHONUNBUFFERED="1")
+    if args.ball_data:
+        env["BALL_DATA_PATH"] = str(Path(args.ball_data).resolve())
+    cmd = [sys.executable, "-m", "uvicorn", "api:app", "--host", "127.0.0.1", "--port", str(args.port),
+           "--workers", str(args.server_workers), "--log-level", "warning"]
+    log = open(Path(workdir) / "server.log", "wb")
+    proc = subprocess.Popen(cmd, cwd=str(BACKEND), env=env, stdout=log, stderr=subprocess.STDOUT)
+    return proc, log
+
+
+async def wait_healthy(client, proc, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.3)
+    raise RuntimeError(f"server not healthy after {timeout}s")
+
+
+# ==================== REPORT ====================
+
+def print_report(summary, elapsed):
+    total = sum(r["n"] for r in summary.values())
+    errors = sum(r["errors"] for r in summary.values())
+    print(f"\n{total} requests in {elapsed:.1f}s = {total / elapsed:.1f} req/s, "
+          f"{errors} errors ({errors / total if total else 0:.2%})")
+    print(f"{'route':<22}{'n':>7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'errors':>9}")
+    for label, r in summary.items():
+        print(f"{label:<22}{r['n']:>7}{r['rps']:>9.1f}{r['p50']:>9.1f}{r['p95']:>9.1f}{r['p99']:>9.1f}"
+              f"{r['max']:>9.1f}{r['error_rate']:>9.2%}")
+    for label, r in summary.items():
+        if r["last_error"]:
+            print(f"  {label}: {r['last_error']}")
+
+
+def compare(summary, baseline, threshold):
+    """Print per-route changes; returns the routes that regressed"""
+    regressed = []
+    print(f"\nvs baseline ({threshold:.0%} tolerance)")
+    print(f"{'route':<22}" + "".join(f"{h:>22}" for h in ("req/s", "p50 ms", "p95 ms", "p99 ms", "errors")))
+    for label in sorted(set(summary) | set(baseline)):
+        now, before = summary.get(label), baseline.get(label)
+        if not now or not before:
+            print(f"{label:<22}  only in {'this run' if now else 'baseline'}")
+            continue
+        cells = []
+        for key in ("rps", "p50", "p95", "p99"):
+            change = (now[key] - before[key]) / before[key] if before[key] else 0.0
+            cells.append(f"{before[key]:.1f} -> {now[key]:.1f} {change:+.0%}".rjust(22))
+        cells.append(f"{before['error_rate']:.1%} -> {now['error_rate']:.1%}".rjust(22))
+        slower = before["p95"] and (now["p95"] - before["p95"]) / before["p95"] > threshold
+        failing = now["error_rate"] - before["error_rate"] > 0.01
+        if slower or failing:
+            regressed.append(label)
+        print(f"{label:<22}{''.join(cells)}{'  REGRESSED' if slower or failing else ''}")
+    return regressed
+
+
+async def run(args):
+    mix = parse_mix(args.mix)
+    workdir = tempfile.mkdtemp(prefix="load_test_")
+    proc = log = None
+    base_url = args.url
+    if not base_url:
+        args.admin_token = args.admin_token or secrets.token_hex(16)
+        if args.ball_data is None and BENCH_BALL_DATA.exists():
+            args.ball_data = str(BENCH_BALL_DATA)
+        proc, log = start_server(args, workdir)
+        base_url = f"http://127.0.0.1:{args.port}"
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+            await wait_healthy(client, proc, args.startup_timeout)
+            stats = Stats()
+            test = LoadTest(client, stats, args)
+            await test.setup()
+            started = time.monotonic()
+            deadline = started + args.warmup + args.duration
+            users = [asyncio.ensure_future(test.virtual_user(mix, deadline)) for _ in range(args.users)]
+            await asyncio.sleep(args.warmup)
+            stats.recording = True
+            measured_from = time.monotonic()
+            print(f"[LOAD] {args.users} users for {args.duration}s against {base_url}")
+            await asyncio.sleep(max(0.0, deadline - time.monotonic()))
+            stats.recording = False  # requests still in flight are not counted
+            elapsed = time.monotonic() - measured_from
+            await asyncio.gather(*users)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+            log.close()
+            if proc.returncode not in (0, -15):
+                print(f"[LOAD] Server log: {Path(workdir) / 'server.log'}")
+    summary = stats.summary(elapsed)
+    print_report(summary, elapsed)
+    if args.save:
+        meta = {"users": args.users, "duration": args.duration, "think": args.think, "mix": mix,
+                "url": base_url, "at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        Path(args.save).write_text(json.dumps({"meta": meta, "routes": summary}, indent=2))
+        print(f"[LOAD] Saved {args.save}")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())["routes"]
+        regressed = compare(summary, baseline, args.threshold)
+        if regressed:
+            print(f"[LOAD] Regressed: {', '.join(regressed)}")
+            return False
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="target a running server instead of starting one")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--admin-token", default=os.getenv("ADMIN_TOKEN"),
+                        help="X-Admin-Token for seeding tokens (default: $ADMIN_TOKEN)")
+    parser.add_argument("--server-workers", type=int, default=1)
+    parser.add_argument("--ball-data", help="ball-by-ball CSV for the started server "
+                                            "(default: bench/ball_by_ball.csv if present)")
+    parser.add_argument("--users", type=int, default=50, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="unmeasured seconds before the run")
+    parser.add_argument("--think", type=float, default=0.5, help="mean think time between scenarios (s)")
+    parser.add_argument("--accounts", type=int, default=20, help="accounts seeded before the run")
+    parser.add_argument("--mix", help="scenario weights, e.g. search=30,pvp=20,predict=20")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--startup-timeout", type=float, default=120)
+    parser.add_argument("--save", help="write results as JSON")
+    parser.add_argument("--compare", help="baseline JSON from an earlier --save")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed p95 slowdown when comparing")
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(run(args)) else 1)
@@ -0,0 +1,93 @@
+"""Per-worker memory with and without preload-and-fork.
+
+Starts gunicorn (gunicorn.conf.py) twice, with GUNICORN_PRELOAD=0 and =1.
+Each run waits until every worker answers, sends a few warm-up requests and
+then reads RSS/PSS of the master and each worker from /proc (Linux only).
+PSS splits shared pages between processes, so its total is what the
+deployment actually costs.
+
+    python scripts/measure_worker_memory.py                       # app:app
+    python scripts/measure_worker_memory.py --app api:app --worker-class uvicorn.workers.UvicornWorker \\
+        --paths /teams /pvp/players
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(BACKEND))
+from preload import memory_usage
+
+
+def children(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children", encoding="ascii") as fh:
+            return [int(p) for p in fh.read().split()]
+    except OSError:
+        return []
+
+
+def wait_ready(proc, port, workers, paths, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("gunicorn exited during startup")
+        if len(children(proc.pid)) >= workers:
+            try:
+                # one request per worker and path, roughly: warms whatever is lazy
+                for _ in range(workers):
+                    for path in paths:
+                        urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=30).read()
+                return
+            except OSError:
+                pass
+        time.sleep(0.5)
+    raise RuntimeError(f"workers not ready after {timeout}s")
+
+
+def measure(args, preload: bool):
+    env = dict(os.environ, GUNICORN_PRELOAD="1" if preload else "0", GUNICORN_WORKERS=str(args.workers),
+               GUNICORN_BIND=f"127.0.0.1:{args.port}")
+    cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", args.app]
+    if args.worker_class:
+        cmd[-1:-1] = ["-k", args.worker_class]
+    proc = subprocess.Popen(cmd, cwd=str(BACKEND), env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        started = time.perf_counter()
+        wait_ready(proc, args.port, args.workers, args.paths, args.timeout)
+        ready_s = time.perf_counter() - started
+        master = memory_usage(proc.pid)
+        workers = [memory_usage(pid) for pid in children(proc.pid)]
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+    if master is None:
+        raise RuntimeError("/proc/<pid>/smaps_rollup is not available on this system")
+
+    print(f"\npreload={'on' if preload else 'off'}  ready in {ready_s:.1f}s")
+    print(f"  {'process':<10}{'rss MiB':>10}{'pss MiB':>10}{'shared':>10}{'private':>10}")
+    for label, usage in [("master", master)] + [(f"worker {i}", u) for i, u in enumerate(workers) if u]:
+        print(f"  {label:<10}{usage['rss']:>10}{usage['pss']:>10}{usage['shared']:>10}{usage['private']:>10}")
+    total_pss = master["pss"] + sum(u["pss"] for u in workers if u)
+    print(f"  total pss: {total_pss:.1f} MiB")
+    return total_pss
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", default="app:app")
+    parser.add_argument("--worker-class")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=5077)
+    parser.add_argument("--paths", nargs="*", default=["/matches"])
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    before = measure(args, preload=False)
+    after = measure(args, preload=True)
+    print(f"\ntotal pss {before:.1f} -> {after:.1f} MiB ({after - before:+.1f} MiB)")
@@ -0,0 +1,164 @@
+"""
+Session Tokens
+Stateless, HMAC-signed session tokens issued at register/login.
+
+A token is `<payload>.<signature>` where payload is the base64url encoding of
+`username:expires_at` and signature is HMAC-SHA256 over the payload. Checking
+a token needs no database access; verified tokens are additionally kept in a
+small LRU so repeat requests cost a dictionary lookup.
+
+The signing key comes from SESSION_SECRET. When it is unset, a random key is
+generated once and stored in data/.session_secret so every worker process on
+the host signs and verifies with the same key.
+
+Admin endpoints are gated separately by ADMIN_TOKEN, sent as X-Admin-Token.
+When ADMIN_TOKEN is unset every admin request is refused.
+"""
+
+from collections import OrderedDict
+from typing import Optional
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+
+from fastapi import Header, HTTPException
+
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", str(7 * 24 * 3600)))
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+SECRET_PATH = os.path.join(os.path.dirname(__file__), "data", ".session_secret")
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+
+def _load_secret() -> bytes:
+    env_secret = os.getenv("SESSION_SECRET")
+    if env_secret:
+        return env_secret.encode("utf-8")
+    try:
+        with open(SECRET_PATH, "rb") as fh:
+            secret = fh.read().strip()
+            if secret:
+                return secret
+    except FileNotFoundError:
+        pass
+    secret = secrets.token_hex(32).encode("ascii")
+    try:
+        # O_EXCL: if another worker won the race, use the key it wrote
+        fd = os.open(SECRET_PATH, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(secret)
+        print("[SESSION] SESSION_SECRET not set; generated data/.session_secret")
+    except FileExistsError:
+        with open(SECRET_PATH, "rb") as fh:
+            secret = fh.read().strip()
+    return secret
+
+
+_SECRET = _load_secret()
+_cache = OrderedDict()  # token -> (username, expires_at)
+_cache_lock = threading.Lock()
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(_SECRET, payload.encode("ascii"), hashlib.sha256).digest())
+
+
+def issue_token(username: str, ttl: int = None) -> str:
+    """Create a signed session token for username"""
+    expires_at = int(time.time()) + (ttl or SESSION_TTL_SECONDS)
+    payload = _b64encode(f"{username}:{expires_at}".encode("utf-8"))
+    return f"{payload}.{_sign(payload)}"
+
+
+def token_expiry(token: str) -> Optional[int]:
+    """Expiry (unix seconds) of a valid token, else None"""
+    entry = _verify(token)
+    return entry[1] if entry else None
+
+
+def verify_token(token: str) -> Optional[str]:
+    """Return the username for a valid, unexpired token, else None"""
+    entry = _verify(token)
+    return entry[0] if entry else None
+
+
+def _verify(token: str):
+    if not token:
+        return None
+    now = time.time()
+    with _cache_lock:
+        entry = _cache.get(token)
+        if entry is not None:
+            if entry[1] > now:
+                _cache.move_to_end(token)
+                return entry
+            del _cache[token]
+            return None
+
+    payload, _, signature = token.partition(".")
+    try:
+        if not signature or not hmac.compare_digest(signature, _sign(payload)):
+            return None
+        username, _, expires = _b64decode(payload).decode("utf-8").rpartition(":")
+        expires_at = int(expires)
+    except (ValueError, TypeError):
+        # covers non-ASCII input, bad base64 and malformed payloads
+        return None
+    if not username or expires_at <= now:
+        return None
+
+    entry = (username, expires_at)
+    with _cache_lock:
+        _cache[token] = entry
+        if len(_cache) > SESSION_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return entry
+
+
+def _bearer(authorization: Optional[str]) -> Optional[str]:
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer":
+        return None
+    return token.strip()
+
+
+# ==================== FASTAPI DEPENDENCIES ====================
+# Declared async so FastAPI runs them inline instead of on the threadpool.
+async def optional_session(authorization: Optional[str] = Header(None)) -> Optional[str]:
+    """Username of the bearer token if present and valid, else None"""
+    return verify_token(_bearer(authorization))
+
+
+async def require_session(authorization: Optional[str] = Header(None)) -> str:
+    """Username of the bearer token; 401 if missing or invalid"""
+    username = verify_token(_bearer(authorization))
+    if not username:
+        raise HTTPException(status_code=401, detail="Not authenticated",
+                            headers={"WWW-Authenticate": "Bearer"})
+    return username
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """403 unless X-Admin-Token matches ADMIN_TOKEN (always 403 when it is unset)"""
+    if not ADMIN_TOKEN or not x_admin_token or not hmac.compare_digest(
+            x_admin_token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+def require_user(session_username: str, username: str):
+    """Reject requests acting on another user's account"""
+    if session_username != username:
+        raise HTTPException(status_code=403, detail="Token does not belong to this user")
@@ -0,0 +1,276 @@
+"""
+Shared Datasets
+Versioned, memory-mapped datasets published by one loader process and
+attached by every API worker.
+
+    python shared_datasets.py            # publish once
+    python shared_datasets.py --watch    # republish whenever the sources change
+
+Layout under SHARED_DATA_DIR:
+    CURRENT                  the published version number
+    v<version>/<dataset>/    one directory per dataset
+
+A DataFrame dataset is stored column by column as .npy files plus meta.json.
+Numeric columns are opened with np.load(mmap_mode="r"), so every worker maps
+the same page-cache pages and nothing is copied. Text columns are stored as
+codes (int8/16/32, the width pandas picks for the number of distinct values)
+plus the distinct values, and attach as Categoricals over the mapped codes,
+so they are not copied either. ==, .str, groupby and .astype(str) behave as
+on text columns; fillna() with a value that is not a category raises, so
+convert with .astype(object) first. An index column is expanded to plain
+values. Other values (the player catalog) are stored as data.json and
+parsed once per version.
+
+Published datasets:
+    deliveries   pvp_utils ball-by-ball frame (shipped CSV + ball store)
+    projections  fantasy per-player projections from the per-season tables
+    catalog      pvp_utils player catalog
+
+The loader writes a complete new version directory first and then replaces
+CURRENT atomically. Readers stat CURRENT at most every SHARED_CHECK_INTERVAL
+seconds. When it changes they switch to the new version in one reference
+swap, and requests already holding the old frames keep using them. The
+previous SHARED_KEEP_VERSIONS versions stay on disk. Mappings of removed
+files stay valid on POSIX. Readers only use shared data when SHARED_DATASETS=1.
+A refresh then costs one load in the loader instead of one per worker.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+SHARED_DATA_DIR = os.getenv("SHARED_DATA_DIR", os.path.join(os.path.dirname(__file__), "data", "shared"))
+SHARED_CHECK_INTERVAL = float(os.getenv("SHARED_CHECK_INTERVAL", "2"))
+SHARED_KEEP_VERSIONS = int(os.getenv("SHARED_KEEP_VERSIONS", "2"))
+SHARED_WATCH_INTERVAL = float(os.getenv("SHARED_WATCH_INTERVAL", "10"))
+CURRENT_FILE = "CURRENT"
+INDEX_COLUMN = "__index__"
+
+
+def enabled() -> bool:
+    return os.getenv("SHARED_DATASETS", "0") == "1"
+
+
+def _version_dir(root: str, version: int) -> str:
+    return os.path.join(root, f"v{version:06d}")
+
+
+def read_current(root: str):
+    try:
+        with open(os.path.join(root, CURRENT_FILE), encoding="ascii") as fh:
+            return int(fh.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+# ==================== ENCODING ====================
+
+def write_frame(df: pd.DataFrame, path: str):
+    os.makedirs(path)
+    index_name = None
+    if not isinstance(df.index, pd.RangeIndex):
+        index_name = df.index.name or INDEX_COLUMN
+        df = df.rename_axis(index_name).reset_index()
+    columns = []
+    for i, name in enumerate(df.columns):
+        series = df[name]
+        filename = f"c{i:04d}.npy"
+        spec = {"name": name, "file": filename, "kind": "numeric"}
+        if isinstance(series.dtype, np.dtype) and series.dtype.kind in "biufmM":
+            values = series.to_numpy()
+        elif pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+            # nullable extension ints become float64 with NaN, as read_csv would give
+            values = series.to_numpy(dtype="float64", na_value=np.nan)
+        else:
+            categorical = pd.Categorical(series.astype(object))
+            values = categorical.codes  # narrowest int dtype, as Categorical.from_codes keeps without copying
+            spec["kind"] = "text"
+            spec["values"] = [v.item() if isinstance(v, np.generic) else v for v in categorical.categories]
+        np.save(os.path.join(path, filename), np.ascontiguousarray(values), allow_pickle=False)
+        columns.append(spec)
+    meta = {"kind": "frame", "rows": len(df), "index": index_name, "columns": columns}
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as fh:
+        json.dump(meta, fh, default=str)
+
+
+def read_frame(path: str) -> pd.DataFrame:
+    with open(os.path.join(path, "meta.json"), encoding="utf-8") as fh:
+        meta = json.load(fh)
+    data = {}
+    for spec in meta["columns"]:
+        array = np.load(os.path.join(path, spec["file"]), mmap_mode="r", allow_pickle=False)
+        if spec["kind"] == "text" and spec["name"] == meta["index"]:
+            # code -1 (missing) -> NaN
+            array = np.array(spec["values"] + [np.nan], dtype=object)[array]
+        elif spec["kind"] == "text":
+            array = pd.Categorical.from_codes(array, categories=pd.Index(spec["values"], dtype=object),
+                                              validate=False)
+        data[spec["name"]] = array
+    df = pd.DataFrame(data, copy=False)
+    if meta["index"]:
+        df = df.set_index(meta["index"])
+        if meta["index"] == INDEX_COLUMN:
+            df.index.name = None
+    return df
+
+
+def write_dataset(value, path: str):
+    if isinstance(value, pd.DataFrame):
+        write_frame(value, path)
+        return
+    os.makedirs(path)
+    with open(os.path.join(path, "data.json"), "w", encoding="utf-8") as fh:
+        json.dump(value, fh, default=str)
+
+
+def read_dataset(path: str):
+    if os.path.exists(os.path.join(path, "meta.json")):
+        return read_frame(path)
+    with open(os.path.join(path, "data.json"), encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+# ==================== PUBLISHER ====================
+
+class DatasetPublisher:
+    """Writes complete dataset versions and flips CURRENT to them"""
+
+    def __init__(self, root: str = SHARED_DATA_DIR, keep: int = SHARED_KEEP_VERSIONS):
+        self.root = root
+        self.keep = keep
+
+    def publish(self, datasets: dict) -> int:
+        os.makedirs(self.root, exist_ok=True)
+        versions = self.versions()
+        version = max(versions + [read_current(self.root) or 0]) + 1
+        staging = os.path.join(self.root, f".staging-{version}-{os.getpid()}")
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        for name, value in datasets.items():
+            write_dataset(value, os.path.join(staging, name))
+        os.replace(staging, _version_dir(self.root, version))
+        tmp = os.path.join(self.root, CURRENT_FILE + ".tmp")
+        with open(tmp, "w", encoding="ascii") as fh:
+            fh.write(f"{version}\n")
+        os.replace(tmp, os.path.join(self.root, CURRENT_FILE))
+        for old in versions[:-self.keep] if self.keep else versions:
+            shutil.rmtree(_version_dir(self.root, old), ignore_errors=True)
+        print(f"[SHARED] Published v{version}: {', '.join(datasets)}")
+        return version
+
+    def versions(self) -> list:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(int(name[1:]) for name in os.listdir(self.root) if name.startswith("v") and name[1:].isdigit())
+
+
+# ==================== READER ====================
+
+class SharedDatasets:
+    """Attaches to the current published version and follows CURRENT"""
+
+    def __init__(self, root: str = SHARED_DATA_DIR, check_interval: float = SHARED_CHECK_INTERVAL):
+        self.root = root
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._state = (None, {})  # (version, {name: attached value}), swapped as a whole
+        self._checked_at = 0.0
+        self.swaps = 0
+
+    def version(self):
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            current = read_current(self.root)
+            if current is not None and current != self._state[0]:
+                self._state = (current, {})
+                self.swaps += 1
+                print(f"[SHARED] Attached v{current}")
+        return self._state[0]
+
+    def get_versioned(self, name: str):
+        """(version, value) for the current version, or (None, None) if not published"""
+        self.version()
+        version, attached = self._state
+        if version is None:
+            return None, None
+        value = attached.get(name)
+        if value is None:
+            path = os.path.join(_version_dir(self.root, version), name)
+            with self._lock:
+                value = attached.get(name)
+                if value is None:
+                    if not os.path.isdir(path):
+                        return version, None
+                    value = read_dataset(path)
+                    attached[name] = value
+        return version, value
+
+    def get(self, name: str):
+        return self.get_versioned(name)[1]
+
+    def stats(self) -> dict:
+        version, attached = self._state
+        return {"enabled": enabled(), "root": self.root, "version": version,
+                "attached": sorted(attached), "swaps": self.swaps}
+
+
+shared = SharedDatasets()
+
+
+# ==================== LOADER ====================
+
+def source_signature():
+    """Changes whenever any published dataset would change"""
+    import fantasy
+    import pvp_utils
+    from ball_store import ball_store
+
+    ball_store.load()  # pick up ingests made by the API workers
+    path = pvp_utils._find_ball_csv()
+    csv_sig = (path, os.stat(path).st_size, os.stat(path).st_mtime_ns) if path else None
+    return (csv_sig, ball_store.version, fantasy.dataset_signature(), pvp_utils.catalog_signature())
+
+
+def build_datasets() -> dict:
+    """Load every published dataset from its sources in this process"""
+    import fantasy
+    import pvp_utils
+
+    pvp_utils.build_local_player_catalog.cache_clear()
+    datasets = {"catalog": pvp_utils.build_local_player_catalog(),
+                "projections": fantasy.build_projections()}
+    try:
+        datasets["deliveries"] = pvp_utils.load_local_ball_data()
+    except FileNotFoundError:
+        print("[SHARED] No ball-by-ball data yet; deliveries not published")
+    return datasets
+
+
+def watch(publisher: DatasetPublisher, interval: float = SHARED_WATCH_INTERVAL, once: bool = False):
+    last = None
+    while True:
+        signature = source_signature()
+        if signature != last:
+            started = time.perf_counter()
+            publisher.publish(build_datasets())
+            print(f"[SHARED] Load took {time.perf_counter() - started:.2f}s")
+            last = signature
+        if once:
+            return
+        time.sleep(interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Publish shared datasets for the API workers")
+    parser.add_argument("--root", default=SHARED_DATA_DIR)
+    parser.add_argument("--watch", action="store_true", help="keep running and republish on source changes")
+    parser.add_argument("--interval", type=float, default=SHARED_WATCH_INTERVAL)
+    args = parser.parse_args()
+    watch(DatasetPublisher(args.root), args.interval, once=not args.watch)
@@ -0,0 +1,256 @@
+"""
+Spin Wheel Store
+Daily spin quotas and reward grants, enforced by the database.
+
+Every spin is a row in spin_history numbered by a per-day `slot`
+(1..MAX_SPINS_PER_DAY). The unique (username, spin_date, slot) constraint is
+what enforces the quota: two concurrent spins that try to take the same slot
+cannot both commit, so a burst can never grant more than the daily maximum,
+whichever worker process handles it. The slot insert and the token grant
+commit in one transaction.
+
+Per-user daily counts are cached in memory. A spin uses the cached count to
+pick its slot directly (INSERT + UPDATE ... RETURNING, no read first); when
+another worker got there first the insert collides and the count is re-read.
+Users who have used their quota are refused without touching the database.
+
+spin_async / get_spin_status_async run the same statements on an AsyncSession.
+"""
+
+from sqlalchemy import Column, String, Integer, DateTime, UniqueConstraint, insert, select, update, and_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from collections import OrderedDict
+from datetime import datetime
+import os
+import random
+import threading
+import time
+
+from unified_db import Base, User
+from user_cache import user_cache
+
+MAX_SPINS_PER_DAY = int(os.getenv("MAX_SPINS_PER_DAY", "2"))
+SPIN_REWARDS = [5, 15, 50, 100]
+SPIN_CACHE_SIZE = int(os.getenv("SPIN_CACHE_SIZE", "50000"))
+# Status reads accept cached counts this old; spins always stay correct
+SPIN_CACHE_TTL = float(os.getenv("SPIN_CACHE_TTL", "30"))
+
+
+class SpinHistory(Base):
+    """One row per granted spin"""
+    __tablename__ = "spin_history"
+    __table_args__ = (
+        # Doubles as the (username, spin_date) lookup index
+        UniqueConstraint("username", "spin_date", "slot", name="uq_spin_history_user_date_slot"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    username = Column(String, nullable=False)
+    spin_date = Column(String, nullable=False)  # UTC date, ISO format
+    slot = Column(Integer, nullable=False)
+    reward = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class _DailySpinCache:
+    """LRU of (username, date) -> (spins used, last reward, cached at)"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, username: str, day: str, max_age: float = None):
+        with self._lock:
+            entry = self._data.get((username, day))
+            if entry is None:
+                return None
+            if max_age is not None and time.monotonic() - entry[2] > max_age:
+                return None
+            self._data.move_to_end((username, day))
+            return entry
+
+    def set(self, username: str, day: str, used: int, last_reward):
+        with self._lock:
+            key = (username, day)
+            current = self._data.get(key)
+            # counts only grow within a day; never let a stale read lower one
+            if current is not None and current[0] > used:
+                used, last_reward = current[0], current[1]
+            self._data[key] = (used, last_reward, time.monotonic())
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+spin_cache = _DailySpinCache(SPIN_CACHE_SIZE)
+
+
+def _today() -> str:
+    return datetime.utcnow().date().isoformat()
+
+
+def _usage_query(username: str, day: str):
+    return (
+        select(User.username, SpinHistory.slot, SpinHistory.reward)
+        .outerjoin(SpinHistory, and_(SpinHistory.username == User.username, SpinHistory.spin_date == day))
+        .where(User.username == username)
+        .order_by(SpinHistory.slot.desc())
+        .limit(1)
+    )
+
+
+def _usage_from_row(row):
+    """(user exists, spins used today, last reward today)"""
+    if row is None:
+        return False, 0, None
+    return True, row.slot or 0, row.reward
+
+
+def _load_usage(db: Session, username: str, day: str):
+    """One query: (user exists, spins used today, last reward today)"""
+    return _usage_from_row(db.execute(_usage_query(username, day)).first())
+
+
+async def _load_usage_async(db, username: str, day: str):
+    result = await db.execute(_usage_query(username, day))
+    return _usage_from_row(result.first())
+
+
+def _status(used: int, last_reward, day: str) -> dict:
+    return {
+        "ok": True,
+        "spins_left": max(0, MAX_SPINS_PER_DAY - used),
+        "last_reward": last_reward,
+        "date": day
+    }
+
+
+def _grant_statements(username: str, day: str, slot: int, reward: int):
+    """INSERT for the slot and UPDATE ... RETURNING for the grant"""
+    take_slot = insert(SpinHistory).values(
+        username=username, spin_date=day, slot=slot, reward=reward, created_at=datetime.utcnow()
+    )
+    grant = (
+        update(User)
+        .where(User.username == username)
+        .values(tokens=User.tokens + reward)
+        .returning(User.tokens)
+    )
+    return take_slot, grant
+
+
+def _granted(reward: int, tokens: int, slot: int) -> dict:
+    return {
+        "ok": True,
+        "reward": reward,
+        "tokens_remaining": tokens,
+        "spins_left": MAX_SPINS_PER_DAY - slot
+    }
+
+
+NO_SPINS_LEFT = {"ok": False, "error": "No spins left today", "spins_left": 0}
+USER_NOT_FOUND = {"ok": False, "error": "user not found"}
+
+
+def get_spin_status(db: Session, username: str) -> dict:
+    """Spins left today for a user"""
+    day = _today()
+    cached = spin_cache.get(username, day, max_age=SPIN_CACHE_TTL)
+    if cached is None:
+        exists, used, last_reward = _load_usage(db, username, day)
+        if not exists:
+            return dict(USER_NOT_FOUND)
+        spin_cache.set(username, day, used, last_reward)
+    else:
+        used, last_reward = cached[0], cached[1]
+    return _status(used, last_reward, day)
+
+
+async def get_spin_status_async(db, username: str) -> dict:
+    """get_spin_status on an AsyncSession"""
+    day = _today()
+    cached = spin_cache.get(username, day, max_age=SPIN_CACHE_TTL)
+    if cached is None:
+        exists, used, last_reward = await _load_usage_async(db, username, day)
+        if not exists:
+            return dict(USER_NOT_FOUND)
+        spin_cache.set(username, day, used, last_reward)
+    else:
+        used, last_reward = cached[0], cached[1]
+    return _status(used, last_reward, day)
+
+
+def spin(db: Session, username: str, reward: int = None) -> dict:
+    """Spin the wheel: take the next daily slot and grant its reward atomically"""
+    day = _today()
+    cached = spin_cache.get(username, day)
+    used = cached[0] if cached else 0
+    if reward is None:
+        reward = random.choice(SPIN_REWARDS)
+
+    # Each iteration either commits, or learns that another request took the
+    # slot and re-reads the count. Bounded by the daily maximum.
+    for _ in range(MAX_SPINS_PER_DAY + 1):
+        if used >= MAX_SPINS_PER_DAY:
+            return dict(NO_SPINS_LEFT)
+        slot = used + 1
+        take_slot, grant = _grant_statements(username, day, slot, reward)
+        try:
+            db.execute(take_slot)
+            tokens = db.execute(grant).scalar_one_or_none()
+            if tokens is None:
+                db.rollback()
+                return dict(USER_NOT_FOUND)
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            exists, used, last_reward = _load_usage(db, username, day)
+            if not exists:
+                return dict(USER_NOT_FOUND)
+            spin_cache.set(username, day, used, last_reward)
+            continue
+
+        spin_cache.set(username, day, slot, reward)
+        user_cache.set_tokens(username, tokens)
+        return _granted(reward, tokens, slot)
+    return dict(NO_SPINS_LEFT)
+
+
+async def spin_async(db, username: str, reward: int = None) -> dict:
+    """spin() on an AsyncSession"""
+    day = _today()
+    cached = spin_cache.get(username, day)
+    used = cached[0] if cached else 0
+    if reward is None:
+        reward = random.choice(SPIN_REWARDS)
+
+    for _ in range(MAX_SPINS_PER_DAY + 1):
+        if used >= MAX_SPINS_PER_DAY:
+            return dict(NO_SPINS_LEFT)
+        slot = used + 1
+        take_slot, grant = _grant_statements(username, day, slot, reward)
+        try:
+            await db.execute(take_slot)
+            tokens = (await db.execute(grant)).scalar_one_or_none()
+            if tokens is None:
+                await db.rollback()
+                return dict(USER_NOT_FOUND)
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            exists, used, last_reward = await _load_usage_async(db, username, day)
+            if not exists:
+                return dict(USER_NOT_FOUND)
+            spin_cache.set(username, day, used, last_reward)
+            continue
+
+        spin_cache.set(username, day, slot, reward)
+        user_cache.set_tokens(username, tokens)
+        return _granted(reward, tokens, slot)
+    return dict(NO_SPINS_LEFT)
@@ -0,0 +1,155 @@
+"""
+Storage Configuration
+Engine construction and tuning for the unified user database.
+
+SQLite (default, data/cricket_users.db) is opened with:
+    journal_mode=WAL       readers never block the single writer
+    synchronous=NORMAL     fsync at checkpoints only (safe with WAL)
+    busy_timeout           writers wait for the lock instead of failing
+    mmap_size              reads served from the page cache via mmap
+    temp_store=MEMORY
+and a larger per-connection prepared-statement cache.
+
+Setting DATABASE_URL to a PostgreSQL URL switches to a pooled PostgreSQL
+engine (pre-ping, recycle, bounded pool). USERS_DATABASE_URL overrides both
+when the user store should live somewhere other than the dataset database.
+
+create_async_storage_engine builds the asyncio counterpart (aiosqlite or
+asyncpg) for the same URL with the same tuning.
+"""
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_SQLITE_PATH = os.path.join(os.path.dirname(__file__), "data", "cricket_users.db")
+
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "16384"))
+SQLITE_STATEMENT_CACHE = int(os.getenv("SQLITE_STATEMENT_CACHE", "256"))
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# SQLAlchemy compiled-statement cache (per engine)
+DB_QUERY_CACHE_SIZE = int(os.getenv("DB_QUERY_CACHE_SIZE", "1200"))
+
+
+def normalize_database_url(url: str) -> str:
+    """Accept Heroku/Railway style postgres:// URLs"""
+    if url.startswith("postgres://"):
+        return "postgresql://" + url[len("postgres://"):]
+    return url
+
+
+def resolve_database_url() -> str:
+    """Database URL for the user store.
+
+    A non-PostgreSQL DATABASE_URL is ignored here: app.py uses that variable
+    for its own local SQLite file, and user data must not silently move.
+    """
+    url = os.getenv("USERS_DATABASE_URL")
+    if url:
+        return normalize_database_url(url)
+    url = normalize_database_url(os.getenv("DATABASE_URL", ""))
+    if url.startswith("postgresql"):
+        return url
+    return f"sqlite:///{DEFAULT_SQLITE_PATH}"
+
+
+def is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def sqlite_pragmas() -> list:
+    return [
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+        f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+
+def install_sqlite_pragmas(engine: Engine):
+    """Apply the tuning pragmas to every new DBAPI connection of `engine`"""
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in sqlite_pragmas():
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    # sqlite://, sqlite+aiosqlite:// and sqlite:///:memory: are per-connection databases
+    return ":memory:" in url or url.partition("://")[2] == ""
+
+
+def _engine_options(url: str, tuned: bool) -> dict:
+    """create_engine options shared by the sync and async engines"""
+    options = {"query_cache_size": DB_QUERY_CACHE_SIZE}
+    if is_sqlite(url):
+        connect_args = {"check_same_thread": False}
+        if tuned:
+            connect_args["timeout"] = SQLITE_BUSY_TIMEOUT_MS / 1000.0
+            connect_args["cached_statements"] = SQLITE_STATEMENT_CACHE
+        options["connect_args"] = connect_args
+        if not _is_memory_sqlite(url):
+            options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+    else:
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+        )
+    return options
+
+
+def create_storage_engine(url: str = None, tuned: bool = True, **kwargs) -> Engine:
+    """Create an engine for `url` (default: resolve_database_url()).
+
+    `tuned=False` gives the plain SQLite defaults, for benchmarking.
+    """
+    url = url or resolve_database_url()
+    options = _engine_options(url, tuned)
+    options.update(kwargs)
+    engine = create_engine(url, **options)
+    if is_sqlite(url) and tuned:
+        install_sqlite_pragmas(engine)
+    return engine
+
+
+def async_database_url(url: str) -> str:
+    """Map a sync URL onto its asyncio driver (aiosqlite / asyncpg)"""
+    scheme, sep, rest = url.partition("://")
+    base = scheme.split("+", 1)[0]
+    if base == "sqlite":
+        return f"sqlite+aiosqlite{sep}{rest}"
+    if base == "postgresql":
+        return f"postgresql+asyncpg{sep}{rest}"
+    return url
+
+
+def create_async_storage_engine(url: str = None, tuned: bool = True, **kwargs):
+    """Async engine for `url` (default: resolve_database_url())"""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = async_database_url(url or resolve_database_url())
+    options = _engine_options(url, tuned)
+    options.update(kwargs)
+    engine = create_async_engine(url, **options)
+    if is_sqlite(url) and tuned:
+        install_sqlite_pragmas(engine.sync_engine)
+    return engine
@@ -0,0 +1,340 @@
+"""
+Synthetic Ball-by-ball Data
+Generates plausible IPL deliveries for load and latency testing, since no
+ball-by-ball file ships in data/.
+
+    python synthetic_data.py --rows 250000                      # bench/ball_by_ball.csv
+    python synthetic_data.py --rows 25000000 --out /tmp/balls.parquet
+    python synthetic_data.py --seasons 17 --matches-per-season 74 --players 600
+
+Columns use the spellings pvp_utils.safe_get_column looks for first (batsman,
+bowler, batsman_runs, player_dismissed, dismissal_kind, match_id, over, wide,
+noball), plus inning, ball, teams, venue and season.
+
+Each season the players are spread over the teams, and about a quarter of
+them change team between seasons. Every match picks an XI per side from the
+roster (batters, all-rounders, bowlers) and plays two innings of 20 overs:
+    - wides and no-balls are re-bowled, so an over can have more than 6 rows
+    - five bowlers bowl four overs each, never two in a row
+    - wicket chance depends on the bowler and the phase
+    - boundary chance depends on the batter and the phase
+    - strike rotates on odd runs and at the end of each over
+    - an innings ends at ten wickets, and the chase ends once the target is passed
+
+Output is written GENERATOR_CHUNK_MATCHES matches at a time (about 240 rows per
+match). Memory stays bounded whatever the row count. Parquet needs pyarrow.
+The same seed always produces the same file.
+
+The default output lives in bench/, outside data/, so synthetic deliveries are
+never picked up as the real dataset or shipped in the image. Point the API at
+a generated CSV with BALL_DATA_PATH (scripts/load_test.py does this for the
+server it starts).
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+GENERATOR_CHUNK_MATCHES = int(os.getenv("GENERATOR_CHUNK_MATCHES", "1000"))
+DEFAULT_OUT = os.path.join(os.path.dirname(__file__), "bench", "ball_by_ball.csv")
+ROWS_PER_MATCH = 240  # what the model below averages, used to turn --rows into matches
+FIRST_SEASON = 2008
+LEGAL_BALLS = 120
+SLOTS_PER_INNINGS = 132  # legal balls plus room for wides and no-balls
+TEAM_TURNOVER = 0.25
+
+TEAMS = [
+    "Chennai Super Kings", "Mumbai Indians", "Royal Challengers Bengaluru", "Kolkata Knight Riders",
+    "Delhi Capitals", "Punjab Kings", "Rajasthan Royals", "Sunrisers Hyderabad",
+    "Lucknow Super Giants", "Gujarat Titans", "Deccan Chargers", "Pune Warriors",
+]
+VENUES = [
+    "Wankhede Stadium, Mumbai", "M Chinnaswamy Stadium, Bengaluru", "Eden Gardens, Kolkata",
+    "MA Chidambaram Stadium, Chennai", "Arun Jaitley Stadium, Delhi", "Narendra Modi Stadium, Ahmedabad",
+    "Rajiv Gandhi International Stadium, Hyderabad", "Sawai Mansingh Stadium, Jaipur",
+    "Punjab Cricket Association Stadium, Mohali", "Ekana Cricket Stadium, Lucknow",
+]
+SURNAMES = [
+    "Sharma", "Kohli", "Singh", "Patel", "Pandya", "Yadav", "Kumar", "Iyer", "Rahul", "Gill",
+    "Jadeja", "Bumrah", "Chahal", "Ashwin", "Dhawan", "Pant", "Samson", "Kishan", "Gaikwad", "Shaw",
+    "Thakur", "Chahar", "Siraj", "Shami", "Arshdeep", "Bishnoi", "Tewatia", "Rana", "Tripathi", "Agarwal",
+    "Warner", "Buttler", "Maxwell", "Russell", "Narine", "Rashid", "Rabada", "Boult", "Archer", "Stokes",
+    "de Kock", "Miller", "Livingstone", "Head", "Klaasen", "Pooran", "Hetmyer", "Conway", "Curran", "Green",
+]
+INITIALS = ["A", "B", "D", "H", "J", "K", "M", "N", "P", "R", "S", "T", "V", "Y",
+            "AB", "KL", "MS", "RD", "SA", "JJ", "YS", "PP", "DJ", "AR"]
+
+# run distribution on a legal, non-wicket ball: odd (1/3) vs even (0/2/4/6)
+P_ODD = 0.37
+P_THREE_GIVEN_ODD = 0.03
+P_TWO, P_FOUR, P_SIX = 0.11, 0.19, 0.08  # given even; the rest are dots
+P_WIDE, P_NOBALL, P_FIVE_WIDES = 0.035, 0.008, 0.03
+P_WICKET = 0.05
+# by over 1..20: powerplay, middle, death
+BOUNDARY_PHASE = np.array([1.15] * 6 + [0.85] * 9 + [1.35] * 5)
+WICKET_PHASE = np.array([0.9] * 6 + [0.95] * 9 + [1.35] * 5)
+DISMISSALS = ["caught", "bowled", "lbw", "run out", "stumped", "caught and bowled"]
+DISMISSAL_P = [0.61, 0.17, 0.11, 0.06, 0.04, 0.01]
+
+COLUMNS = ["match_id", "season", "venue", "inning", "batting_team", "bowling_team", "over", "ball",
+           "batsman", "non_striker", "bowler", "batsman_runs", "extra_runs", "total_runs", "wide", "noball",
+           "is_wicket", "player_dismissed", "dismissal_kind"]
+
+
+def player_names(count: int, rng) -> np.ndarray:
+    names = [f"{i} {s}" for s in SURNAMES for i in INITIALS]
+    rng.shuffle(names)
+    names += [f"{names[i % len(names)]} {i // len(names) + 1}" for i in range(len(names), count)]
+    return np.array(names[:count], dtype=object)
+
+
+class Generator:
+    """Yields DataFrames of deliveries, chunk_matches matches at a time"""
+
+    def __init__(self, seasons: int = 17, matches_per_season: int = 74, teams: int = 10, players: int = 500,
+                 seed: int = 2008, chunk_matches: int = GENERATOR_CHUNK_MATCHES):
+        if not 2 <= teams <= len(TEAMS):
+            raise ValueError(f"teams must be between 2 and {len(TEAMS)}")
+        if players < teams * 11:
+            raise ValueError(f"need at least {teams * 11} players for {teams} teams")
+        self.seasons = seasons
+        self.matches_per_season = matches_per_season
+        self.teams = np.array(TEAMS[:teams], dtype=object)
+        self.chunk_matches = max(1, chunk_matches)
+        self.rng = np.random.default_rng(seed)
+        rng = self.rng
+        self.names = player_names(players, rng)
+        # 45% batters, 20% all-rounders, 35% bowlers
+        role = rng.choice(3, size=players, p=[0.45, 0.20, 0.35])
+        self.role = role
+        self.aggression = np.where(role == 2, rng.uniform(0.4, 0.8, players), rng.uniform(0.7, 1.5, players))
+        self.penetration = np.where(role == 0, rng.uniform(0.9, 1.4, players), rng.uniform(0.7, 1.2, players))
+        self.team_of = rng.integers(0, teams, players)
+        self.rosters = None
+
+    @classmethod
+    def for_rows(cls, rows: int, seasons: int = 17, **kwargs) -> "Generator":
+        per_season = max(1, round(rows / ROWS_PER_MATCH / seasons))
+        return cls(seasons=seasons, matches_per_season=per_season, **kwargs)
+
+    @property
+    def total_matches(self) -> int:
+        return self.seasons * self.matches_per_season
+
+    # ---------- squads ----------
+
+    def _new_season(self):
+        rng = self.rng
+        moving = rng.random(len(self.team_of)) < TEAM_TURNOVER
+        self.team_of[moving] = rng.integers(0, len(self.teams), int(moving.sum()))
+        self.rosters = []
+        for t in range(len(self.teams)):
+            members = np.flatnonzero(self.team_of == t)
+            self.rosters.append([members[self.role[members] == r] for r in range(3)])
+
+    def _xi(self, team: int):
+        """(batting order of 11 player ids, the 5 bowlers)"""
+        rng = self.rng
+        batters, allrounders, bowlers = self.rosters[team]
+        picks = []
+        for pool, n in ((batters, 5), (allrounders, 2), (bowlers, 4)):
+            take = min(n, len(pool))
+            picks.append(rng.choice(pool, take, replace=False) if take else pool[:0])
+        xi = np.concatenate(picks)
+        if len(xi) < 11:  # thin roster: borrow from the rest of the pool
+            others = np.setdiff1d(np.arange(len(self.names)), xi)
+            xi = np.concatenate([xi, rng.choice(others, 11 - len(xi), replace=False)])
+        order = xi[np.lexsort((-self.aggression[xi], self.role[xi]))]  # batters, all-rounders, bowlers
+        attack = xi[np.lexsort((-self.penetration[xi], self.role[xi] == 0))[:5]]
+        return order, attack
+
+    # ---------- chunks ----------
+
+    def __iter__(self):
+        for start in range(0, self.total_matches, self.chunk_matches):
+            yield self.chunk(start, min(self.chunk_matches, self.total_matches - start))
+
+    def chunk(self, start: int, count: int) -> pd.DataFrame:
+        rng = self.rng
+        innings = 2 * count
+        bat_xi = np.empty((innings, 11), dtype=np.int64)
+        attack = np.empty((innings, 5), dtype=np.int64)
+        bat_team = np.empty(innings, dtype=np.int64)
+        match_no = start + np.arange(count)
+        for m, n in enumerate(match_no):
+            if n % self.matches_per_season == 0 or self.rosters is None:
+                self._new_season()
+            t1, t2 = rng.choice(len(self.teams), 2, replace=False)
+            (o1, a1), (o2, a2) = self._xi(t1), self._xi(t2)
+            bat_xi[2 * m], attack[2 * m], bat_team[2 * m] = o1, a2, t1
+            bat_xi[2 * m + 1], attack[2 * m + 1], bat_team[2 * m + 1] = o2, a1, t2
+
+        # every innings gets SLOTS_PER_INNINGS candidate deliveries
+        shape = (innings, SLOTS_PER_INNINGS)
+        u = rng.random(shape)
+        wide = u < P_WIDE
+        noball = (u >= P_WIDE) & (u < P_WIDE + P_NOBALL)
+        legal = ~(wide | noball)
+        legal_before = np.cumsum(legal, axis=1) - legal
+        in_overs = legal_before < LEGAL_BALLS
+        over0 = np.minimum(legal_before // 6, 19)
+        over_end = legal & (legal_before % 6 == 5)
+        # five bowlers, four overs each, never consecutive: over o -> slot perm[o % 5]
+        perm = np.argsort(rng.random((innings, 5)), axis=1)
+        rows = np.arange(innings)[:, None]
+        bowler = attack[rows, perm[rows, over0 % 5]]
+        wicket = legal & (rng.random(shape) < P_WICKET * WICKET_PHASE[over0] * self.penetration[bowler])
+        odd = ~wide & ~wicket & (rng.random(shape) < P_ODD)
+
+        striker, non_striker, live = _rotate_strike(legal.ravel().tolist(), wicket.ravel().tolist(),
+                                                    odd.ravel().tolist(), over_end.ravel().tolist(),
+                                                    in_overs.ravel().tolist())
+        striker = np.array(striker).reshape(shape)
+        non_striker = np.array(non_striker).reshape(shape)
+        live = np.array(live).reshape(shape)
+        batsman = bat_xi[rows, striker]
+
+        # runs off the bat, shaped by the batter and the phase
+        boost = self.aggression[batsman] * BOUNDARY_PHASE[over0]
+        r = rng.random(shape)
+        even_runs = np.where(r < P_SIX * boost, 6, np.where(r < (P_SIX + P_FOUR) * boost, 4,
+                             np.where(r < (P_SIX + P_FOUR) * boost + P_TWO, 2, 0)))
+        odd_runs = np.where(rng.random(shape) < P_THREE_GIVEN_ODD, 3, 1)
+        batsman_runs = np.where(odd, odd_runs, np.where(wide | wicket, 0, even_runs))
+        extra_runs = np.where(wide, np.where(rng.random(shape) < P_FIVE_WIDES, 5, 1), noball.astype(np.int64))
+        total_runs = batsman_runs + extra_runs
+
+        # the chase stops once the target is passed
+        scored = np.where(live, total_runs, 0)
+        target = scored[0::2].sum(axis=1) + 1
+        chase_before = np.cumsum(scored[1::2], axis=1) - scored[1::2]
+        live[1::2] &= chase_before < target[:, None]
+
+        keep = live.ravel()
+        inn = np.repeat(np.arange(innings), SLOTS_PER_INNINGS)[keep]
+        match = inn // 2
+        flat = {name: a.ravel()[keep] for name, a in (
+            ("over0", over0), ("ball", legal_before % 6 + 1), ("batsman", batsman),
+            ("non_striker", bat_xi[rows, non_striker]), ("bowler", bowler), ("batsman_runs", batsman_runs),
+            ("extra_runs", extra_runs), ("total_runs", total_runs), ("wide", wide), ("noball", noball),
+            ("wicket", wicket))}
+        is_wicket = flat["wicket"]
+        kinds = np.array(DISMISSALS, dtype=object)[rng.choice(len(DISMISSALS), len(inn), p=DISMISSAL_P)]
+        batsman_names = self.names[flat["batsman"]]
+        match_index = match_no[match]
+        venues = np.array(VENUES, dtype=object)
+        return pd.DataFrame({
+            "match_id": 1000000 + match_index,
+            "season": FIRST_SEASON + match_index // self.matches_per_season,
+            "venue": venues[(match_index * 7919) % len(venues)],
+            "inning": inn % 2 + 1,
+            "batting_team": self.teams[bat_team[inn]],
+            "bowling_team": self.teams[bat_team[inn ^ 1]],
+            "over": flat["over0"] + 1,
+            "ball": flat["ball"],
+            "batsman": batsman_names,
+            "non_striker": self.names[flat["non_striker"]],
+            "bowler": self.names[flat["bowler"]],
+            "batsman_runs": flat["batsman_runs"],
+            "extra_runs": flat["extra_runs"],
+            "total_runs": flat["total_runs"],
+            "wide": flat["wide"].astype(np.int8),
+            "noball": flat["noball"].astype(np.int8),
+            "is_wicket": is_wicket.astype(np.int8),
+            "player_dismissed": np.where(is_wicket, batsman_names, None),
+            "dismissal_kind": np.where(is_wicket, kinds, None),
+        }, columns=COLUMNS)
+
+
+def _rotate_strike(legal, wicket, odd, over_end, in_overs):
+    """Batting-order positions of striker and non-striker per slot, and whether the slot is bowled.
+
+    Works on flat lists, SLOTS_PER_INNINGS slots per innings; an innings stops
+    at ten wickets or after its 120th legal ball."""
+    n = len(legal)
+    striker, non_striker, live = [0] * n, [1] * n, [False] * n
+    s = ns = nxt = wickets = 0
+    for i in range(n):
+        if i % SLOTS_PER_INNINGS == 0:
+            s, ns, nxt, wickets = 0, 1, 2, 0
+        if wickets == 10 or not in_overs[i]:
+            continue
+        striker[i], non_striker[i], live[i] = s, ns, True
+        if wicket[i]:
+            wickets += 1
+            if wickets < 10:
+                s, nxt = nxt, nxt + 1
+        elif odd[i]:
+            s, ns = ns, s
+        if over_end[i]:
+            s, ns = ns, s
+    return striker, non_striker, live
+
+
+def generate_frame(rows: int, seed: int = 2008, **kwargs) -> pd.DataFrame:
+    """About `rows` deliveries in one DataFrame (tests and benchmarks)"""
+    kwargs.setdefault("seasons", max(1, min(17, rows // 40000)))
+    return pd.concat(list(Generator.for_rows(rows, seed=seed, **kwargs)), ignore_index=True)
+
+
+# ==================== OUTPUT ====================
+
+def write(generator: Generator, path: str) -> int:
+    """Stream every chunk to CSV or Parquet (by extension); returns the row count"""
+    parquet = path.lower().endswith((".parquet", ".pq"))
+    if parquet:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow)")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + ".tmp"
+    rows = 0
+    writer = None
+    started = time.perf_counter()
+    try:
+        for i, df in enumerate(generator):
+            if parquet:
+                table = pa.Table.from_pandas(df, preserve_index=False,
+                                             schema=writer.schema if writer else None)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp, table.schema)
+                writer.write_table(table)
+            else:
+                df.to_csv(tmp, mode="w" if i == 0 else "a", header=i == 0, index=False)
+            rows += len(df)
+            print(f"[SYNTH] {rows:,} rows ({(i + 1) * generator.chunk_matches:,}/{generator.total_matches:,} "
+                  f"matches, {time.perf_counter() - started:.1f}s)")
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(tmp, path)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic ball-by-ball deliveries")
+    parser.add_argument("--out", default=DEFAULT_OUT, help=".csv or .parquet")
+    parser.add_argument("--rows", type=int, help="approximate row count (sets --matches-per-season)")
+    parser.add_argument("--seasons", type=int, default=17)
+    parser.add_argument("--matches-per-season", type=int, default=74)
+    parser.add_argument("--teams", type=int, default=10)
+    parser.add_argument("--players", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=2008)
+    parser.add_argument("--chunk-matches", type=int, default=GENERATOR_CHUNK_MATCHES)
+    parser.add_argument("--force", action="store_true", help="overwrite an existing file")
+    args = parser.parse_args()
+    if os.path.exists(args.out) and not args.force:
+        parser.error(f"{args.out} exists; pass --force to overwrite it")
+    options = dict(teams=args.teams, players=args.players, seed=args.seed, chunk_matches=args.chunk_matches)
+    if args.rows:
+        gen = Generator.for_rows(args.rows, seasons=args.seasons, **options)
+    else:
+        gen = Generator(seasons=args.seasons, matches_per_season=args.matches_per_season, **options)
+    started = time.perf_counter()
+    total = write(gen, args.out)
+    print(f"[SYNTH] Wrote {total:,} rows to {args.out} in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,186 @@
+"""
+Table Cache
+Read-through in-memory cache of dataset tables for the Flask app (app.py).
+
+Each table is loaded once, from PostgreSQL when DATABASE_URL points there,
+otherwise from data/<name>.csv. It is kept as a DataFrame together with its
+JSON body already serialized, so a request is a dictionary lookup plus a
+bytes copy. No query or CSV parse happens per request.
+
+PostgreSQL tables are read in TABLE_CACHE_BATCH-row pages with keyset
+queries on the bulk loader's _row key:
+    SELECT ... WHERE _row > :last ORDER BY _row LIMIT :batch
+so a large table never turns into a single huge result set. Clients page
+the same way with ?after=<_row>&limit=<n>.
+
+Under gunicorn --preload the master process fills the cache before forking,
+and the workers share those pages copy-on-write. Freshness is checked at
+most every TABLE_CACHE_CHECK_INTERVAL seconds: against the file's
+size/mtime for CSVs, and against the bulk loader's manifest hash for
+database tables.
+"""
+
+from dataclasses import dataclass
+import os
+import threading
+import time
+
+import pandas as pd
+
+from bulk_loader import MANIFEST_TABLE, ROW_KEY
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+TABLE_CACHE_CHECK_INTERVAL = float(os.getenv("TABLE_CACHE_CHECK_INTERVAL", "30"))
+TABLE_CACHE_BATCH = int(os.getenv("TABLE_CACHE_BATCH", "5000"))
+MAX_PAGE = 5000
+
+
+@dataclass
+class CachedTable:
+    name: str
+    df: pd.DataFrame
+    body: bytes
+    signature: object
+    source: str
+    checked_at: float
+
+
+def _records_json(df: pd.DataFrame) -> bytes:
+    # NaN -> null; to_dict() + jsonify would emit bare NaN, which is not JSON
+    return df.to_json(orient="records", force_ascii=False, date_format="iso").encode("utf-8")
+
+
+class TableCache:
+    """Per-process cache of whole tables with pre-serialized bodies"""
+
+    def __init__(self, engine=None, data_dir: str = DATA_DIR,
+                 check_interval: float = TABLE_CACHE_CHECK_INTERVAL, batch: int = TABLE_CACHE_BATCH):
+        self.engine = engine
+        self.data_dir = data_dir
+        self.check_interval = check_interval
+        self.batch = batch
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    # ---------- sources ----------
+
+    def _param(self) -> str:
+        return "?" if self.engine.dialect.paramstyle == "qmark" else "%s"
+
+    def _csv_path(self, name: str) -> str:
+        return os.path.join(self.data_dir, f"{name}.csv")
+
+    def _csv_signature(self, name: str):
+        st = os.stat(self._csv_path(name))
+        return (st.st_size, st.st_mtime_ns)
+
+    def _db_signature(self, name: str):
+        conn = self.engine.raw_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT sha256 FROM {MANIFEST_TABLE} WHERE table_name = {self._param()}", (name,))
+            row = cursor.fetchone()
+            if row is None:
+                raise LookupError(f"table {name} has not been loaded")
+            return row[0]
+        finally:
+            conn.close()
+
+    def _load_db(self, name: str) -> pd.DataFrame:
+        """Whole table, fetched in keyset-paginated batches"""
+        table = self.engine.dialect.identifier_preparer.quote(name)
+        key = self.engine.dialect.identifier_preparer.quote(ROW_KEY)
+        frames, last = [], 0
+        conn = self.engine.raw_connection()
+        try:
+            cursor = conn.cursor()
+            while True:
+                cursor.execute(f"SELECT * FROM {table} WHERE {key} > {self._param()} ORDER BY {key} "
+                               f"LIMIT {self._param()}", (last, self.batch))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                columns = [d[0] for d in cursor.description]
+                frames.append(pd.DataFrame.from_records(rows, columns=columns))
+                last = rows[-1][columns.index(ROW_KEY)]
+                if len(rows) < self.batch:
+                    break
+        finally:
+            conn.close()
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True).drop(columns=[ROW_KEY])
+
+    def _fetch(self, name: str):
+        """(df, signature, source): the database first, the CSV as fallback"""
+        db_error = None
+        if self.engine is not None:
+            try:
+                signature = self._db_signature(name)
+                return self._load_db(name), signature, "db"
+            except Exception as e:
+                db_error = e
+                print(f"[TABLES] {name}: database unavailable ({e}); using CSV")
+        try:
+            signature = self._csv_signature(name)
+            return pd.read_csv(self._csv_path(name)), signature, "csv"
+        except Exception as csv_error:
+            if db_error is None:
+                raise
+            raise RuntimeError(f"DB error: {db_error} | CSV fallback error: {csv_error}") from csv_error
+
+    def _current_signature(self, entry: CachedTable):
+        if entry.source == "db":
+            return self._db_signature(entry.name)
+        return self._csv_signature(entry.name)
+
+    # ---------- access ----------
+
+    def get(self, name: str) -> CachedTable:
+        """The cached table, loading it on first use and reloading when its source changes"""
+        now = time.monotonic()
+        entry = self._tables.get(name)
+        if entry is not None and now - entry.checked_at < self.check_interval:
+            return entry
+        if entry is not None:
+            try:
+                fresh = self._current_signature(entry) == entry.signature
+            except Exception:
+                fresh = True  # source briefly unavailable: keep serving what we have
+            if fresh:
+                entry.checked_at = now
+                return entry
+        with self._lock:
+            current = self._tables.get(name)
+            if current is not None and current is not entry:
+                return current  # another thread reloaded it meanwhile
+            df, signature, source = self._fetch(name)
+            entry = CachedTable(name, df, _records_json(df), signature, source, time.monotonic())
+            self._tables[name] = entry
+        print(f"[TABLES] Cached {name}: {len(df)} rows from {source}")
+        return entry
+
+    def page(self, name: str, after: int = 0, limit: int = 100) -> bytes:
+        """{"rows": [...], "next": <after for the next page or null>, "count": total}"""
+        entry = self.get(name)
+        after = max(0, int(after))
+        limit = max(1, min(int(limit), MAX_PAGE))
+        rows = entry.df.iloc[after:after + limit]
+        nxt = after + limit if after + limit < len(entry.df) else None
+        return (b'{"rows":' + _records_json(rows) + b',"next":' + (str(nxt).encode() if nxt is not None else b"null")
+                + b',"count":' + str(len(entry.df)).encode() + b"}")
+
+    def preload(self, names):
+        """Load tables up front (before gunicorn forks, when run with --preload)"""
+        for name in names:
+            try:
+                self.get(name)
+            except Exception as e:
+                print(f"[TABLES] Could not preload {name}: {e}")
+        if self.engine is not None:
+            # connections opened in the master must not be inherited by workers
+            self.engine.dispose()
+
+    def stats(self) -> dict:
+        return {name: {"rows": len(t.df), "bytes": len(t.body), "source": t.source}
+                for name, t in self._tables.items()}
@@ -0,0 +1,81 @@
+"""
+Benchmark fixtures (pytest-benchmark, in requirements-dev.txt).
+
+The committed baseline lives in tests/benchmarks/baseline/ and CI fails when a
+benchmark's best time regresses past it:
+
+    pytest tests/benchmarks --benchmark-storage=tests/benchmarks/baseline \
+        --benchmark-compare=0001 --benchmark-compare-fail=min:50%
+
+After an intended speed change, re-record it on Linux/CPython 3.11 (the CI
+runner) by deleting the old file and running with --benchmark-save=baseline.
+The threshold is loose because the baseline and the CI runner are different
+machines; compare against a local --benchmark-autosave run for finer checks.
+
+BENCH_SCALES picks the dataset sizes: "1" (default), "1,10" or "1,10,100".
+At 1x the synthetic_data ball-by-ball file has about BENCH_BASE_ROWS deliveries.
+Without pytest-benchmark installed this directory is not collected.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from synthetic_data import generate_frame
+
+try:
+    import pytest_benchmark  # noqa: F401
+except ImportError:
+    collect_ignore_glob = ["test_*.py"]
+
+BENCH_SCALES = [int(s) for s in os.getenv("BENCH_SCALES", "1").split(",") if s.strip()]
+BENCH_BASE_ROWS = int(os.getenv("BENCH_BASE_ROWS", "25000"))
+
+
+@pytest.fixture(scope="session", params=BENCH_SCALES, ids=lambda s: f"{s}x")
+def ball_data_dir(request, tmp_path_factory):
+    """A data dir holding a synthetic ball-by-ball CSV at the requested scale"""
+    data_dir = tmp_path_factory.mktemp(f"balls_{request.param}x")
+    generate_frame(BENCH_BASE_ROWS * request.param).to_csv(data_dir / "ball_by_ball.csv", index=False)
+    return data_dir
+
+
+@pytest.fixture(scope="session")
+def known_pair(ball_data_dir):
+    """The batter/bowler pair with the most deliveries in the synthetic file"""
+    df = pd.read_csv(ball_data_dir / "ball_by_ball.csv", usecols=["batsman", "bowler"])
+    return df.value_counts().idxmax()
+
+
+@pytest.fixture
+def ball_data(ball_data_dir, monkeypatch):
+    """Point pvp_utils at the synthetic file; returns a function that empties its caches"""
+    import pvp_utils
+
+    monkeypatch.setattr(pvp_utils, "DATA_DIR", str(ball_data_dir))
+    monkeypatch.setattr(pvp_utils, "_ball_cache", {"csv": None, "signature": None, "store_version": 0, "df": None})
+    monkeypatch.setattr(pvp_utils, "_pvp_cache", {})
+
+    def reset():
+        pvp_utils._ball_cache.update(csv=None, signature=None, store_version=0, df=None)
+        pvp_utils._pvp_cache.clear()
+
+    return reset
+
+
+@pytest.fixture(params=BENCH_SCALES, ids=lambda s: f"{s}x")
+def predictions_file(request, tmp_path, monkeypatch):
+    """Synthetic predictions.json for /leaderboard, 1000 predictions per scale step"""
+    import api
+
+    rng = np.random.default_rng(3)
+    count = 1000 * request.param
+    users = [f"user{i:05d}" for i in range(max(50, count // 20))]
+    path = tmp_path / "predictions.json"
+    path.write_text(json.dumps([{"user": users[i], "match_id": int(m)} for i, m in
+                                zip(rng.integers(0, len(users), count), rng.integers(1, 1000, count))]))
+    monkeypatch.setattr(api, "PREDICTIONS_FILE", str(path))
+    return path
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+import api
+import async_db
+import response_cache
+from storage_config import create_async_storage_engine
+from unified_db import Base, User
+
+client = TestClient(api.app)
+
+
+def test_predict_match(benchmark):
+    result = benchmark(api.predict_match, "Chennai Super Kings", "Mumbai Indians",
+                       "Wankhede Stadium, Mumbai", "sunny", 180, 165, 4, 7)
+    assert result["predicted_winner"]
+
+
+def test_matches_endpoint(benchmark, monkeypatch):
+    # measure the endpoint, not ResponseCacheMiddleware replaying its first response
+    monkeypatch.setattr(response_cache, "RESPONSE_CACHE_ENABLED", False)
+    response = benchmark(client.get, "/matches")
+    assert response.status_code == 200 and "etag" not in response.headers
+
+
+def test_leaderboard_endpoint(benchmark, predictions_file):
+    response = benchmark(client.get, "/leaderboard", params={"top": 20})
+    assert len(response.json()["top"]) == 20
+
+
+@pytest.fixture
+def token_db(tmp_path):
+    engine = create_async_storage_engine(f"sqlite:///{tmp_path / 'bench.db'}")
+    loop = asyncio.new_event_loop()
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session = async_sessionmaker(engine, expire_on_commit=False)()
+        session.add(User(username="bench", display_name="Bench", password_hash="x", salt="x", tokens=10 ** 9))
+        await session.commit()
+        return session
+
+    session = loop.run_until_complete(setup())
+    yield loop, session
+    loop.run_until_complete(session.close())
+    loop.run_until_complete(engine.dispose())
+    loop.close()
+
+
+def test_token_deduction(benchmark, token_db):
+    loop, session = token_db
+    remaining = benchmark(lambda: loop.run_until_complete(async_db.charge_tokens(session, "bench", 10)))
+    assert remaining < 10 ** 9
@@ -0,0 +1,42 @@
+import pvp_utils
+
+
+def test_load_ball_data_cold(benchmark, ball_data):
+    df = benchmark.pedantic(pvp_utils.load_ball_data, setup=ball_data, rounds=3, iterations=1)
+    assert len(df) > 0
+
+
+def test_load_ball_data_warm(benchmark, ball_data):
+    cold = pvp_utils.load_ball_data()
+    df = benchmark(pvp_utils.load_ball_data)
+    assert len(df) == len(cold) > 0 and {"batsman", "bowler"} <= set(df.columns)
+
+
+def test_compute_pvp(benchmark, ball_data, known_pair):
+    pvp_utils.load_ball_data()
+    result = benchmark(pvp_utils.compute_pvp, *known_pair)
+    assert result["balls_faced"] > 0
+
+
+def test_cached_pvp_hit(benchmark, ball_data, known_pair):
+    pvp_utils.cached_pvp(*known_pair)
+    benchmark(pvp_utils.cached_pvp, *known_pair)
+
+
+def test_search_players(benchmark, ball_data):
+    pvp_utils.load_ball_data()
+    # seconds per call at 1x: a fixed number of rounds keeps 100x runs bounded
+    results = benchmark.pedantic(pvp_utils.search_players, args=("sharma", 50), rounds=3, iterations=1)
+    assert results
+
+
+def test_compute_pvp_from_aggregates(benchmark):
+    # reads the shipped aggregate CSVs; no synthetic scale applies
+    result = benchmark(pvp_utils.compute_pvp_from_aggregates, "V Kohli", "JJ Bumrah")
+    assert result
+
+
+def test_build_player_catalog_cold(benchmark):
+    catalog = benchmark.pedantic(pvp_utils.build_player_catalog,
+                                 setup=pvp_utils.build_local_player_catalog.cache_clear, rounds=3, iterations=1)
+    assert catalog
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+import async_db
+import spin_store
+from api import app
+from storage_config import create_async_storage_engine
+from unified_db import Base
+from user_cache import user_cache
+
+
+@pytest.fixture
+def AsyncSession(tmp_path):
+    engine = create_async_storage_engine(f"sqlite:///{tmp_path / 'users.db'}")
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(setup())
+    spin_store.spin_cache.clear()
+    user_cache.clear()
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    asyncio.run(engine.dispose())
+
+
+def test_token_helpers_are_atomic(AsyncSession):
+    async def scenario():
+        async with AsyncSession() as db:
+            await async_db.create_user(db, "fan", "Fan", None, password_hash="x", salt="x")
+            with pytest.raises(ValueError):
+                await async_db.create_user(db, "fan", "Fan", None, password_hash="x", salt="x")
+        # 15 concurrent charges of 10 against 100 tokens: exactly 10 succeed
+        async def charge():
+            async with AsyncSession() as db:
+                return await async_db.deduct_tokens(db, "fan", 10)
+        results = await asyncio.gather(*(charge() for _ in range(15)))
+        async with AsyncSession() as db:
+            assert await async_db.add_tokens(db, "fan", 5)
+            assert not await async_db.add_tokens(db, "ghost", 5)
+            return results, await async_db.get_token_balance(db, "fan")
+
+    results, balance = asyncio.run(scenario())
+    assert results.count(True) == 10
+    assert balance == 5
+
+
+def test_lost_registration_race_names_the_taken_column(AsyncSession, monkeypatch):
+    check = async_db._check_available
+    calls = []
+
+    async def racing_check(db, username, email):
+        calls.append(username)
+        if len(calls) > 1:  # the pre-insert check ran before the other registration committed
+            await check(db, username, email)
+
+    async def scenario():
+        async with AsyncSession() as db:
+            await async_db.create_user(db, "ann", "Ann", None, email="ann@example.com", password_hash="x", salt="x")
+            monkeypatch.setattr(async_db, "_check_available", racing_check)
+            with pytest.raises(ValueError, match="Email already registered"):
+                await async_db.create_user(db, "ann2", "Ann", None, email="ann@example.com",
+                                           password_hash="x", salt="x")
+
+    asyncio.run(scenario())
+
+
+def test_async_endpoints(AsyncSession):
+    async def override():
+        async with AsyncSession() as db:
+            yield db
+
+    app.dependency_overrides[async_db.get_async_db] = override
+    try:
+        client = TestClient(app)
+        reg = client.post("/users/register", json={"username": "async_fan", "password": "Secret123"}).json()
+        assert reg["ok"]
+        headers = {"Authorization": f"Bearer {reg['token']}"}
+        login = client.post("/users/login", json={"username": "async_fan", "password": "Secret123"}).json()
+        assert login["ok"]
+
+        payload = {"team1": "CSK", "team2": "MI", "venue": "Wankhede Stadium, Mumbai", "weather": "sunny",
+                   "runsTeam1": 180, "runsTeam2": 170, "wicketsTeam1": 4, "wicketsTeam2": 6, "username": "async_fan"}
+        assert client.post("/predict/match", json=payload, headers=headers).json()["tokens_remaining"] == 90
+        assert client.get("/users/async_fan/balance").json()["tokens"] == 90
+
+        spun = client.post("/users/async_fan/spin", headers=headers).json()
+        assert spun["ok"] and spun["tokens_remaining"] == 90 + spun["reward"]
+        assert client.get("/users/async_fan/spin_status").json()["spins_left"] == spin_store.MAX_SPINS_PER_DAY - 1
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_balance_reads_are_served_from_user_cache(AsyncSession):
+    async def scenario():
+        async with AsyncSession() as db:
+            await async_db.create_user(db, "cached", "Cached", None, password_hash="x", salt="x")
+            user_cache.clear()
+            assert await async_db.get_token_balance(db, "cached") == 100  # miss, loads row
+            assert await async_db.charge_tokens(db, "cached", 30) == 70   # write-through
+            assert await async_db.get_token_balance(db, "cached") == 70   # hit
+            assert await async_db.get_token_balance(db, "nobody") is None
+
+    asyncio.run(scenario())
+    stats = user_cache.stats()
+    assert stats["hits"] >= 1 and stats["misses"] >= 2
@@ -0,0 +1,129 @@
+import multiprocessing
+
+import pytest
+
+import ball_store
+import pvp_utils
+from ball_store import BallStore
+
+HEADER = "match_id,inning,over,ball,batsman,non_striker,bowler,wide_runs,noball_runs," \
+         "batsman_runs,extra_runs,total_runs,player_dismissed,dismissal_kind\n"
+MATCH_1 = ["1,1,1,1,A,B,X,0,0,4,0,4,,",
+           "1,1,1,2,A,B,X,1,0,0,1,1,,",
+           "1,1,1,2,A,B,X,0,0,0,0,0,A,bowled",
+           "1,1,1,3,B,C,X,0,0,6,0,6,,"]
+MATCH_2 = ["2,1,1,1,A,C,X,0,0,1,0,1,,",
+           "2,1,1,2,C,A,Y,0,0,2,0,2,,"]
+
+
+def write(tmp_path, name, rows):
+    path = tmp_path / name
+    path.write_text(HEADER + "\n".join(rows) + "\n")
+    return str(path)
+
+
+def test_ingest_appends_and_aggregates(tmp_path):
+    store = BallStore(str(tmp_path / "store"))
+    first = store.ingest(write(tmp_path, "m1.csv", MATCH_1), "sha-1")
+    assert first["ingested"] and first["rows"] == 4 and first["new_matches"] == ["1"]
+    assert sorted(first["pairs"]) == [("A", "X"), ("B", "X")]
+    assert store.matchup("a", "x") == {"balls": 2, "runs": 4, "fours": 1, "sixes": 0, "dots": 1,
+                                       "dismissals": 1, "strike_rate": 200.0}
+
+    assert store.ingest(write(tmp_path, "m1.csv", MATCH_1), "sha-1")["reason"] == "already ingested"
+    # overlapping export: match 1 is skipped, match 2 appended
+    second = store.ingest(write(tmp_path, "both.csv", MATCH_1 + MATCH_2), "sha-2")
+    assert second["new_matches"] == ["2"] and second["skipped_matches"] == ["1"] and second["rows"] == 2
+    assert store.matchup("A", "X")["runs"] == 5
+
+    reopened = BallStore(str(tmp_path / "store"))
+    assert reopened.version == 2 and reopened.matchup("C", "Y")["runs"] == 2
+    assert len(reopened.deliveries()) == 6 and len(reopened.deliveries(after_version=1)) == 2
+    assert len(reopened.deliveries(upto_version=1)) == 4
+    assert reopened.deliveries()["batsman"].tolist()[:3] == ["A", "A", "A"]
+
+
+def test_rejects_non_delivery_files(tmp_path):
+    path = tmp_path / "old.csv"
+    path.write_text("batsman,bowler,wickets\nA,X,1\n")
+    store = BallStore(str(tmp_path / "store"))
+    try:
+        store.ingest(str(path))
+    except ValueError as e:
+        assert "batter_runs" in str(e)
+    else:
+        raise AssertionError("expected ValueError")
+    assert store.version == 0
+
+
+def test_pvp_sees_new_matches_without_restart(tmp_path, monkeypatch):
+    store = BallStore(str(tmp_path / "store"))
+    monkeypatch.setattr(pvp_utils, "ball_store", store)
+    monkeypatch.setattr(pvp_utils, "DATA_DIR", str(tmp_path))  # no shipped CSV
+    monkeypatch.setitem(pvp_utils._ball_cache, "df", None)
+    monkeypatch.setitem(pvp_utils._ball_cache, "signature", None)
+    monkeypatch.setattr(pvp_utils, "_pvp_cache", {})
+
+    store.ingest(write(tmp_path, "m1.csv", MATCH_1), "sha-1")
+    assert pvp_utils.cached_pvp("A", "X")["runs"] == 4
+    before = pvp_utils.load_ball_data()
+
+    result = store.ingest(write(tmp_path, "m2.csv", MATCH_2), "sha-2")
+    assert pvp_utils.invalidate_pairs(result["pairs"]) == 1  # only (A, X) was cached
+    assert len(pvp_utils.load_ball_data()) == len(before) + 2
+    assert pvp_utils.cached_pvp("A", "X")["runs"] == 5
+
+
+def test_pvp_loads_an_ingest_racing_the_version_read_once(tmp_path, monkeypatch):
+    store = BallStore(str(tmp_path / "store"), check_interval=0)
+    other = BallStore(str(tmp_path / "store"), check_interval=0)  # another worker
+    monkeypatch.setattr(pvp_utils, "ball_store", store)
+    monkeypatch.setattr(pvp_utils, "DATA_DIR", str(tmp_path))
+    monkeypatch.setitem(pvp_utils._ball_cache, "df", None)
+    monkeypatch.setitem(pvp_utils._ball_cache, "signature", None)
+    store.ingest(write(tmp_path, "m1.csv", MATCH_1), "sha-1")
+
+    read = store.deliveries
+
+    def racing_deliveries(**kwargs):
+        if other.version == 1:  # lands after pvp_utils read version 1
+            other.ingest(write(tmp_path, "m2.csv", MATCH_2), "sha-2")
+        return read(**kwargs)
+
+    monkeypatch.setattr(store, "deliveries", racing_deliveries)
+    assert len(pvp_utils.load_ball_data()) == 4
+    assert len(pvp_utils.load_ball_data()) == 6  # match 2 once, not twice
+
+
+def test_workers_see_and_extend_each_others_ingests(tmp_path):
+    # two workers with their own BallStore over one directory
+    a = BallStore(str(tmp_path / "store"), check_interval=0)
+    b = BallStore(str(tmp_path / "store"), check_interval=0)
+    assert a.version == b.version == 0
+    a.ingest(write(tmp_path, "m1.csv", MATCH_1), "sha-1")
+    assert b.version == 1 and b.matchup("A", "X")["runs"] == 4
+
+    # b ingests on top of a's version instead of overwriting part-000001
+    assert b.ingest(write(tmp_path, "m2.csv", MATCH_2), "sha-2")["version"] == 2
+    assert a.ingest(write(tmp_path, "m1.csv", MATCH_1), "sha-1")["reason"] == "already ingested"
+    assert a.version == 2 and a.matchup("A", "X")["runs"] == 5
+    assert BallStore(str(tmp_path / "store")).stats()["matches"] == 2
+
+
+def _ingest_in_process(root, path, source_id):
+    return BallStore(root, check_interval=0).ingest(path, source_id)["version"]
+
+
+@pytest.mark.skipif(ball_store.fcntl is None, reason="needs fcntl")
+def test_concurrent_ingests_from_processes_get_distinct_versions(tmp_path):
+    root = str(tmp_path / "store")
+    jobs = []
+    for n in range(6):
+        rows = [f"{n + 10}," + line.split(",", 1)[1] for line in MATCH_1]
+        jobs.append((root, write(tmp_path, f"m{n}.csv", rows), f"sha-{n}"))
+    with multiprocessing.get_context("fork").Pool(6) as pool:
+        versions = pool.starmap(_ingest_in_process, jobs)
+    assert sorted(versions) == [1, 2, 3, 4, 5, 6]
+    store = BallStore(root)
+    assert store.version == 6 and len(store.deliveries()) == 24
+    assert store.matchup("A", "X")["runs"] == 6 * 4
@@ -0,0 +1,45 @@
+import sqlite3
+
+from sqlalchemy import create_engine
+
+from bulk_loader import BulkLoader, table_name
+
+
+def make_dir(tmp_path):
+    data = tmp_path / "data"
+    data.mkdir()
+    (data / "Most Runs - 2008.csv").write_text("POS,Player,Runs,Avg\n1,Shaun Marsh,616,68.44\n2,Gautam Gambhir,534,\n")
+    (data / "matches.csv").write_text("id,season,team1,winner,result_margin\n1,2008,RCB,KKR,140\n2,2008,CSK,,\n")
+    (data / "notes.txt").write_text("not a csv")
+    return data
+
+
+def test_loads_types_indexes_and_skips_unchanged(tmp_path):
+    data = make_dir(tmp_path)
+    db = tmp_path / "load.db"
+    loader = BulkLoader(create_engine(f"sqlite:///{db}"), str(data), workers=2)
+
+    report = loader.load()
+    assert sorted(report.loaded) == ["matches", "most_runs_2008"] and not report.failed
+    conn = sqlite3.connect(db)
+    assert conn.execute('SELECT "Player", "Avg" FROM most_runs_2008 ORDER BY "POS"').fetchall() == \
+        [("Shaun Marsh", 68.44), ("Gautam Gambhir", None)]
+    columns = {row[1]: row[2] for row in conn.execute("PRAGMA table_info(matches)")}
+    assert columns == {"_row": "INTEGER", "id": "INTEGER", "season": "INTEGER", "team1": "TEXT", "winner": "TEXT",
+                       "result_margin": "INTEGER"}
+    assert conn.execute("SELECT result_margin FROM matches WHERE id = 1").fetchone() == (140,)
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"ix_matches_id", "ix_matches_team1", "ix_most_runs_2008_player"} <= indexes
+    conn.close()
+
+    assert sorted(loader.load().skipped) == ["matches", "most_runs_2008"]
+    (data / "matches.csv").write_text("id,season,team1,winner,result_margin\n3,2009,MI,MI,5\n")
+    report = loader.load()
+    assert report.loaded == ["matches"] and report.skipped == ["most_runs_2008"]
+    assert len(loader.load(force=True).loaded) == 2
+
+
+def test_table_names():
+    assert table_name("Most Runs - 2008.csv") == "most_runs_2008"
+    assert table_name("2008 Results.csv") == "t_2008_results"
+    assert len(table_name("x" * 100 + ".csv")) == 63
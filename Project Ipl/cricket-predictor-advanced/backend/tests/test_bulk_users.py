@@ -0,0 +1,88 @@
+import io
+import json
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import password_hashing
+import unified_db
+from password_hashing import hash_password
+from unified_db import Base, User
+
+USERS_JSON = Path(__file__).resolve().parents[1] / "data" / "users.json"
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bulk.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def test_bulk_import_skips_duplicates_and_keeps_hashes(db):
+    password_hash, salt = hash_password("Secret123")
+    records = [{"username": f"fan{i}", "tokens": "" if i % 2 else "250"} for i in range(2500)]
+    records.append({"username": "legacy", "password_hash": password_hash, "salt": salt})
+    records.append({"username": "fan0"})  # duplicate within the import
+    summary = unified_db.bulk_import_users(db, records, batch_size=1000)
+    assert summary["inserted"] == 2501
+
+    again = unified_db.bulk_import_users(db, [{"username": "fan1"}, {"username": "new"}])
+    assert again == {"received": 2, "inserted": 1, "skipped": 1}
+
+    assert unified_db.authenticate_user(db, "legacy", "Secret123") is not None
+    assert unified_db.authenticate_user(db, "fan1", "") is None  # unusable password
+    assert db.query(User).filter(User.username == "fan0").one().tokens == 250
+    codes = {code for (code,) in db.query(User.referral_code)}
+    assert len(codes) == db.query(User).count()
+
+
+def test_plaintext_imports_are_cheap_until_first_login(db):
+    unified_db.bulk_import_users(db, [{"username": "pat", "password": "Secret123"}])
+    stored = db.query(User).filter(User.username == "pat").one().password_hash
+    assert stored.startswith(f"pbkdf2_sha256${password_hashing.IMPORT_PBKDF2_ITERATIONS}$")
+    assert password_hashing.needs_rehash(stored)
+
+    assert unified_db.authenticate_user(db, "pat", "Secret123") is not None
+    db.expire_all()
+    upgraded = db.query(User).filter(User.username == "pat").one().password_hash
+    assert not password_hashing.needs_rehash(upgraded)
+    assert unified_db.authenticate_user(db, "pat", "Secret123") is not None
+
+
+def test_read_user_records_formats():
+    csv_text = io.StringIO("username,email\nann,ann@example.com\n")
+    assert list(unified_db.read_user_records(csv_text, "csv"))[0]["email"] == "ann@example.com"
+    json_text = io.StringIO(json.dumps([{"username": "bob"}]))
+    assert list(unified_db.read_user_records(json_text, "json")) == [{"username": "bob"}]
+
+
+def test_grant_ensure_and_export(db):
+    unified_db.bulk_import_users(db, [{"username": f"u{i}", "referred_by": "camp" if i < 3 else None}
+                                      for i in range(10)])
+    assert unified_db.grant_tokens_bulk(db, 50, referred_by="camp") == 3
+    assert unified_db.grant_tokens_bulk(db, 5, usernames=["u9", "ghost"]) == 1
+    db.query(User).filter(User.username == "u8").update({"tokens": None})
+    db.commit()
+    assert unified_db.ensure_default_tokens(db) == ["u8"]
+
+    exported = "".join(unified_db.export_users_csv(db, batch_size=4)).splitlines()
+    assert exported[0].startswith("username,display_name,email,tokens")
+    assert len(exported) == 11
+    balances = {row["username"]: row["tokens"] for row in unified_db.export_users(db)}
+    assert balances["u0"] == 150 and balances["u9"] == 105 and balances["u8"] == 100
+    assert "password_hash" not in exported[0]
+
+
+def test_imported_users_json_accounts_can_log_in(db):
+    # a real row from the JSON user store: sha256(salt + password)
+    ajay = next(u for u in json.loads(USERS_JSON.read_text()) if u["username"] == "ajay")
+    unified_db.bulk_import_users(db, [ajay])
+    stored = db.query(User).filter(User.username == "ajay").one().password_hash
+    assert stored.startswith("legacy_json$")
+    assert unified_db.authenticate_user(db, "ajay", "123456") is not None
+    assert unified_db.authenticate_user(db, "ajay", "wrong") is None
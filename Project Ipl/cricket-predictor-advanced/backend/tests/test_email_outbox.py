@@ -0,0 +1,104 @@
+import smtplib
+import socket
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+
+import email_service
+from email_outbox import OutboxEmail, OutboxWorker, enqueue_email, STATUS_SENT, STATUS_PENDING, STATUS_FAILED
+from unified_db import Base
+
+
+class RecordingHandler:
+    def __init__(self):
+        self.messages = []
+        self.sessions = set()
+
+    async def handle_DATA(self, server, session, envelope):
+        self.sessions.add(id(session))
+        self.messages.append(envelope)
+        return "250 OK"
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'outbox.db'}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+    controller = aiosmtpd_controller.Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    yield controller, handler
+    controller.stop()
+
+
+def test_batch_is_sent_over_one_connection(session_factory, smtp_server):
+    controller, handler = smtp_server
+    db = session_factory()
+    for i in range(3):
+        enqueue_email(db, f"user{i}@example.com", "Hello", f"<p>{i}</p>")
+    db.close()
+
+    connections = []
+
+    def connect():
+        conn = smtplib.SMTP(controller.hostname, controller.port)
+        connections.append(conn)
+        return conn
+
+    worker = OutboxWorker(session_factory=session_factory, connect=connect)
+    assert worker.run_once() == 3
+    worker.stop()
+
+    assert len(connections) == 1
+    assert len(handler.messages) == 3
+    assert len(handler.sessions) == 1
+    db = session_factory()
+    assert {e.status for e in db.query(OutboxEmail).all()} == {STATUS_SENT}
+
+
+def test_failed_delivery_is_retried_with_backoff(session_factory):
+    db = session_factory()
+    enqueue_email(db, "user@example.com", "Hello", "<p>hi</p>")
+    db.close()
+
+    def connect():
+        raise ConnectionRefusedError("smtp down")
+
+    worker = OutboxWorker(session_factory=session_factory, connect=connect, max_attempts=2, base_backoff=60)
+    assert worker.run_once() == 1
+
+    db = session_factory()
+    entry = db.query(OutboxEmail).one()
+    assert entry.status == STATUS_PENDING
+    assert entry.attempts == 1
+    assert entry.next_attempt_at > datetime.utcnow()
+    # Not due yet, so nothing is claimed
+    assert worker.run_once() == 0
+
+    entry.next_attempt_at = datetime.utcnow()
+    db.commit()
+    db.close()
+    assert worker.run_once() == 1
+    db = session_factory()
+    assert db.query(OutboxEmail).one().status == STATUS_FAILED
+
+
+def test_welcome_email_escapes_user_fields():
+    rendered = email_service.render_welcome_email("a@example.com", "<b>Eve</b>", "eve")
+    assert "&lt;b&gt;Eve&lt;/b&gt;" in rendered
+    assert "<b>Eve</b>" not in rendered
@@ -0,0 +1,83 @@
+from itertools import combinations
+
+import pandas as pd
+
+from fantasy import FantasyOptimizer, ROLE_LIMITS, build_projections, name_key, solve_lineups
+
+ROLES = ["WK", "WK", "BAT", "BAT", "BAT", "BAT", "AR", "AR", "BOWL", "BOWL", "BOWL", "BOWL", "BAT", "BOWL"]
+POINTS = [40, 22, 50, 38, 35, 20, 45, 30, 42, 33, 28, 18, 31, 25]
+CREDITS = [10.5, 8, 11, 9.5, 9, 7, 10.5, 8.5, 10, 9, 8.5, 7, 8.5, 7.5]
+
+
+def make_pool(teams=None):
+    return pd.DataFrame({
+        "name": [f"P{i}" for i in range(len(ROLES))],
+        "role": ROLES,
+        "projected_points": [float(p) for p in POINTS],
+        "credits": CREDITS,
+        "team": teams or [None] * len(ROLES),
+    })
+
+
+def brute_force(pool, budget, k, max_per_team=7):
+    scored = []
+    for combo in combinations(range(len(pool)), 11):
+        rows = pool.iloc[list(combo)]
+        if rows["credits"].sum() > budget:
+            continue
+        counts = rows["role"].value_counts()
+        if any(not lo <= counts.get(role, 0) <= hi for role, (lo, hi) in ROLE_LIMITS.items()):
+            continue
+        if max(rows["team"].dropna().value_counts(), default=0) > max_per_team:
+            continue
+        scored.append(rows["projected_points"].sum())
+    return sorted(scored, reverse=True)[:k]
+
+
+def test_top_k_matches_brute_force():
+    pool = make_pool()
+    lineups = solve_lineups(pool, 100, k=3)
+    assert [l["projected_points"] for l in lineups] == brute_force(pool, 100, 3)
+    assert len({frozenset(p["name"] for p in l["players"]) for l in lineups}) == 3
+    best = lineups[0]
+    assert best["credits_used"] <= 100
+    assert best["captain"] == best["players"][0]["name"]
+
+
+def test_team_cap_and_infeasible_budget():
+    teams = ["CSK"] * 9 + ["MI"] * 5
+    pool = make_pool(teams)
+    capped = solve_lineups(pool, 100, k=1, max_per_team=6)
+    assert capped[0]["projected_points"] == brute_force(pool, 100, 1, max_per_team=6)[0]
+    assert max(sum(p["team"] == t for p in capped[0]["players"]) for t in ("CSK", "MI")) <= 6
+    assert solve_lineups(pool, 70, k=1) == []
+
+
+def test_projections_from_season_tables():
+    projections = build_projections()
+    # "K L Rahul" / "KL Rahul" spellings across seasons merge into one player
+    assert (projections.index == name_key("KL Rahul")).sum() == 1
+    assert projections.loc["klrahul", "role"] == "WK"
+    assert set(projections["role"]) == set(ROLE_LIMITS)
+    assert projections["credits"].between(7, 11).all()
+
+
+def test_optimizer_squad_and_cache():
+    optimizer = FantasyOptimizer()
+    # six players per role, spread across the credit bands
+    top = pd.concat(group.iloc[::4].head(6) for _, group in optimizer.projections().groupby("role"))
+    squad = [{"name": name, "team": "A" if i % 2 else "B"} for i, name in enumerate(top["name"])]
+    squad.append({"name": "Not A Player"})
+    result = optimizer.recommend(115, k=2, squad=squad)
+    assert result["unmatched"] == ["Not A Player"]
+    assert len(result["lineups"]) == 2
+    assert all(p["team"] in ("A", "B") for p in result["lineups"][0]["players"])
+    assert optimizer.recommend(115, k=2, squad=squad) is result
+
+
+def test_top_k_with_teams_matches_brute_force():
+    # pandas stores a None team as NaN in a string column; NaN must count as "no team"
+    teams = ["CSK", None, "MI", None, "CSK", None, "MI", None, "CSK", None, "MI", None, None, "CSK"]
+    pool = make_pool(teams)
+    lineups = solve_lineups(pool, 100, k=5, max_per_team=3)
+    assert [l["projected_points"] for l in lineups] == brute_force(pool, 100, 5, max_per_team=3)
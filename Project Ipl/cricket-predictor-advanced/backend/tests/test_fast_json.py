@@ -0,0 +1,22 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from fast_json import FastJSONResponse, dataframe_response
+
+
+def test_dataframe_response_matches_dict_path():
+    df = pd.DataFrame({"name": ["a", None], "runs": [10.0, np.nan], "wkts": [1, 2]})
+    body = dataframe_response("rows", df, count=len(df), season=2025).body
+    assert json.loads(body) == {
+        "rows": [{"name": "a", "runs": 10.0, "wkts": 1}, {"name": None, "runs": None, "wkts": 2}],
+        "count": 2,
+        "season": 2025,
+    }
+    assert list(json.loads(dataframe_response("rows", df.head(0)).body)) == ["rows"]
+
+
+def test_fast_json_response_handles_numpy_and_nan():
+    body = FastJSONResponse({"n": np.int64(3), "arr": np.arange(2), "x": float("nan")}).body
+    assert json.loads(body) == {"n": 3, "arr": [0, 1], "x": None}
@@ -0,0 +1,77 @@
+import asyncio
+import time
+
+from sqlalchemy import create_engine, text
+
+from metrics import Histogram, MetricsMiddleware, Registry, instrument_engine, registry
+
+
+class FakeRoute:
+    path = "/team/{team_name}"
+
+
+def make_app(route=None, body=b"x" * 300):
+    async def app(scope, receive, send):
+        if route is not None:
+            scope["route"] = route
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": body})
+    return app
+
+
+async def call(handler, path="/team/CSK"):
+    async def receive():
+        return {}
+
+    async def send(message):
+        pass
+
+    await handler({"type": "http", "method": "GET", "path": path, "headers": []}, receive, send)
+
+
+def test_route_templates_sizes_and_render():
+    reg = Registry()
+    asyncio.run(call(MetricsMiddleware(make_app(FakeRoute()), reg)))
+    # a later response produced before routing (e.g. a response-cache hit) keeps the template
+    middleware = MetricsMiddleware(make_app(FakeRoute()), reg)
+    asyncio.run(call(middleware))
+    middleware.app = make_app()
+    asyncio.run(call(middleware))
+    asyncio.run(call(middleware, "/missing"))
+    assert reg.requests[("GET", "/team/{team_name}", 200)] == 3
+    assert reg.requests[("GET", "<unmatched>", 200)] == 1
+    assert reg.response_bytes["/team/{team_name}"].total == 900
+
+    reg.caches["demo"] = lambda: (3, 1)
+    out = reg.render()
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/team/{team_name}",le="+Inf"} 3' in out
+    assert 'http_response_size_bytes_bucket{route="/team/{team_name}",le="1024"} 3' in out
+    assert 'cache_hits_total{cache="demo"} 3' in out
+
+
+def test_histogram_buckets_are_cumulative():
+    hist = Histogram((1, 10))
+    for value in (0.5, 1, 5, 50):
+        hist.observe(value)
+    assert list(hist.lines("m", "")) == ['m_bucket{le="1"} 2', 'm_bucket{le="10"} 3', 'm_bucket{le="+Inf"} 4',
+                                         "m_sum{} 56.500000", "m_count{} 4"]
+
+
+def test_db_statements_are_timed():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert registry.db["SELECT"].count >= 1
+
+
+def test_middleware_overhead_is_small():
+    async def run(handler, n=5000):
+        started = time.perf_counter()
+        for _ in range(n):
+            await call(handler)
+        return (time.perf_counter() - started) / n
+
+    app = make_app(FakeRoute())
+    overhead = asyncio.run(run(MetricsMiddleware(app, Registry()))) - asyncio.run(run(app))
+    assert overhead < 50e-6
@@ -0,0 +1,59 @@
+import asyncio
+import hashlib
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import password_hashing
+from unified_db import Base, User, authenticate_user, create_user
+
+
+@pytest.fixture(autouse=True)
+def cheap_kdf(monkeypatch):
+    monkeypatch.setattr(password_hashing, "PBKDF2_ITERATIONS", 1000)
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'users.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def test_hash_roundtrip_and_cost_change():
+    encoded, salt = password_hashing.hash_password("Secret123")
+    assert encoded.startswith("pbkdf2_sha256$1000$")
+    assert password_hashing.verify_password("Secret123", encoded, salt)
+    assert not password_hashing.verify_password("wrong", encoded, salt)
+    assert not password_hashing.needs_rehash(encoded)
+    password_hashing.PBKDF2_ITERATIONS = 2000
+    assert password_hashing.needs_rehash(encoded)
+
+
+def test_legacy_hash_is_rehashed_on_login(db):
+    salt = "legacysalt"
+    legacy = hashlib.sha256(("Secret123" + salt).encode()).hexdigest()
+    create_user(db, "old_user", "Old User", None, password_hash=legacy, salt=salt)
+
+    assert authenticate_user(db, "old_user", "wrong") is None
+    user = authenticate_user(db, "old_user", "Secret123")
+    assert user is not None
+    assert user.password_hash.startswith("pbkdf2_sha256$")
+    assert authenticate_user(db, "old_user", "Secret123") is not None
+    assert db.query(User).filter(User.username == "old_user").one().last_login is not None
+
+
+def test_pool_rejects_work_beyond_pending_limit(monkeypatch):
+    monkeypatch.setattr(password_hashing, "HASH_MAX_PENDING", 2)
+
+    async def burst():
+        jobs = [password_hashing.hash_password_async("pw") for _ in range(4)]
+        return await asyncio.gather(*jobs, return_exceptions=True)
+
+    results = asyncio.run(burst())
+    busy = [r for r in results if isinstance(r, password_hashing.HashingBusyError)]
+    assert len(busy) == 2
+    assert password_hashing.pool_stats()["pending"] == 0
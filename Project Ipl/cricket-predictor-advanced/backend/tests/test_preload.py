@@ -0,0 +1,34 @@
+import gc
+import os
+
+import pytest
+
+import preload
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/smaps_rollup"), reason="needs Linux smaps_rollup")
+def test_memory_usage_reads_smaps():
+    usage = preload.memory_usage()
+    assert usage["rss"] > 0 and 0 < usage["pss"] <= usage["rss"]
+    assert abs(usage["shared"] + usage["private"] - usage["rss"]) < 1
+    assert "pss" in preload.format_usage(usage)
+    assert preload.memory_usage(pid=2 ** 22 + 1) is None
+
+
+def test_fork_sharing_in_a_child():
+    if not hasattr(os, "fork"):
+        pytest.skip("needs fork")
+    before = gc.get_freeze_count()
+    preload.freeze()
+    try:
+        assert gc.get_freeze_count() > before
+        pid = os.fork()
+        if pid == 0:
+            gc.disable()
+            preload.after_fork()
+            os._exit(0 if gc.isenabled() else 1)
+        _, status = os.waitpid(pid, 0)
+        assert os.WEXITSTATUS(status) == 0
+    finally:
+        gc.unfreeze()
+        gc.enable()
@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+import profiling
+from metrics import registry
+from profiling import ProfilingMiddleware, span
+
+
+@span("test.busy")
+def busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+
+
+async def app(scope, receive, send):
+    await asyncio.get_running_loop().run_in_executor(None, busy, 0.05)
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+def request(middleware, headers=()):
+    sent = []
+
+    async def receive():
+        return {}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/pvp", "headers": list(headers)}
+    asyncio.run(middleware(scope, receive, send))
+    return dict(sent[0]["headers"])
+
+
+def test_header_profile_has_samples_spans_and_collapsed_stacks():
+    middleware = ProfilingMiddleware(app, sample_rate=0, header_enabled=True)
+    assert b"x-profile-id" not in request(middleware)
+    headers = request(middleware, [(b"x-profile", b"1")])
+    session = profiling.get_profile(int(headers[b"x-profile-id"]))
+    assert session.status == 200 and session.samples > 0
+    # run_in_executor does not copy the context, so the span lands in metrics only;
+    # FastAPI's threadpool does copy it (see the JSON detail of a /pvp profile)
+    assert registry.spans["test.busy"].count >= 1
+    line = session.collapsed().splitlines()[0]
+    stack, count = line.rsplit(" ", 1)
+    assert int(count) > 0 and "busy (test_profiling.py)" in session.collapsed()
+
+
+def test_sampling_rate_and_span_inside_session():
+    always = ProfilingMiddleware(app, sample_rate=1.0, paths=("/pvp",), header_enabled=False)
+    never = ProfilingMiddleware(app, sample_rate=1.0, paths=("/predict",), header_enabled=False)
+    assert b"x-profile-id" in request(always)
+    assert b"x-profile-id" not in request(never)
+
+    session = profiling.ProfileSession("GET", "/x")
+    token = profiling._current.set(session)
+    try:
+        busy(0.001)
+    finally:
+        profiling._current.reset(token)
+    assert session.spans[0][0] == "test.busy" and session.spans[0][2] >= 1
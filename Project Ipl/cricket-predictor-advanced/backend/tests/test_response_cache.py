@@ -0,0 +1,71 @@
+import os
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from response_cache import DatasetVersion, ResponseCacheMiddleware
+
+
+def make_client(data_dir):
+    calls = []
+    app = FastAPI()
+    version = DatasetVersion(str(data_dir), interval=0)
+    app.add_middleware(ResponseCacheMiddleware, paths=["/rows", "/item/"], version=version)
+
+    @app.get("/rows")
+    def rows(n: int = 200):
+        calls.append(n)
+        return {"rows": [{"i": i, "name": f"player {i}"} for i in range(n)]}
+
+    @app.get("/item/{name}")
+    def item(name: str):
+        calls.append(name)
+        return {"name": name}
+
+    @app.get("/live")
+    def live():
+        calls.append("live")
+        return {"ok": True}
+
+    return TestClient(app), calls
+
+
+def test_cached_bytes_etag_and_gzip(tmp_path):
+    (tmp_path / "matches.csv").write_text("a,b\n1,2\n")
+    client, calls = make_client(tmp_path)
+
+    first = client.get("/rows")
+    second = client.get("/rows", headers={"accept-encoding": "gzip"})
+    assert first.json() == second.json()
+    assert second.headers["content-encoding"] == "gzip"
+    assert calls == [200]
+    assert client.get("/rows?n=3").json()["rows"][-1]["i"] == 2  # query is part of the key
+    assert calls == [200, 3]
+
+    etag = first.headers["etag"]
+    revalidated = client.get("/rows", headers={"if-none-match": etag})
+    assert revalidated.status_code == 304 and revalidated.content == b""
+
+    client.get("/live")
+    client.get("/live")
+    assert calls.count("live") == 2  # paths outside the list are never cached
+
+
+def test_dataset_change_invalidates(tmp_path):
+    csv_path = tmp_path / "matches.csv"
+    csv_path.write_text("a,b\n1,2\n")
+    client, calls = make_client(tmp_path)
+    client.get("/item/csk")
+    client.get("/item/csk")
+    assert calls == ["csk"]
+
+    # user stores under data/ do not count as dataset changes
+    (tmp_path / "users.json").write_text("[]")
+    (tmp_path / "predictions_export.csv").write_text("user,match_id\n")  # /reports/predictions.csv
+    client.get("/item/csk")
+    assert calls == ["csk"]
+
+    csv_path.write_text("a,b\n1,2\n3,4\n")
+    os.utime(csv_path, ns=(1, 1))
+    client.get("/item/csk")
+    assert calls == ["csk", "csk"]
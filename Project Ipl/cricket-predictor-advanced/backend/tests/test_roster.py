@@ -0,0 +1,56 @@
+import json
+import os
+
+from roster import RosterIndex
+
+CSV = "﻿Player_Name,Batting_Hand,Bowling_Skill,Country\n" \
+      "MS Dhoni,Right_Hand,Right-arm medium,India\n" \
+      "Ravindra Jadeja,Left_Hand,Slow left-arm orthodox,India\n" \
+      "Rohit Sharma,Right_hand,Right-arm offbreak,India\n" \
+      "Unknown Player,Right_Hand,,India\n"
+TEAMS = {"MS Dhoni": "CSK", "Ravindra Jadeja": "CSK", "Rohit Sharma": "MI"}
+
+
+def make_index(tmp_path):
+    path = tmp_path / "players1.csv"
+    path.write_text(CSV, encoding="utf-8")
+    index = RosterIndex(str(path), TEAMS, ["CSK", "MI", "RCB"], check_interval=0)
+    index.load()
+    return index, path
+
+
+def test_team_payloads_and_filters(tmp_path):
+    index, _ = make_index(tmp_path)
+    everyone = json.loads(index.payload())
+    assert everyone["count"] == 4
+    assert everyone["players"][3] == {"Player_Name": "Unknown Player", "Batting_Hand": "Right_Hand",
+                                      "Bowling_Skill": None, "Country": "India", "Team": None}
+    assert [p["Player_Name"] for p in json.loads(index.payload("csk"))["players"]] == ["MS Dhoni", "Ravindra Jadeja"]
+    assert json.loads(index.payload("RCB"))["count"] == 0
+    assert json.loads(index.payload("XYZ")) == {"players": [], "count": 0}
+    right = json.loads(index.payload(hand="right"))
+    assert right["count"] == 3  # Right_Hand and Right_hand
+    both = json.loads(index.payload("CSK", "left", "slow left-arm orthodox"))
+    assert [p["Player_Name"] for p in both["players"]] == ["Ravindra Jadeja"]
+
+
+def test_reloads_when_csv_changes(tmp_path):
+    index, path = make_index(tmp_path)
+    assert index.payload("MI") is index.payload("MI")  # same pre-serialized bytes
+    path.write_text(CSV + "Jasprit Bumrah,Right_Hand,Right-arm fast,India\n", encoding="utf-8")
+    os.utime(path, ns=(1, 1))
+    index.player_to_team["Jasprit Bumrah"] = "MI"
+    assert json.loads(index.payload("MI"))["count"] == 2
+    assert index.loads == 2
+
+
+def test_malformed_csv_leaves_empty_index_until_fixed(tmp_path):
+    path = tmp_path / "players1.csv"
+    path.write_text("Name,Country\nMS Dhoni,India\n", encoding="utf-8")
+    index = RosterIndex(str(path), TEAMS, ["CSK"], check_interval=0)
+    index.load()
+    assert index.payload("CSK") is None
+    assert index.loads == 1  # not re-read while the file is unchanged
+    path.write_text(CSV, encoding="utf-8")
+    os.utime(path, ns=(1, 1))
+    assert json.loads(index.payload("CSK"))["count"] == 2
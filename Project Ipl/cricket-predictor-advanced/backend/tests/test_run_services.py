@@ -0,0 +1,184 @@
+import asyncio
+import socket
+import sys
+
+import pytest
+
+import run_services
+from run_services import ServiceSpec, Supervisor, listen_socket, probe, probe_pid
+
+# Stands in for a uvicorn worker: serves {"pid": ...} on the inherited socket,
+# with a 503 while a file named after its PID exists in the directory argument
+FAKE_WORKER = r"""
+import asyncio, os, socket, sys
+
+async def main():
+    async def handle(reader, writer):
+        await reader.readline()
+        sick = os.path.exists(os.path.join(sys.argv[2], str(os.getpid())))
+        status = b"503 Service Unavailable" if sick else b"200 OK"
+        body = b'{"pid": %d}' % os.getpid()
+        writer.write(b"HTTP/1.1 " + status + b"\r\nContent-Length: %d\r\n\r\n" % len(body))
+        await writer.drain()
+        await asyncio.sleep(0.01)  # body in a separate segment, as uvicorn may send it
+        writer.write(body)
+        await writer.drain()
+        writer.close()
+    server = await asyncio.start_server(handle, sock=socket.socket(fileno=int(sys.argv[1])))
+    print("Application startup complete", flush=True)
+    await server.serve_forever()
+
+asyncio.run(main())
+"""
+
+
+class FakeSupervisor(Supervisor):
+    def __init__(self, tmp_path, workers=2):
+        super().__init__([ServiceSpec("fake", "unused", free_port(), workers)], startup_timeout=10,
+                         graceful_timeout=2)
+        self.sick_dir = tmp_path
+        self.broken = False  # next workers exit before becoming ready
+        self.started = []
+        self._stopped = asyncio.Event()
+
+    def _command(self, spec):
+        if self.broken:
+            return [sys.executable, "-c", "import sys; sys.exit(3)"]
+        return [sys.executable, "-c", FAKE_WORKER, str(self.sockets[spec.name].fileno()), str(self.sick_dir)]
+
+    async def start_worker(self, spec, index):
+        worker = await super().start_worker(spec, index)
+        self.started.append(worker)
+        return worker
+
+    def pids(self):
+        return [w.proc.pid for w in self.workers["fake"]]
+
+    def running_outside_pool(self):
+        return [w for w in self.started if w.proc.returncode is None and w not in self.workers["fake"]]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def until(condition, timeout=10.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.05)
+
+
+async def serve_once(status: bytes):
+    async def handle(reader, writer):
+        await reader.readline()
+        writer.write(b"HTTP/1.1 " + status + b"\r\nContent-Length: 0\r\n\r\n")
+        await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+def test_probe_reports_health_status():
+    async def run():
+        ok, ok_port = await serve_once(b"200 OK")
+        bad, bad_port = await serve_once(b"503 Service Unavailable")
+        async with ok, bad:
+            assert await probe("127.0.0.1", ok_port, "/health")
+            assert not await probe("127.0.0.1", bad_port, "/health")
+        # nothing listening any more
+        assert not await probe("127.0.0.1", ok_port, "/health", timeout=0.5)
+
+    asyncio.run(run())
+
+
+def test_listen_socket_is_inheritable():
+    sock = listen_socket("127.0.0.1", 0)
+    try:
+        assert sock.get_inheritable()
+    finally:
+        sock.close()
+
+
+@pytest.mark.skipif(not run_services.FD_PASSING, reason="workers share the socket only with fd passing")
+def test_probe_pid_reads_the_answering_worker(tmp_path):
+    async def run():
+        supervisor = FakeSupervisor(tmp_path, workers=1)
+        try:
+            assert await supervisor.start()
+            assert await probe_pid("127.0.0.1", supervisor.specs[0].port, "/health") == supervisor.pids()[0]
+        finally:
+            await supervisor.shutdown()
+
+    asyncio.run(run())
+
+
+@pytest.mark.skipif(not run_services.FD_PASSING, reason="workers share the socket only with fd passing")
+def test_crashed_worker_is_restarted(tmp_path):
+    async def run():
+        supervisor = FakeSupervisor(tmp_path)
+        try:
+            assert await supervisor.start()
+            crashed = supervisor.workers["fake"][0]
+            crashed.proc.kill()
+            await until(lambda: crashed not in supervisor.workers["fake"])
+            replacement = supervisor.workers["fake"][0]
+            await until(replacement.ready.is_set)
+            assert await supervisor.probe_worker(replacement, 5)
+            assert supervisor.failures[crashed.label] == 1
+        finally:
+            await supervisor.shutdown()
+        assert all(w.proc.returncode is not None for w in supervisor.started)
+
+    asyncio.run(run())
+
+
+@pytest.mark.skipif(not run_services.FD_PASSING, reason="workers share the socket only with fd passing")
+def test_failed_roll_leaves_no_orphan_worker(tmp_path):
+    async def run():
+        supervisor = FakeSupervisor(tmp_path)
+        try:
+            assert await supervisor.start()
+            before = supervisor.pids()
+            supervisor.broken = True
+            await supervisor.rolling_restart()
+            assert supervisor.pids() == before  # old workers kept
+            # a restarted failed replacement would come up healthy once starts work again
+            await asyncio.sleep(1.0)
+            supervisor.broken = False
+            await asyncio.sleep(2.0)
+            assert supervisor.running_outside_pool() == []
+
+            await supervisor.rolling_restart()
+            assert set(supervisor.pids()).isdisjoint(before)
+            assert supervisor.running_outside_pool() == []
+        finally:
+            await supervisor.shutdown()
+        assert all(w.proc.returncode is not None for w in supervisor.started)
+
+    asyncio.run(run())
+
+
+@pytest.mark.skipif(not run_services.FD_PASSING, reason="workers share the socket only with fd passing")
+def test_unhealthy_worker_is_replaced(tmp_path, monkeypatch):
+    monkeypatch.setattr(run_services, "HEALTH_TIMEOUT", 0.5)
+    monkeypatch.setattr(run_services, "HEALTH_FAILURES", 2)
+
+    async def run():
+        supervisor = FakeSupervisor(tmp_path)
+        try:
+            assert await supervisor.start()
+            sick = supervisor.workers["fake"][1]
+            (tmp_path / str(sick.proc.pid)).touch()
+            await supervisor.check_health()
+            assert supervisor.unhealthy[sick.label] == 1 and sick in supervisor.workers["fake"]
+            await supervisor.check_health()
+            assert sick not in supervisor.workers["fake"] and sick.proc.returncode is not None
+            assert all([await supervisor.probe_worker(w, 5) for w in supervisor.workers["fake"]])
+        finally:
+            await supervisor.shutdown()
+
+    asyncio.run(run())
@@ -0,0 +1,76 @@
+import asyncio
+import io
+import json
+import os
+
+import pytest
+from starlette.datastructures import UploadFile
+
+from scorecard import UploadTooLarge, analyze_scorecard, store_upload
+
+HEADER = "match_id,inning,batting_team,over,ball,batsman,non_striker,bowler,wide_runs,noball_runs," \
+         "batsman_runs,extra_runs,total_runs,player_dismissed,dismissal_kind\n"
+# 1 over + 2 balls: a wide, a bowled, a run out of the non-striker
+BALLS = [
+    "1,1,CSK,1,1,A,B,X,0,0,4,0,4,,",
+    "1,1,CSK,1,2,A,B,X,1,0,0,1,1,,",
+    "1,1,CSK,1,2,A,B,X,0,0,0,0,0,A,bowled",
+    "1,1,CSK,1,3,C,B,X,0,0,1,0,1,,",
+    "1,1,CSK,1,4,B,C,X,0,0,6,0,6,,",
+    "1,1,CSK,1,5,B,C,X,0,0,0,0,0,,",
+    "1,1,CSK,1,6,B,C,X,0,0,1,0,1,C,run out",
+    "1,1,CSK,2,1,D,B,Y,0,0,2,0,2,,",
+    "1,1,CSK,2,2,D,B,Y,0,0,0,0,0,,",
+    "1,2,MI,1,1,P,Q,A,0,0,6,0,6,,",
+]
+
+
+def write(tmp_path, lines, name="deliveries.csv"):
+    path = tmp_path / name
+    path.write_text(HEADER + "\n".join(lines) + "\n")
+    return str(path)
+
+
+def test_innings_summary(tmp_path):
+    result = analyze_scorecard(write(tmp_path, BALLS))
+    first = result["innings"][0]
+    assert (first["batting_team"], first["runs"], first["wickets"], first["overs"], first["extras"]) == ("CSK", 15, 2, "1.2", 1)
+    assert [b["batter"] for b in first["batting"]] == ["A", "C", "B", "D"]
+    assert first["batting"][0] == {"batter": "A", "runs": 4, "balls": 2, "fours": 1, "sixes": 0,
+                                   "strike_rate": 200.0, "dismissal": "bowled"}
+    x = next(b for b in first["bowling"] if b["bowler"] == "X")
+    assert (x["overs"], x["runs"], x["wickets"]) == ("1.0", 13, 1)  # run out not credited
+    assert first["fall_of_wickets"] == [{"wicket": 1, "score": 5, "player_out": "A", "over": "0.2"},
+                                        {"wicket": 2, "score": 13, "player_out": "C", "over": "1.0"}]
+    assert [p["runs"] for p in first["partnerships"]] == [5, 8, 2]
+    assert first["partnerships"][-1]["unbroken"] is True
+    assert first["phases"]["powerplay"]["balls"] == 8 and first["phases"]["death"]["balls"] == 0
+    assert result["innings"][1]["runs"] == 6
+
+
+def test_chunked_parse_matches_single_pass(tmp_path):
+    path = write(tmp_path, BALLS)
+    assert json.dumps(analyze_scorecard(path, chunk_rows=3)) == json.dumps(analyze_scorecard(path))
+
+
+def test_legacy_aggregate_format(tmp_path):
+    path = tmp_path / "old.csv"
+    path.write_text("batsman,runs,bowler,wickets\nA,30,X,1\nB,50,Y,2\nA,10,X,0\n")
+    result = analyze_scorecard(str(path))
+    assert result["top_batsmen"] == {"B": 50, "A": 40}
+    assert result["top_bowlers"] == {"Y": 2, "X": 1}
+
+
+def test_store_upload_hashes_and_limits(tmp_path):
+    body = (HEADER + "\n".join(BALLS)).encode()
+    upload = UploadFile(file=io.BytesIO(body), filename="../../etc/evil.csv")
+    stored = asyncio.run(store_upload(upload, str(tmp_path)))
+    assert os.path.dirname(stored.path) == str(tmp_path)
+    assert os.path.basename(stored.path) == stored.sha256 + ".csv"
+    assert stored.size == len(body) and not stored.duplicate
+    again = asyncio.run(store_upload(UploadFile(file=io.BytesIO(body), filename="x.csv"), str(tmp_path)))
+    assert again.duplicate and again.path == stored.path
+
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(store_upload(UploadFile(file=io.BytesIO(body), filename="big.csv"), str(tmp_path), max_bytes=10))
+    assert sorted(os.listdir(tmp_path)) == [os.path.basename(stored.path)]
@@ -0,0 +1,71 @@
+import time
+
+from fastapi.testclient import TestClient
+
+import sessions
+from api import app
+
+client = TestClient(app)
+
+
+def test_token_roundtrip():
+    token = sessions.issue_token("alice")
+    assert sessions.verify_token(token) == "alice"
+    assert sessions.token_expiry(token) > time.time()
+
+
+def test_tampered_and_expired_tokens_are_rejected():
+    token = sessions.issue_token("alice")
+    payload, _, signature = token.partition(".")
+    forged = sessions._b64encode(b"mallory:9999999999") + "." + signature
+    assert sessions.verify_token(forged) is None
+    assert sessions.verify_token(payload + ".") is None
+    assert sessions.verify_token("not-a-token") is None
+    assert sessions.verify_token("ünïcode.sig") is None
+    assert sessions.verify_token(sessions.issue_token("bob", ttl=-1)) is None
+
+
+def test_spin_requires_matching_token():
+    assert client.post("/users/alice/spin").status_code == 401
+    headers = {"Authorization": f"Bearer {sessions.issue_token('bob')}"}
+    assert client.post("/users/alice/spin", headers=headers).status_code == 403
+
+
+def test_charging_prediction_requires_token():
+    payload = {"team1": "CSK", "team2": "MI", "venue": "Wankhede Stadium, Mumbai", "weather": "sunny",
+               "runsTeam1": 180, "runsTeam2": 170, "wicketsTeam1": 4, "wicketsTeam2": 6, "username": "alice"}
+    assert client.post("/predict/match", json=payload).status_code == 401
+    payload["username"] = None
+    resp = client.post("/predict/match", json=payload)
+    assert resp.status_code == 200
+    assert resp.json()["note"] == "Demo prediction (not charged)"
+
+
+def test_session_endpoint():
+    headers = {"Authorization": f"Bearer {sessions.issue_token('carol')}"}
+    data = client.get("/session", headers=headers).json()
+    assert data["ok"] is True and data["username"] == "carol"
+
+
+def test_admin_endpoints_require_admin_token(monkeypatch):
+    assert client.get("/_admin/users/export.csv").status_code == 403
+    assert client.post("/_admin/tokens/grant", json={"tokens": 5}).status_code == 403
+    assert client.post("/_admin/ensure_default_tokens").status_code == 403
+    monkeypatch.setattr(sessions, "ADMIN_TOKEN", "s3cret")
+    assert client.get("/_admin/users/export.csv", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    resp = client.get("/_admin/users/export.csv", headers={"X-Admin-Token": "s3cret"})
+    assert resp.status_code == 200
+    assert resp.text.startswith("username")
+
+
+def test_profile_endpoints_require_admin_token(monkeypatch):
+    assert client.get("/_admin/profiles").status_code == 403
+    assert client.get("/_admin/profiles/1").status_code == 403
+    monkeypatch.setattr(sessions, "ADMIN_TOKEN", "s3cret")
+    assert client.get("/_admin/profiles", headers={"X-Admin-Token": "s3cret"}).json()["ok"] is True
+
+
+def test_cache_stats_requires_admin_token(monkeypatch):
+    assert client.get("/_admin/cache_stats").status_code == 403
+    monkeypatch.setattr(sessions, "ADMIN_TOKEN", "s3cret")
+    assert client.get("/_admin/cache_stats", headers={"X-Admin-Token": "s3cret"}).json()["ok"] is True
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+import fantasy
+import pvp_utils
+import shared_datasets
+from shared_datasets import DatasetPublisher, SharedDatasets
+
+
+def make_frame():
+    return pd.DataFrame({
+        "match_id": [1, 1, 2],
+        "batsman": ["V Kohli", "V Kohli", None],
+        "batsman_runs": [4, 0, 6],
+        "extra": pd.array([1, None, 0], dtype="Int64"),
+        "is_wicket": [False, True, False],
+    })
+
+
+def backed_by_memmap(values):
+    while values is not None and not isinstance(values, np.memmap):
+        values = values.base
+    return values is not None
+
+
+def test_frames_round_trip_memory_mapped(tmp_path):
+    publisher = DatasetPublisher(str(tmp_path), keep=1)
+    projections = pd.DataFrame({"name": ["A", "B"], "credits": [9.5, 8.0]}, index=pd.Index(["a", "b"], name="key"))
+    version = publisher.publish({"deliveries": make_frame(), "projections": projections, "catalog": {"A": {"role": "Batsman"}}})
+
+    shared = SharedDatasets(str(tmp_path), check_interval=0)
+    df = shared.get("deliveries")
+    assert shared.version() == version
+    assert backed_by_memmap(df["batsman_runs"].to_numpy())
+    assert backed_by_memmap(df["batsman"].array.codes)  # text stays as mapped codes
+    assert df["batsman"].astype(object).fillna("unknown").tolist() == ["V Kohli", "V Kohli", "unknown"]
+    assert (df["batsman"] == "V Kohli").tolist() == [True, True, False]
+    assert df["extra"].isna().tolist() == [False, True, False]
+    assert df["is_wicket"].tolist() == [False, True, False]
+    attached = shared.get("projections")
+    assert isinstance(attached["name"].dtype, pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(attached.astype({"name": object}), projections.astype({"name": object}))
+    assert shared.get("catalog") == {"A": {"role": "Batsman"}}
+
+
+def test_readers_hot_swap_and_old_versions_are_pruned(tmp_path):
+    publisher = DatasetPublisher(str(tmp_path), keep=1)
+    shared = SharedDatasets(str(tmp_path), check_interval=0)
+    publisher.publish({"deliveries": make_frame()})
+    old = shared.get("deliveries")
+    publisher.publish({"deliveries": make_frame().head(1)})
+    publisher.publish({"deliveries": make_frame().head(2)})
+    assert publisher.versions() == [2, 3]
+    assert len(shared.get("deliveries")) == 2 and shared.swaps == 2
+    assert len(old) == 3  # a frame held across the swap stays usable
+
+
+def test_pvp_and_fantasy_read_published_data(tmp_path, monkeypatch):
+    DatasetPublisher(str(tmp_path)).publish({
+        "deliveries": make_frame(),
+        "catalog": {"Only Player": {"role": "Bowler"}},
+        "projections": fantasy.build_projections().head(30),
+    })
+    monkeypatch.setenv("SHARED_DATASETS", "1")
+    monkeypatch.setattr(shared_datasets, "shared", SharedDatasets(str(tmp_path), check_interval=0))
+    assert len(pvp_utils.load_ball_data()) == 3
+    assert pvp_utils.build_player_catalog() == {"Only Player": {"role": "Bowler"}}
+    assert len(fantasy.FantasyOptimizer().projections()) == 30
+
+
+def test_cached_pvp_follows_the_published_version(tmp_path, monkeypatch):
+    publisher = DatasetPublisher(str(tmp_path))
+    publisher.publish({"deliveries": make_frame().assign(bowler="JJ Bumrah")})
+    monkeypatch.setenv("SHARED_DATASETS", "1")
+    monkeypatch.setattr(shared_datasets, "shared", SharedDatasets(str(tmp_path), check_interval=0))
+    monkeypatch.setattr(pvp_utils, "_pvp_cache", {})
+    assert pvp_utils.cached_pvp("V Kohli", "JJ Bumrah")["runs"] == 4
+
+    # an ingest invalidates the pair before the loader has republished
+    pvp_utils.invalidate_pairs([("V Kohli", "JJ Bumrah")])
+    assert pvp_utils.cached_pvp("V Kohli", "JJ Bumrah")["runs"] == 4
+    extra = pd.DataFrame({"match_id": [3], "batsman": ["V Kohli"], "batsman_runs": [6],
+                          "extra": pd.array([0], dtype="Int64"), "is_wicket": [False]})
+    publisher.publish({"deliveries": pd.concat([make_frame(), extra], ignore_index=True).assign(bowler="JJ Bumrah")})
+    assert pvp_utils.cached_pvp("V Kohli", "JJ Bumrah")["runs"] == 10
@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import spin_store
+from unified_db import Base, User, create_user
+from user_cache import user_cache
+
+
+@pytest.fixture
+def Session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'spins.db'}", connect_args={"timeout": 30})
+    Base.metadata.create_all(bind=engine)
+    spin_store.spin_cache.clear()
+    user_cache.clear()
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    create_user(db, "spinner", "Spinner", None, password_hash="x", salt="x")
+    db.close()
+    return Session
+
+
+def test_daily_quota_and_status(Session):
+    db = Session()
+    assert spin_store.get_spin_status(db, "spinner")["spins_left"] == spin_store.MAX_SPINS_PER_DAY
+    first = spin_store.spin(db, "spinner", reward=15)
+    assert first["ok"] and first["tokens_remaining"] == 115
+    for _ in range(spin_store.MAX_SPINS_PER_DAY - 1):
+        assert spin_store.spin(db, "spinner")["ok"]
+    assert spin_store.spin(db, "spinner") == {"ok": False, "error": "No spins left today", "spins_left": 0}
+    status = spin_store.get_spin_status(db, "spinner")
+    assert status["spins_left"] == 0
+    assert spin_store.spin(db, "ghost")["error"] == "user not found"
+    assert spin_store.get_spin_status(db, "ghost")["error"] == "user not found"
+
+
+def test_concurrent_burst_never_double_grants(Session):
+    results = []
+    barrier = threading.Barrier(8)
+
+    def worker():
+        db = Session()
+        barrier.wait()
+        # Simulate other worker processes: no shared cache between attempts
+        spin_store.spin_cache.clear()
+        results.append(spin_store.spin(db, "spinner", reward=50))
+        db.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    granted = [r for r in results if r["ok"]]
+    assert len(granted) == spin_store.MAX_SPINS_PER_DAY
+    db = Session()
+    user = db.query(User).filter(User.username == "spinner").one()
+    assert user.tokens == 100 + 50 * spin_store.MAX_SPINS_PER_DAY
+    assert db.query(spin_store.SpinHistory).count() == spin_store.MAX_SPINS_PER_DAY
@@ -0,0 +1,28 @@
+from sqlalchemy import text
+
+import storage_config
+
+
+def test_tuned_sqlite_engine_applies_pragmas(tmp_path):
+    engine = storage_config.create_storage_engine(f"sqlite:///{tmp_path / 'users.db'}")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == storage_config.SQLITE_BUSY_TIMEOUT_MS
+    engine.dispose()
+
+
+def test_database_url_resolution(monkeypatch):
+    monkeypatch.delenv("USERS_DATABASE_URL", raising=False)
+    monkeypatch.setenv("DATABASE_URL", "sqlite:///cricket_local.db")
+    assert storage_config.resolve_database_url().endswith("cricket_users.db")
+    monkeypatch.setenv("DATABASE_URL", "postgres://u:p@db/cricket")
+    assert storage_config.resolve_database_url() == "postgresql://u:p@db/cricket"
+
+
+def test_in_memory_engines_get_no_pool_sizing():
+    for url in ("sqlite://", "sqlite:///:memory:", "sqlite+aiosqlite://"):
+        assert "pool_size" not in storage_config._engine_options(url, tuned=True)
+    assert storage_config._engine_options("sqlite:///users.db", tuned=True)["pool_size"] == storage_config.DB_POOL_SIZE
+    engine = storage_config.create_async_storage_engine("sqlite://")
+    assert engine.url.drivername == "sqlite+aiosqlite"
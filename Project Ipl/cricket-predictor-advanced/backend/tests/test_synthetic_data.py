@@ -0,0 +1,63 @@
+import pandas as pd
+
+import pvp_utils
+import synthetic_data
+from synthetic_data import Generator, generate_frame
+
+
+def test_innings_follow_the_laws():
+    df = generate_frame(20000, seed=1)
+    assert list(df.columns) == synthetic_data.COLUMNS
+    assert df["over"].between(1, 20).all()
+    innings = df.groupby(["match_id", "inning"])
+    legal = df[(df["wide"] == 0) & (df["noball"] == 0)].groupby(["match_id", "inning"]).size()
+    assert legal.max() <= 120
+    assert innings["is_wicket"].sum().max() <= 10
+    # one bowler per over, nobody bowls consecutive overs or more than four
+    per_over = df.groupby(["match_id", "inning", "over"])["bowler"].agg(["nunique", "first"])
+    assert (per_over["nunique"] == 1).all()
+    assert per_over.groupby(["match_id", "inning"])["first"].agg(lambda b: b.value_counts().max()).max() <= 4
+    # the chase never continues past the target
+    totals = innings["total_runs"].sum().unstack()
+    before_last = totals[2] - df[df["inning"] == 2].groupby("match_id")["total_runs"].last()
+    assert (before_last <= totals[1]).all()
+    assert df.loc[df["is_wicket"] == 1, "player_dismissed"].notna().all()
+    assert df.loc[df["wide"] == 1, "batsman_runs"].eq(0).all()
+
+
+def test_same_seed_same_data():
+    a = generate_frame(5000, seed=9)
+    b = generate_frame(5000, seed=9)
+    pd.testing.assert_frame_equal(a, b)
+    assert not a.equals(generate_frame(5000, seed=10))
+
+
+def test_streams_chunks_to_csv(tmp_path):
+    path = str(tmp_path / "ball_by_ball.csv")
+    gen = Generator(seasons=2, matches_per_season=5, chunk_matches=3, seed=4)
+    rows = synthetic_data.write(gen, path)
+    df = pd.read_csv(path)
+    assert len(df) == rows
+    assert df["match_id"].nunique() == 10
+    assert sorted(df["season"].unique()) == [2008, 2009]
+
+
+def test_pvp_utils_reads_generated_file(tmp_path, monkeypatch):
+    synthetic_data.write(Generator(seasons=1, matches_per_season=30, seed=5), str(tmp_path / "ball_by_ball.csv"))
+    monkeypatch.setattr(pvp_utils, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(pvp_utils, "_ball_cache", {"csv": None, "signature": None, "store_version": 0, "df": None})
+    df = pvp_utils.load_ball_data()
+    batsman, bowler = df[["batsman", "bowler"]].value_counts().idxmax()
+    result = pvp_utils.compute_pvp(batsman, bowler)
+    assert result["balls_faced"] > 0
+    assert result["runs"] == int(df[(df["batsman"] == batsman) & (df["bowler"] == bowler)]["batsman_runs"].sum())
+
+
+def test_default_output_stays_out_of_data_dir(tmp_path, monkeypatch):
+    assert "data" not in synthetic_data.DEFAULT_OUT.replace("\\", "/").split("/")[-2:]
+    path = str(tmp_path / "bench" / "balls.csv")
+    synthetic_data.write(Generator(seasons=1, matches_per_season=2, seed=3), path)
+    monkeypatch.setattr(pvp_utils, "DATA_DIR", str(tmp_path / "empty"))
+    assert pvp_utils._find_ball_csv() is None
+    monkeypatch.setattr(pvp_utils, "BALL_DATA_PATH", path)
+    assert pvp_utils._find_ball_csv() == path
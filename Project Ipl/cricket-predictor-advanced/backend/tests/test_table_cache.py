@@ -0,0 +1,48 @@
+import json
+
+from sqlalchemy import create_engine
+
+from bulk_loader import BulkLoader
+from table_cache import TableCache
+
+
+def write_matches(data, rows):
+    (data / "matches.csv").write_text("id,season,winner\n" + "".join(f"{i},2008,T{i}\n" for i in range(1, rows + 1)))
+
+
+def test_csv_table_cached_paged_and_reloaded(tmp_path):
+    write_matches(tmp_path, 5)
+    cache = TableCache(None, str(tmp_path), check_interval=0)
+    entry = cache.get("matches")
+    assert json.loads(entry.body)[0] == {"id": 1, "season": 2008, "winner": "T1"}
+    assert cache.get("matches") is entry  # unchanged file: same object, no re-parse
+
+    page = json.loads(cache.page("matches", after=0, limit=2))
+    assert [r["id"] for r in page["rows"]] == [1, 2] and page["next"] == 2 and page["count"] == 5
+    last = json.loads(cache.page("matches", after=4, limit=2))
+    assert [r["id"] for r in last["rows"]] == [5] and last["next"] is None
+
+    write_matches(tmp_path, 7)
+    assert len(cache.get("matches").df) == 7
+
+
+def test_database_table_loaded_in_keyset_batches(tmp_path):
+    write_matches(tmp_path, 12)
+    engine = create_engine(f"sqlite:///{tmp_path / 'data.db'}")
+    BulkLoader(engine, str(tmp_path), workers=1).load()
+    cache = TableCache(engine, str(tmp_path), check_interval=0, batch=5)
+    entry = cache.get("matches")
+    assert entry.source == "db"
+    assert list(entry.df.columns) == ["id", "season", "winner"]
+    assert entry.df["id"].tolist() == list(range(1, 13))
+
+
+def test_missing_table_reports_both_sources(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'empty.db'}")
+    cache = TableCache(engine, str(tmp_path))
+    try:
+        cache.get("news")
+    except RuntimeError as e:
+        assert "DB error" in str(e) and "CSV fallback error" in str(e)
+    else:
+        raise AssertionError("expected a RuntimeError")
@@ -2,21 +2,33 @@
 Unified User Database System
 Consolidates all user data into a single SQLite database
 Replaces both auth_db.py and users.json
+
+Bulk helpers (import, filtered token grants, streaming export) work in
+batches of set-based statements instead of one ORM round trip per user.
 """
 
-from sqlalchemy import create_engine, Column, String, Integer, DateTime, Boolean
+from sqlalchemy import Column, String, Integer, DateTime, Boolean, update, select, func, or_
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import Iterable, Iterator, Optional
+import csv
+import io
+import json
 import os
+import secrets
 import uuid
-import hashlib
 
-# Database setup
-DB_PATH = os.path.join(os.path.dirname(__file__), "data", "cricket_users.db")
-DATABASE_URL = f"sqlite:///{DB_PATH}"
+import password_hashing
+from user_cache import user_cache
+from storage_config import DEFAULT_SQLITE_PATH, resolve_database_url, create_storage_engine
+
+# Database setup (tuned SQLite by default, pooled PostgreSQL via DATABASE_URL)
+DB_PATH = DEFAULT_SQLITE_PATH
+DATABASE_URL = resolve_database_url()
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+engine = create_storage_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -75,32 +87,36 @@ def get_db():
 
 
 def hash_password(password: str, salt: str = None) -> tuple:
-    """Hash password with salt"""
-    if not salt:
-        salt = str(uuid.uuid4())[:16]
-    password_hash = hashlib.sha256((password + salt).encode()).hexdigest()
-    return password_hash, salt
+    """Hash password with salt. Returns (encoded_hash, salt)."""
+    return password_hashing.hash_password(password, salt)
 
 
 def verify_password(password: str, password_hash: str, salt: str) -> bool:
-    """Verify password"""
-    computed_hash, _ = hash_password(password, salt)
-    return computed_hash == password_hash
+    """Verify password (accepts legacy SHA-256 hashes)"""
+    return password_hashing.verify_password(password, password_hash, salt)
 
 
-def create_user(db: Session, username: str, display_name: str, password: str, email: str = None, referral_code: str = None) -> User:
-    """Create a new user"""
-    # Check if user exists
-    existing = db.query(User).filter(User.username == username).first()
-    if existing:
-        raise ValueError("Username already exists")
-    
+def create_user(db: Session, username: str, display_name: str, password: str, email: str = None, referral_code: str = None,
+                password_hash: str = None, salt: str = None) -> User:
+    """Create a new user.
+
+    Async callers hash on the password pool first and pass `password_hash`/`salt`
+    so no KDF work happens on the database thread.
+    """
+    # One existence query covers both username and email
+    conditions = [User.username == username]
     if email:
-        existing_email = db.query(User).filter(User.email == email).first()
-        if existing_email:
+        conditions.append(User.email == email)
+    for existing_username, existing_email in db.execute(
+        select(User.username, User.email).where(or_(*conditions)).limit(2)
+    ):
+        if existing_username == username:
+            raise ValueError("Username already exists")
+        if email and existing_email == email:
             raise ValueError("Email already registered")
     
-    password_hash, salt = hash_password(password)
+    if password_hash is None:
+        password_hash, salt = hash_password(password)
     
     user = User(
         username=username,
@@ -115,6 +131,7 @@ def create_user(db: Session, username: str, display_name: str, password: str, em
     db.add(user)
     db.commit()
     db.refresh(user)
+    user_cache.put_user(user)
     return user
 
 
@@ -123,6 +140,17 @@ def get_user_by_username(db: Session, username: str) -> User:
     return db.query(User).filter(User.username == username).first()
 
 
+def get_user_record(db: Session, username: str) -> Optional[dict]:
+    """User as a dict (no password fields), served from the user cache when warm"""
+    record = user_cache.get(username)
+    if record is None:
+        user = get_user_by_username(db, username)
+        if not user:
+            return None
+        record = user_cache.put_user(user)
+    return record
+
+
 def authenticate_user(db: Session, username: str, password: str) -> User:
     """Authenticate user"""
     user = get_user_by_username(db, username)
@@ -135,41 +163,290 @@ def authenticate_user(db: Session, username: str, password: str) -> User:
     if not user.is_active:
         return None
     
-    # Update last login
+    # Transparently upgrade legacy / outdated hashes
+    new_hash, new_salt = None, None
+    if password_hashing.needs_rehash(user.password_hash):
+        new_hash, new_salt = hash_password(password)
+    
+    return record_login(db, user, new_hash, new_salt)
+
+
+def record_login(db: Session, user: User, password_hash: str = None, salt: str = None) -> User:
+    """Update last login, optionally replacing the stored password hash"""
     user.last_login = datetime.utcnow()
+    if password_hash:
+        user.password_hash = password_hash
+        user.salt = salt
     db.commit()
     db.refresh(user)
+    user_cache.put_user(user)
     
     return user
 
 
+def charge_tokens(db: Session, username: str, tokens: int = 10) -> Optional[int]:
+    """Atomically deduct tokens; returns the new balance, or None when the
+    user does not exist or cannot afford it. Concurrent charges can never
+    take the balance below zero."""
+    remaining = db.execute(
+        update(User)
+        .where(User.username == username, User.tokens >= tokens)
+        .values(tokens=User.tokens - tokens)
+        .returning(User.tokens)
+    ).scalar_one_or_none()
+    db.commit()
+    if remaining is not None:
+        user_cache.set_tokens(username, remaining)
+    return remaining
+
+
 def deduct_tokens(db: Session, username: str, tokens: int = 10) -> bool:
     """Deduct tokens from user for predictions"""
-    user = get_user_by_username(db, username)
-    if not user:
-        return False
-    
-    if user.tokens < tokens:
-        return False
-    
-    user.tokens -= tokens
-    db.commit()
-    db.refresh(user)
-    return True
+    return charge_tokens(db, username, tokens) is not None
 
 
 def add_tokens(db: Session, username: str, tokens: int) -> bool:
     """Add tokens to user"""
-    user = get_user_by_username(db, username)
-    if not user:
-        return False
-    
-    user.tokens += tokens
+    balance = db.execute(
+        update(User)
+        .where(User.username == username)
+        .values(tokens=User.tokens + tokens)
+        .returning(User.tokens)
+    ).scalar_one_or_none()
     db.commit()
-    db.refresh(user)
-    return True
+    user_cache.set_tokens(username, balance)
+    return balance is not None
 
 
 def get_all_users(db: Session) -> list:
     """Get all users (for admin/debugging)"""
     return db.query(User).all()
+
+
+# ==================== BULK OPERATIONS ====================
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "5000"))
+EXPORT_FIELDS = ["username", "display_name", "email", "tokens", "referral_code",
+                 "referred_by", "is_active", "created_at", "last_login"]
+
+
+def read_user_records(fh, fmt: str = "csv") -> Iterator[dict]:
+    """Yield user dicts from a CSV (header row), JSON array or JSON-lines text stream"""
+    if fmt == "csv":
+        yield from csv.DictReader(fh)
+    elif fmt == "json":
+        yield from json.load(fh)
+    elif fmt == "jsonl":
+        for line in fh:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        raise ValueError(f"unsupported format: {fmt}")
+
+
+def _parse_datetime(value):
+    if not value or isinstance(value, datetime):
+        return value or None
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", ""))
+    except ValueError:
+        return None
+
+
+def _new_referral_code() -> str:
+    return secrets.token_hex(4).upper()
+
+
+def _imported_hash(rec: dict) -> str:
+    """Stored hash for an imported record; bare hashes come from the JSON user store"""
+    password_hash = rec.get("password_hash")
+    if not password_hash:
+        return password_hashing.UNUSABLE_PASSWORD
+    if "$" not in password_hash:
+        return password_hashing.tag_legacy_json(password_hash, rec.get("salt") or "")
+    return password_hash
+
+
+def _prepare_rows(records: list, default_tokens: int, hasher: ThreadPoolExecutor) -> list:
+    """Normalise raw records into users-table rows.
+
+    Rows may carry an existing password_hash (+ salt), e.g. legacy users.json
+    entries, whose bare sha256(salt + password) hashes are stored as
+    legacy_json; a plaintext `password`, hashed here in parallel at the
+    import cost and rehashed at full cost on first login; or neither, in
+    which case the account gets an unusable password.
+    """
+    rows, seen, to_hash = [], set(), []
+    now = datetime.utcnow()
+    for rec in records:
+        username = (rec.get("username") or "").strip()
+        if not username or username in seen:
+            continue
+        seen.add(username)
+        tokens = rec.get("tokens")
+        row = {
+            "id": str(uuid.uuid4()),
+            "username": username,
+            "display_name": (rec.get("display_name") or username).strip(),
+            "email": (rec.get("email") or "").strip() or f"{username}@cricket.local",
+            "password_hash": _imported_hash(rec),
+            "salt": rec.get("salt") or "",
+            "tokens": int(tokens) if tokens not in (None, "") else default_tokens,
+            "referral_code": (rec.get("referral_code") or "").strip() or _new_referral_code(),
+            "referred_by": rec.get("referred_by") or None,
+            "is_active": True,
+            "created_at": _parse_datetime(rec.get("created_at") or rec.get("created")) or now,
+            "last_login": None,
+        }
+        if not rec.get("password_hash") and rec.get("password"):
+            to_hash.append((row, rec["password"]))
+        rows.append(row)
+    if to_hash:
+        hashed = hasher.map(lambda item: password_hashing.hash_imported_password(item[1]), to_hash)
+        for (row, _), (password_hash, salt) in zip(to_hash, hashed):
+            row["password_hash"], row["salt"] = password_hash, salt
+    return rows
+
+
+def _dedupe_referral_codes(db: Session, rows: list):
+    """Regenerate referral codes that collide within the batch or with existing users"""
+    codes = [row["referral_code"] for row in rows]
+    taken = set(db.execute(select(User.referral_code).where(User.referral_code.in_(codes))).scalars())
+    for row in rows:
+        while row["referral_code"] in taken:
+            row["referral_code"] = _new_referral_code()
+        taken.add(row["referral_code"])
+
+
+def _insert_rows_sqlite(db: Session, rows: list):
+    from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+    db.execute(sqlite_insert(User).on_conflict_do_nothing(), rows)
+
+
+def _insert_rows_postgres(db: Session, rows: list):
+    """COPY into a temp table, then one INSERT ... ON CONFLICT DO NOTHING"""
+    columns = list(rows[0].keys())
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow(["\\N" if row[c] is None else row[c] for c in columns])
+    buf.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS users_import (LIKE users INCLUDING DEFAULTS) ON COMMIT DROP")
+        cursor.copy_expert(
+            f"COPY users_import ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buf
+        )
+        cursor.execute(
+            f"INSERT INTO users ({', '.join(columns)}) SELECT {', '.join(columns)} FROM users_import "
+            "ON CONFLICT DO NOTHING"
+        )
+        cursor.execute("TRUNCATE users_import")
+    finally:
+        cursor.close()
+
+
+def bulk_import_users(db: Session, records: Iterable[dict], default_tokens: int = 100,
+                      batch_size: int = BULK_BATCH_SIZE) -> dict:
+    """Insert users in batches (executemany on SQLite, COPY on PostgreSQL).
+
+    Existing usernames/emails are skipped, not updated. One commit per batch.
+    """
+    insert_rows = _insert_rows_postgres if db.get_bind().dialect.name == "postgresql" else _insert_rows_sqlite
+    received = inserted = 0
+    before = db.execute(select(func.count(User.id))).scalar_one()
+    with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as hasher:
+        batch = []
+        for rec in records:
+            batch.append(rec)
+            if len(batch) >= batch_size:
+                received += len(batch)
+                rows = _prepare_rows(batch, default_tokens, hasher)
+                if rows:
+                    _dedupe_referral_codes(db, rows)
+                    insert_rows(db, rows)
+                    db.commit()
+                batch = []
+        if batch:
+            received += len(batch)
+            rows = _prepare_rows(batch, default_tokens, hasher)
+            if rows:
+                _dedupe_referral_codes(db, rows)
+                insert_rows(db, rows)
+                db.commit()
+    inserted = db.execute(select(func.count(User.id))).scalar_one() - before
+    print(f"[DB] Bulk import: {inserted} of {received} users inserted")
+    return {"received": received, "inserted": inserted, "skipped": received - inserted}
+
+
+def grant_tokens_bulk(db: Session, tokens: int, usernames: list = None, referred_by: str = None,
+                      created_after: datetime = None, created_before: datetime = None,
+                      max_balance: int = None, only_missing: bool = False, active_only: bool = True) -> int:
+    """Grant `tokens` to every user matching the filters in one UPDATE.
+
+    With only_missing=True, users whose tokens are NULL are set to `tokens`
+    (existing balances are left alone). Returns the number of users updated.
+    """
+    stmt = update(User)
+    if usernames is not None:
+        stmt = stmt.where(User.username.in_(usernames))
+    if referred_by is not None:
+        stmt = stmt.where(User.referred_by == referred_by)
+    if created_after is not None:
+        stmt = stmt.where(User.created_at >= created_after)
+    if created_before is not None:
+        stmt = stmt.where(User.created_at < created_before)
+    if max_balance is not None:
+        stmt = stmt.where(User.tokens <= max_balance)
+    if active_only:
+        stmt = stmt.where(User.is_active.is_(True))
+    if only_missing:
+        stmt = stmt.where(User.tokens.is_(None)).values(tokens=tokens)
+    else:
+        stmt = stmt.values(tokens=User.tokens + tokens)
+    updated = db.execute(stmt.execution_options(synchronize_session=False)).rowcount
+    db.commit()
+    # Balances changed outside the write-through path
+    if usernames is not None and len(usernames) < 1000:
+        for username in usernames:
+            user_cache.invalidate(username)
+    elif updated:
+        user_cache.clear()
+    return updated
+
+
+def ensure_default_tokens(db: Session, default: int = 100) -> list:
+    """Set tokens=default for users without a balance; returns their usernames"""
+    updated = db.execute(
+        update(User).where(User.tokens.is_(None)).values(tokens=default).returning(User.username)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    db.commit()
+    for username in updated:
+        user_cache.invalidate(username)
+    return updated
+
+
+def export_users(db: Session, batch_size: int = 1000) -> Iterator[dict]:
+    """Stream users (no password fields) with a server-side cursor"""
+    columns = [getattr(User, name) for name in EXPORT_FIELDS]
+    result = db.execute(
+        select(*columns).order_by(User.username).execution_options(stream_results=True, yield_per=batch_size)
+    )
+    for row in result:
+        yield dict(row._mapping)
+
+
+def export_users_csv(db: Session, batch_size: int = 1000) -> Iterator[str]:
+    """export_users as CSV text chunks (header first), for streaming responses"""
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    count = 0
+    for row in export_users(db, batch_size):
+        writer.writerow(row)
+        count += 1
+        if count % batch_size == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
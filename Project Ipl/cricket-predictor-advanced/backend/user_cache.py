@@ -0,0 +1,100 @@
+"""
+User Record Cache
+Write-through, in-process LRU of user records keyed by username.
+
+Entries are plain dicts (User.to_dict() plus is_active), never ORM objects,
+so they are safe to share between requests and threads. Every token mutation
+in unified_db / async_db / spin_store writes the balance returned by its
+UPDATE ... RETURNING straight into the cache, so this process never serves a
+balance older than its own last write. Changes made by other worker
+processes become visible after at most USER_CACHE_TTL seconds.
+
+Password hashes are not cached; login always reads the database.
+"""
+
+from collections import OrderedDict
+from typing import Optional
+import os
+import threading
+import time
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "50000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "10"))
+
+
+class UserCache:
+    """LRU of username -> (record, cached at) with hit/miss counters"""
+
+    def __init__(self, maxsize: int = USER_CACHE_SIZE, ttl: float = USER_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, username: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._data.get(username)
+            if entry is None or time.monotonic() - entry[1] > self.ttl:
+                self.misses += 1
+                return None
+            self._data.move_to_end(username)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, record: dict):
+        """Cache a user record (from User.to_dict(), with is_active)"""
+        with self._lock:
+            username = record["username"]
+            self._data[username] = (record, time.monotonic())
+            self._data.move_to_end(username)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def put_user(self, user):
+        """Cache an ORM User; returns the cached record"""
+        record = user.to_dict()
+        record["is_active"] = bool(user.is_active)
+        self.put(record)
+        return record
+
+    def set_tokens(self, username: str, tokens: Optional[int]):
+        """Write-through for a token mutation; None (user gone) drops the entry"""
+        with self._lock:
+            entry = self._data.get(username)
+            if entry is None:
+                return
+            if tokens is None:
+                del self._data[username]
+                self.invalidations += 1
+                return
+            record = dict(entry[0])
+            record["tokens"] = tokens
+            self._data[username] = (record, time.monotonic())
+
+    def invalidate(self, username: str):
+        with self._lock:
+            if self._data.pop(username, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+user_cache = UserCache()
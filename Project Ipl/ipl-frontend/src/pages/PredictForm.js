@@ -45,7 +45,7 @@ import HistoryIcon from "@mui/icons-material/History";
 import StarsIcon from "@mui/icons-material/Stars";
 import RefreshIcon from "@mui/icons-material/Refresh";
 import axios from "axios";
-import { AuthContext } from "../context/AuthContext";
+import { AuthContext, authHeaders } from "../context/AuthContext";
 import { motion } from "framer-motion";
 import API_BASE from "../config";
 
@@ -457,7 +457,7 @@ export default function PredictForm() {
       };
 
       console.log("Sending prediction request:", payload);
-      const response = await axios.post(`${API_BASE}/predict/match`, payload);
+      const response = await axios.post(`${API_BASE}/predict/match`, payload, { headers: authHeaders() });
       console.log("Prediction response received:", response.data);
       
       // backend returns either prediction object or an error structure
@@ -483,7 +483,11 @@ export default function PredictForm() {
         data: err.response?.data,
         message: err.message
       });
-      setError(err.response?.data?.error || "Error predicting match. Make sure backend is running on the configured API URL");
+      if (err.response?.status === 401) {
+        setError("Your session has expired. Please log in again.");
+      } else {
+        setError(err.response?.data?.error || "Error predicting match. Make sure backend is running on the configured API URL");
+      }
       setMatchPrediction(null);
     }
     setLoading(false);
@@ -1,5 +1,5 @@
 import React, { useState, useEffect, useContext } from 'react';
-import { AuthContext } from '../context/AuthContext';
+import { AuthContext, authHeaders } from '../context/AuthContext';
 import { motion } from 'framer-motion';
 import { useNavigate } from 'react-router-dom';
 import API_BASE from '../config';
@@ -126,7 +126,8 @@ export default function Spin() {
 
       // Call spin endpoint
       const response = await fetch(`${API_BASE}/users/${user.username}/spin`, {
-        method: 'POST'
+        method: 'POST',
+        headers: authHeaders()
       });
 
       const data = await response.json();
@@ -154,8 +155,10 @@ export default function Spin() {
           setSpinMessage('');
           setIsJackpot(false);
         }, 4000);
+      } else if (response.status === 401) {
+        setSpinMessage('Your session has expired. Please log in again.');
       } else {
-        setSpinMessage(data.error || 'Spin failed');
+        setSpinMessage(data.error || data.detail || 'Spin failed');
         setIsJackpot(false);
       }
     } catch (err) {